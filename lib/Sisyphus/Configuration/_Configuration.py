@@ -140,6 +140,32 @@ NEW_CONFIG = {
                 KW_TIMEOUTS: (5, 10, 15, 30, 60), # The number of times to
                         # retry a request if the request times out, and the
                         # length of each timeout
+                KW_RETRY_POLICY: {}, # How long to wait between retries
+                        # ("backoff_base", "backoff_max"), the most time to
+                        # spend on one request ("deadline"), how many retries
+                        # are allowed in a window of time ("retry_budget",
+                        # "retry_budget_window"), and whether POSTs/PATCHes
+                        # may be retried ("retry_non_idempotent"). Omitted
+                        # keys use the defaults. See
+                        # Sisyphus.RestApiV1.RetryPolicy for details.
+                KW_RESPONSE_CACHE: False, # Setting this to True will cause
+                        # the RestApiV1 module to keep responses from read-
+                        # only endpoints (component types, test types,
+                        # institutions, countries, manufacturers, etc.) in a
+                        # cache file in the profile directory, so that they
+                        # don't have to be fetched again on every run. Use
+                        # KW_RESPONSE_CACHE_TTLS ("response_cache_ttls") to
+                        # override how long entries stay fresh. See
+                        # Sisyphus.RestApiV1.ResponseCache for details.
+                KW_MAX_IN_FLIGHT: 50, # The most requests that will be
+                        # sent to the server at the same time, across all
+                        # threads. The actual number adapts to how the server
+                        # is coping, and is cut back whenever it returns 5xx
+                        # errors or times out. See
+                        # Sisyphus.RestApiV1.RequestGovernor for details.
+                KW_MAX_REQUEST_RATE: None, # If set, the most requests per
+                        # second that will be sent to the server. None means
+                        # there is no limit other than KW_MAX_IN_FLIGHT.
             }
         },
         KW_PRODUCTION: {
@@ -374,6 +374,13 @@ contents = \
             ]
         },
     },
+    "scan codes": {
+        # Draw the QR codes and barcodes instead of downloading them from
+        # the server. "{database}" is "cdb" or "cdbdev", depending on the
+        # profile.
+        "render locally": True,
+        "qr url": "https://dbweb9.fnal.gov:8443/{database}/view/component/{part_id}",
+    },
     "label sets": {
         "default": [
             "QR-A4-3x4-Generic",
@@ -46,3 +46,8 @@ KW_THROTTLE_LOCK = "throttle_lock"
 KW_LOG_HEADERS = "log_headers"
 KW_LOG_REQUEST_JSON = "log_request_json"
 KW_TIMEOUTS = "timeouts"
+KW_RESPONSE_CACHE = "response_cache"
+KW_RESPONSE_CACHE_TTLS = "response_cache_ttls"
+KW_MAX_IN_FLIGHT = "max_in_flight"
+KW_MAX_REQUEST_RATE = "max_request_rate"
+KW_RETRY_POLICY = "retry_policy"
@@ -324,11 +324,9 @@ class HWItem:
             # Find the conflicts, only if we're changing the SN, and we're 
             # changing it to something besides None
             try:
-                more_records = ut.fetch_hwitems(
+                new_hwitem._sn_conflicts = ut.find_hwitems(
                             part_type_id=new_hwitem._current['part_type_id'],
                             serial_number=new_SN)
-
-                new_hwitem._sn_conflicts = list(more_records.keys())
             except ra.NotFound:
                 pass 
 
@@ -383,21 +381,27 @@ class HWItem:
         else:
             kwargs["serial_number"] = None
         
-        hwitem_raw = ut.fetch_hwitems(**kwargs)
-
-        logger.info(f"raw item data:\n{json.dumps(hwitem_raw,indent=4)}")
+        part_ids = ut.find_hwitems(**kwargs)
 
         # Raise an exception if no records are found, or more than one is found.
-        if len(hwitem_raw) == 0:
+        if len(part_ids) == 0:
             raise ra.NotFound("The arguments provided did not match any HWItems.")
-        elif len(hwitem_raw) > 1:
-            # TODO: we could still cache it for later.
-            logger.warning(json.dumps(hwitem_raw, indent=4))
+        elif len(part_ids) > 1:
+            logger.warning(f"matching part IDs: {part_ids}")
             raise ra.AmbiguousParameters("The arguments provided matched more than one HWItem.")
 
+        result = next(ut.fetch_hwitems_bulk(part_ids))
+        if result.errors:
+            for part, err in result.errors.items():
+                logger.error(f"fetching {part} for {result.part_id} failed: {err!r}")
+            # (If the item itself couldn't be fetched, that's the one that
+            # matters, e.g., NotFound for a new item.)
+            raise result.errors.get("Item", next(iter(result.errors.values())))
+
+        logger.info(f"raw item data:\n{json.dumps(result.data,indent=4)}")
       
         # We still need a bit of extra data before we can create the record  
-        _, item_node = hwitem_raw.popitem()
+        item_node = result.data
         it = item_node["Item"]
         sc = item_node["Subcomponents"]
         loc_list = item_node["Locations"] 
@@ -539,78 +543,286 @@ class HWItem:
         main REST API call, and does not include subcomponents.
         """ 
 
-        last_commit = self._last_commit
         current = self._current
        
-        ct_all = ut.fetch_component_type(part_type_id=current['part_type_id'])
-        ct = ct_all["ComponentType"]
-        spec_def = ct['properties']['specifications'][-1]['datasheet']
+        spec_def = self._spec_def(current['part_type_id'])
         
         if self.is_new():
-            post_data = {
-                "component_type": {"part_type_id": current['part_type_id']},
-                "country_code": current['country_code'],
-                "institution": {"id": current['institution_id']},
-                "serial_number": current['serial_number'],
-                "manufacturer": {"id": current['manufacturer_id']},
-                "specifications": utils.preserve_order(current['specifications']),
-                "status": {"id": current['status']},
-                "comments": current['comments'],
-                #"subcomponents": current['subcomponents']
-            }
+            logger.info("Posting new item")
+            resp = ra.post_hwitem(part_type_id=current['part_type_id'],
+                                    data=self._post_data(spec_def))
+            self._committed_new(resp["part_id"])
+        else:
+            logger.info("Patching item")
+            resp = ra.patch_hwitem(part_id=current['part_id'],
+                                    data=self._patch_data(spec_def))
+            self._committed_edit()
+        #}}}
 
-            if '_meta' in spec_def:
-                post_data['specifications'].setdefault('_meta', {})
-            else:
-                _ = post_data['specifications'].pop('_meta', None)
+    #--------------------------------------------------------------------------
 
-            logger.info("Posting new item")
-            resp = ra.post_hwitem(part_type_id=current['part_type_id'], data=post_data)
-            self._is_new = False
-
-            current["part_id"] = resp["part_id"]
-           
-            fields_to_copy = [
-                "part_id", "part_type_name", "part_type_id", "serial_number",
-                "comments", "country", "country_name", "country_code",
-                "institution", "institution_id", "institution_name",
-                "manufacturer", "manufacturer_id", "manufacturer_name",
-                "specifications", "status" #, "location", "location_id", "location_name",
-                #"location_comments", "arrived"
-            ]
+    @staticmethod
+    def _spec_def(part_type_id):
+        ct_all = ut.fetch_component_type(part_type_id=part_type_id)
+        ct = ct_all["ComponentType"]
+        return ct['properties']['specifications'][-1]['datasheet']
 
-            for field in fields_to_copy:
-                last_commit[field] = current[field]
+    @staticmethod
+    def _fix_meta(specifications, spec_def):
+        if '_meta' in spec_def:
+            specifications.setdefault('_meta', {})
         else:
-            
-            patch_data = {
-                "part_id": current['part_id'],
-                "serial_number": current['serial_number'],
-                "manufacturer": {"id": current['manufacturer_id']},
-                "specifications": utils.preserve_order(current['specifications']),
-                "status": {"id": current['status']},
-                "comments": current['comments'],
-            }        
-            
-            if "_meta" in spec_def:
-                patch_data['specifications'].setdefault('_meta', {})
-            else:
-                _ = patch_data['specifications'].pop('_meta', None)
+            _ = specifications.pop('_meta', None)
+        return specifications
 
-            logger.info("Patching item")
-            resp = ra.patch_hwitem(part_id=current['part_id'], data=patch_data)
-            
-            fields_to_copy = [
-                "serial_number", "comments", "manufacturer", "manufacturer_id", 
-                "manufacturer_name", "specifications", "status"
-            ]
-            
-            for field in fields_to_copy:
-                last_commit[field] = current[field]
+    def _post_data(self, spec_def):
+        current = self._current
+        return {
+            "component_type": {"part_type_id": current['part_type_id']},
+            "country_code": current['country_code'],
+            "institution": {"id": current['institution_id']},
+            "serial_number": current['serial_number'],
+            "manufacturer": {"id": current['manufacturer_id']},
+            "specifications": self._fix_meta(
+                        utils.preserve_order(current['specifications']), spec_def),
+            "status": {"id": current['status']},
+            "comments": current['comments'],
+            #"subcomponents": current['subcomponents']
+        }
+
+    def _patch_data(self, spec_def):
+        current = self._current
+        return {
+            "part_id": current['part_id'],
+            "serial_number": current['serial_number'],
+            "manufacturer": {"id": current['manufacturer_id']},
+            "specifications": self._fix_meta(
+                        utils.preserve_order(current['specifications']), spec_def),
+            "status": {"id": current['status']},
+            "comments": current['comments'],
+        }        
+
+    def _committed_new(self, part_id):
+        self._is_new = False
+        self._current["part_id"] = part_id
+       
+        fields_to_copy = [
+            "part_id", "part_type_name", "part_type_id", "serial_number",
+            "comments", "country", "country_name", "country_code",
+            "institution", "institution_id", "institution_name",
+            "manufacturer", "manufacturer_id", "manufacturer_name",
+            "specifications", "status" #, "location", "location_id", "location_name",
+            #"location_comments", "arrived"
+        ]
+
+        for field in fields_to_copy:
+            self._last_commit[field] = self._current[field]
+
+        ut.note_serial_number(self._current["part_type_id"], part_id,
+                                self._current["serial_number"])
+
+    def _committed_edit(self):
+        fields_to_copy = [
+            "serial_number", "comments", "manufacturer", "manufacturer_id", 
+            "manufacturer_name", "specifications", "status"
+        ]
+        
+        old_SN = self._last_commit["serial_number"]
+
+        for field in fields_to_copy:
+            self._last_commit[field] = self._current[field]
+
+        if old_SN != self._current["serial_number"]:
+            ut.note_serial_number(self._current["part_type_id"], self._current["part_id"],
+                                    self._current["serial_number"], old_SN)
+
+    #--------------------------------------------------------------------------
+
+    @staticmethod
+    def bulk_key(hwitem):
+        """Tell which HWItems can be sent in the same bulk request
+
+        New items can be created together if they share everything that
+        "bulk-add" sets for all of them at once. Existing items only have
+        to be the same part type.
+        """
+        current = hwitem._current
+        if hwitem.is_new():
+            return ("new", current['part_type_id'], current['country_code'],
+                        current['institution_id'], current['manufacturer_id'])
+        return ("edit", current['part_type_id'])
+
+    @staticmethod
+    def _bulk_rejected(resp, part_ids):
+        # The bulk endpoints may report a status for each row. Any that
+        # aren't OK need to be sent again individually.
+        rejected = set()
+        for row in resp.get("data", None) or ():
+            if not isinstance(row, dict):
+                continue
+            if row.get("status", "OK") != "OK" and row.get("part_id") in part_ids:
+                rejected.add(row["part_id"])
+        return rejected
+
+    @classmethod
+    def update_core_bulk(cls, hwitems):
+        #{{{
+        """Update the 'core' properties of several HWItems at once
+
+        The HWItems must all have the same bulk_key(). New items are created
+        with "bulk-add" (which only gives them the properties they have in
+        common), and then every item gets its own serial number,
+        specifications, etc., with "bulk-update." Any rows that a bulk
+        request rejects are sent again one at a time, so that the error (if
+        there still is one) is about that row.
+
+        A new item that bulk-add created but that can't be patched would be
+        left blank in the HWDB, so rows that look like they'll be rejected
+        are posted on their own instead, and any blank item that's left
+        anyway is disabled. A failure for one item doesn't stop the others.
+        Once they've all been tried, the first error is raised.
+        """
+        hwitems = list(hwitems)
+        if not hwitems:
+            return
+        if len(set(cls.bulk_key(hwitem) for hwitem in hwitems)) > 1:
+            msg = "update_core_bulk requires items with the same bulk_key"
+            logger.error(msg)
+            raise ValueError(msg)
+        if len(hwitems) == 1:
+            hwitems[0].update_core()
+            return
+
+        first = hwitems[0]._current
+        part_type_id = first['part_type_id']
+        is_new = hwitems[0].is_new()
+        errors = []
+
+        def attempt(hwitem, func, *args, **kwargs):
+            try:
+                func(*args, **kwargs)
+                return True
+            except Exception as err:
+                logger.error(f"Failed to commit item (part_id={hwitem._current['part_id']}, "
+                            f"serial_number={hwitem._current['serial_number']}): {err!r}")
+                errors.append(err)
+                return False
+
+        def finish():
+            if errors:
+                logger.error(f"{len(errors)} of {len(hwitems)} items could not be committed")
+                raise errors[0]
+
+        if is_new:
+            risky = cls._bulk_risky(hwitems)
+            for hwitem in risky:
+                attempt(hwitem, hwitem.update_core)
+            hwitems = [hwitem for hwitem in hwitems if hwitem not in risky]
+            if len(hwitems) < 2:
+                for hwitem in hwitems:
+                    attempt(hwitem, hwitem.update_core)
+                return finish()
+
+            add_data = {
+                "component_type": {"part_type_id": part_type_id},
+                "count": len(hwitems),
+                "country_code": first['country_code'],
+                "institution": {"id": first['institution_id']},
+                "manufacturer": {"id": first['manufacturer_id']},
+            }
+            try:
+                logger.info(f"Posting {len(hwitems)} new items")
+                resp = ra.post_hwitems_bulk(part_type_id, add_data)
+                part_ids = [row["part_id"] for row in resp["data"]]
+            except (ra.DatabaseError, ra.ConnectionFailed) as err:
+                # If nothing was created, they can still be posted one by one.
+                # (If the server might have created some, we can't tell which,
+                # so let the error through rather than risk duplicates.)
+                if isinstance(err, ra.ConnectionFailed) and err.request_sent:
+                    raise
+                logger.warning(f"bulk-add failed ({err!r}), posting items individually")
+                for hwitem in hwitems:
+                    attempt(hwitem, hwitem.update_core)
+                return finish()
+
+            if len(part_ids) != len(hwitems):
+                msg = (f"bulk-add created {len(part_ids)} items, "
+                            f"but {len(hwitems)} were requested")
+                logger.error(msg)
+                raise ra.InvalidResponse(msg)
+
+            for hwitem, part_id in zip(hwitems, part_ids):
+                # The items exist now, but only have the common properties.
+                # Finish them off by patching, below.
+                hwitem._current['part_id'] = part_id
 
+        spec_def = cls._spec_def(part_type_id)
+        by_part_id = {hwitem._current['part_id']: hwitem for hwitem in hwitems}
 
+        try:
+            logger.info(f"Patching {len(hwitems)} items")
+            resp = ra.patch_hwitems_bulk(part_type_id,
+                        {"data": [hwitem._patch_data(spec_def) for hwitem in hwitems]})
+            rejected = cls._bulk_rejected(resp, by_part_id)
+        except ra.RestApiException as err:
+            logger.warning(f"bulk-update failed ({err!r}), patching items individually")
+            rejected = set(by_part_id)
+
+        for part_id, hwitem in by_part_id.items():
+            if part_id in rejected:
+                if not attempt(hwitem, ra.patch_hwitem,
+                            part_id=part_id, data=hwitem._patch_data(spec_def)):
+                    if is_new:
+                        cls._disable_blank(part_id)
+                    continue
+            if is_new:
+                hwitem._committed_new(part_id)
+            else:
+                hwitem._committed_edit()
+
+        finish()
         #}}}
 
+    @classmethod
+    def _bulk_risky(cls, hwitems):
+        # New items that the server will probably turn away. Posting these
+        # one at a time means that a rejection doesn't leave anything behind.
+        part_type_id = hwitems[0]._current['part_type_id']
+        counts = {}
+        for hwitem in hwitems:
+            sn = hwitem._current['serial_number']
+            if sn is not None:
+                counts[str(sn)] = counts.get(str(sn), 0) + 1
+
+        risky = []
+        for hwitem in hwitems:
+            sn = hwitem._current['serial_number']
+            if sn is not None and counts[str(sn)] > 1:
+                reason = f"serial number '{sn}' appears more than once"
+            elif sn is not None and ut.lookup_serial_number(part_type_id, sn):
+                reason = f"serial number '{sn}' is already in use"
+            else:
+                try:
+                    hwitem.validate()
+                    continue
+                except Exception as err:
+                    reason = repr(err)
+            logger.warning(f"Not adding item in bulk: {reason}")
+            risky.append(hwitem)
+        return risky
+
+    @staticmethod
+    def _disable_blank(part_id):
+        # bulk-add created this item, but it never got its serial number or
+        # specifications. The journal (if any) still knows its part ID, so
+        # resuming the upload will finish it off.
+        logger.error(f"Item {part_id} was created, but couldn't be given its "
+                        "serial number and specifications. Disabling it.")
+        try:
+            ut.enable_hwitem(part_id, enable=False,
+                        comments="Created by a bulk upload that failed")
+        except Exception as err:
+            logger.error(f"Failed to disable blank item {part_id}: {err!r}")
 
     #--------------------------------------------------------------------------
 
@@ -627,6 +839,39 @@ class HWItem:
                         comments=current['comments'])  
         #}}}
 
+    @classmethod
+    def update_enabled_bulk(cls, hwitems):
+        #{{{
+        """Update the 'enabled' property of several HWItems at once
+
+        Only the items whose 'enabled' property has changed are sent. If the
+        bulk request fails, they are sent one at a time instead.
+        """
+        changed = [hwitem for hwitem in hwitems if hwitem.enabled_has_changed()]
+        if len(changed) < 2:
+            for hwitem in changed:
+                hwitem.update_enabled()
+            return
+
+        rows = [{
+                    "part_id": hwitem._current['part_id'],
+                    "enabled": (hwitem._current['enabled']==1),
+                    "comments": hwitem._current['comments'],
+                } for hwitem in changed]
+
+        try:
+            logger.info(f"Enabling/disabling {len(changed)} items")
+            resp = ra.patch_hwitems_enable_bulk({"data": rows})
+            rejected = cls._bulk_rejected(resp, {row["part_id"] for row in rows})
+        except ra.RestApiException as err:
+            logger.warning(f"bulk-enable failed ({err!r}), sending items individually")
+            rejected = {row["part_id"] for row in rows}
+
+        for hwitem in changed:
+            if hwitem._current['part_id'] in rejected:
+                hwitem.update_enabled()
+        #}}}
+
     #--------------------------------------------------------------------------
     
     def release_subcomponents(self):
@@ -701,7 +946,7 @@ class HWItem:
                 new_subcomps[func_pos] = None
 
             elif not is_valid_part_id(part_type_id, next_part_id):                
-                lookup = ut.fetch_hwitems(part_type_id=part_type_id, serial_number=next_part_id)
+                lookup = ut.find_hwitems(part_type_id=part_type_id, serial_number=next_part_id)
 
                 if len(lookup) == 0:
                     raise ra.NotFound(f"Could not attach subcomponent '{next_part_id}' to "
@@ -711,7 +956,7 @@ class HWItem:
                             f"{self.part_id} because the serial number is ambiguous.")
                 
                 # We found it! So we can change our new one to be a part_id.
-                new_part_id = new_subcomps[func_pos] = list(lookup.keys())[0] 
+                new_part_id = new_subcomps[func_pos] = lookup[0] 
         #}}}
 
     #--------------------------------------------------------------------------
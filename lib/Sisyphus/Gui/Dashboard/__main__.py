@@ -7,7 +7,7 @@ import dash_bootstrap_components as dbc
 from pathlib import Path
 
 import time, requests
-from Sisyphus.RestApiV1 import whoami
+from Sisyphus.RestApiV1 import whoami, retry_stats
 
 import os, sys, io, contextlib
 import logging
@@ -20,11 +20,14 @@ logger = config.getLogger(__name__)
 
 from Sisyphus.Gui.Dashboard.layout.layout_main import layout, register_layout_callbacks
 from Sisyphus.Gui.Dashboard.shippingworkflow import register_shipping_workflow_routes
+from Sisyphus.Gui.Dashboard.utils.data_resolver import cache_stats as dataframe_cache_stats
+from Sisyphus.Gui.Dashboard.utils.jobs import job_stats
 from Sisyphus.Gui.Dashboard.callbacks.callbacks_preferences import register_preferences_callbacks
 from Sisyphus.Gui.Dashboard.callbacks.callbacks_jsonselect import register_jsonselect_callbacks
 from Sisyphus.Gui.Dashboard.callbacks.callbacks_typegetter import register_typegetter_callbacks
 from Sisyphus.Gui.Dashboard.callbacks.callbacks_downloader import register_downloader_callbacks
 from Sisyphus.Gui.Dashboard.callbacks.callbacks_executive_summary import register_executive_summary_callbacks
+from Sisyphus.Gui.Dashboard.callbacks.callbacks_executive_summary import execsum_cache_stats
 
 from Sisyphus.Gui.Dashboard.callbacks import (
     register_conditions_callbacks,
@@ -233,6 +236,10 @@ def dashboard_health():
             "health_url": f"https://127.0.0.1:{port}/health" if LAN_MODE else None,
         },
         "scanner": scanner_diag,
+        "dataframe_cache": dataframe_cache_stats(),
+        "execsum_cache": execsum_cache_stats(),
+        "jobs": job_stats(),
+        "rest_api_retries": retry_stats(),
         "windows_wsl_note": [
             "If your phone cannot connect to the Dashboard in LAN mode, first open this page on the computer running hwdb-dash.",
             "For WSL2, check scanner.wsl2_mirrored and scanner.wsl2_portproxy below.",
@@ -8,14 +8,15 @@ import json
 
 from Sisyphus.Configuration import config
 from Sisyphus.Gui.Dashboard.utils.colorlog_handler import attach_color_console_handler
+from Sisyphus.Gui.Dashboard.utils.data_resolver import columns_from_store
 
 logger = config.getLogger(__name__)
 
 
 def resolve_df_from_store(store):
     if isinstance(store, dict) and "path" in store:
-        with open(store["path"], "rb") as f:
-            return pickle.load(f)
+        # (only the column names are used)
+        return pd.DataFrame(columns=columns_from_store(store))
     return pd.DataFrame(store)
 
 # Add/remove condition input rows
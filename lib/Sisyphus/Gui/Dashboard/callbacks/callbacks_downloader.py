@@ -6,7 +6,6 @@ import json
 from datetime import datetime
 import os
 import time
-import threading
 from pathlib import Path
 
 from Sisyphus.Configuration import config
@@ -17,7 +16,7 @@ from Sisyphus.RestApiV1 import get_hwitem_image_list, get_component_type_image_l
 from Sisyphus.Gui.Dashboard.utils.json_tree import render_json_tree
 from concurrent.futures import as_completed
 from Sisyphus.RestApiV1 import Utilities as ra_util
-pool = ra_util._executor  # shared thread pool
+from Sisyphus.Gui.Dashboard.utils import jobs
 
 # CSV / JSON helpers
 from Sisyphus.Gui.Dashboard.utils.downloader_csv import (
@@ -47,8 +46,8 @@ HIDDEN_SCHEMA_KEYS = {
 # ------------------------------------------------------------
 # Background job registry
 # ------------------------------------------------------------
-_download_jobs = {}  # job_id (dict) with state for Test Data
-_binary_jobs = {}  # job_id : {total, processed, done, error}
+_download_jobs = jobs.JobTable("download", jobs.PRIORITY_BULK)  # job_id (dict) with state for Test Data
+_binary_jobs = jobs.JobTable("binary", jobs.PRIORITY_BULK)  # job_id : {total, processed, done, error}
 
 ORIGINAL_BUTTON_STYLE = {
     "fontSize": "20px",
@@ -76,8 +75,6 @@ def run_download_job(job_id, pids, fields, testname, fmt, workdir, type_id):
     job["message"] = "Starting..."
     job["filename"] = None
 
-    pool = ra_util._executor  # USE THE SHARED EXECUTOR
-    
     # Precompute helpers depending on format
     if fmt == "csv":
         array_paths = find_array_paths(fields)
@@ -99,10 +96,11 @@ def run_download_job(job_id, pids, fields, testname, fmt, workdir, type_id):
         return pid, None
 
     try:
-        futures = {pool.submit(fetch_entry, pid): pid for pid in pids}
+        futures = {jobs.submit_task(fetch_entry, pid): pid for pid in pids}
         
         #for idx, pid in enumerate(pids):
         for idx, future in enumerate(as_completed(futures)):
+            jobs.check_cancelled()
             pid = futures[future]
             job["processed"] = idx + 1
             job["message"] = f"Downloading {pid}..."
@@ -167,6 +165,7 @@ def _binary_download_worker(job_id, selected_ids, id_to_meta, images_dir):
     processed = 0
 
     for img_id in selected_ids:
+        jobs.check_cancelled()
         meta = id_to_meta.get(img_id)
         if not meta:
             job["error"] = f"Missing metadata for image_id={img_id}"
@@ -462,7 +461,6 @@ def register_downloader_callbacks(app):
         # --- Pre-filters to get full PID list ---
         args = {
             "part_type_id": type_id,
-            "size": 99999,
             "part_id": None,
             "serial_number": None,
             "manufacturer": None,
@@ -481,14 +479,12 @@ def register_downloader_callbacks(app):
         #args["size"]         = 99999
 
         try:
-            resp = get_hwitems(**args)
-            items = resp["data"]
+            list_args = {k: v for k, v in args.items() if k != "part_type_id"}
+            pids = sorted(item["part_id"] for item in ra_util.iter_hwitems(type_id, **list_args))
         except Exception as e:
             logger.error(f"[DL] Error fetching HW items: {e}")
             return "Error fetching HW items.", None, None, True
 
-        pids = sorted([item["part_id"] for item in items])
-
         if not pids or not fields:
             return "No PIDs found for this Type ID.", None, None, True
 
@@ -528,21 +524,14 @@ def register_downloader_callbacks(app):
 
         # ---------------- Create and start job ----------------
         job_id = f"job-{int(time.time() * 1000)}"
-        _download_jobs[job_id] = {
+        _download_jobs.submit(job_id, {
             "status": "pending",
             "total": len(pids),
             "processed": 0,
             "message": "Starting...",
             "filename": None,
             "fmt": fmt,
-        }
-
-        thread = threading.Thread(
-            target=run_download_job,
-            args=(job_id, pids, fields, testname, fmt, workdir, type_id),
-            daemon=True,
-        )
-        thread.start()
+        }, run_download_job, job_id, pids, fields, testname, fmt, workdir, type_id)
 
         status_text = f"Download started for {len(pids)} PIDs..."
         pid_count_text = f"{len(pids)} PIDs selected"
@@ -593,6 +582,8 @@ def register_downloader_callbacks(app):
             running_style["backgroundColor"] = "#f39c12"
             running_style["cursor"] = "not-allowed"
             
+            if _download_jobs.is_queued(job_id):
+                message = "Waiting for other downloads to finish..."
             button_text = f"{pct}% completed..."
             button_style = running_style
             button_disabled = True
@@ -690,6 +681,8 @@ def register_downloader_callbacks(app):
                 "cursor": "not-allowed",
                  "border": "none",
             }
+            if _binary_jobs.is_queued(job_id):
+                return "Waiting...", orange, True, False
             return f"{pct}% completed...", orange, True, False
 
         # DONE — restore original state
@@ -1003,20 +996,12 @@ def register_downloader_callbacks(app):
 
         # Register job
         job_id = f"BIN-{int(time.time()*1000)}"
-        _binary_jobs[job_id] = {
+        _binary_jobs.submit(job_id, {
             "processed": 0,
             "total": len(selected_ids),
             "done": False,
             "error": None,
-        }
-
-        # Launch background thread
-        thread = threading.Thread(
-            target=_binary_download_worker,
-            args=(job_id, selected_ids, id_to_meta, images_dir),
-            daemon=True,
-        )
-        thread.start()
+        }, _binary_download_worker, job_id, selected_ids, id_to_meta, images_dir)
 
         # Immediately update button to syncing-style
         orange = {
@@ -3,7 +3,8 @@ from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 from dash import clientside_callback
 from dash import ALL
-import base64, json, time, threading
+import base64, json, time, threading, sys
+from collections import OrderedDict
 from datetime import datetime
 
 from Sisyphus.Configuration import config
@@ -14,6 +15,7 @@ from Sisyphus.RestApiV1 import (
     get_roles, post_component_type_image,
 )
 from Sisyphus.RestApiV1 import Utilities as ra_util
+from Sisyphus.Gui.Dashboard.utils import jobs
 
 import plotly.graph_objects as go
 import plotly.express as px
@@ -353,10 +355,10 @@ def _pick_phone_primary(urls: list[str]) -> str:
 # ----------------------------
 # Background job registries
 # ----------------------------
-_execsum_subcomp_jobs = {}  # job_id -> {"done":bool, "error":str|None, "rowData":[...]}
-_execsum_details_jobs = {}  # job_id -> {"done":bool,"error":str|None,"payload":tuple|None}
-_execsum_sig_jobs = {}  # job_id -> {"done":bool, "error":str|None, "new_es":list|None, "msg":str|None, "new_table":list|None}
-_execsum_pdf_jobs = {}  # job_id -> {"done":bool,"error":str|None,"msg":str|None}
+_execsum_subcomp_jobs = jobs.JobTable("execsum-subcomponents", jobs.PRIORITY_INTERACTIVE)  # job_id -> {"done":bool, "error":str|None, "rowData":[...]}
+_execsum_details_jobs = jobs.JobTable("execsum-details", jobs.PRIORITY_INTERACTIVE)  # job_id -> {"done":bool,"error":str|None,"payload":tuple|None}
+_execsum_sig_jobs = jobs.JobTable("execsum-signature", jobs.PRIORITY_INTERACTIVE)  # job_id -> {"done":bool, "error":str|None, "new_es":list|None, "msg":str|None, "new_table":list|None}
+_execsum_pdf_jobs = jobs.JobTable("execsum-pdf")  # job_id -> {"done":bool,"error":str|None,"msg":str|None}
 
 # ----------------------------
 # Role cache (id -> name)
@@ -865,8 +867,9 @@ def _fetch_hwitem_status_flags(pid: str, cache_key: str | None = None) -> tuple[
     """
     # 1) try cache (no network)
     try:
-        if cache_key and cache_key in _execsum_cache:
-            it = (_execsum_cache[cache_key].get("by_pid", {}).get(pid, {}) or {}).get("item")
+        bucket = _execsum_cache.get(cache_key) if cache_key else None
+        if bucket is not None:
+            it = (bucket.get("by_pid", {}).get(pid, {}) or {}).get("item")
             if isinstance(it, dict):
                 status_text = str(_safe(it.get("status", ""))).strip() or "Unknown"
                 return (status_text, bool(it.get("certified_qaqc")), bool(it.get("qaqc_uploaded")))
@@ -911,14 +914,14 @@ def _build_subcomponent_rows_recursive(root_pid: str, cache_key: str | None = No
       - row["id"] is UNIQUE across ALL rows
       - duplicates under same parent get internal suffix: pid__2, pid__3, ...
     """
-    executor = ra_util._executor
     rows: list[dict] = []
     row_by_self_key: dict[str, dict] = {}
 
     # memo per cache_key
     subtree_cache = None
-    if cache_key and cache_key in _execsum_cache:
-        subtree_cache = _execsum_cache[cache_key].setdefault("subtree_cache", {})
+    bucket = _execsum_cache.get(cache_key) if cache_key else None
+    if bucket is not None:
+        subtree_cache = bucket.setdefault("subtree_cache", {})
 
     visited_edges: set[tuple[tuple[str, ...], str]] = set()
 
@@ -982,7 +985,7 @@ def _build_subcomponent_rows_recursive(root_pid: str, cache_key: str | None = No
             if subtree_cache is not None and ppid in subtree_cache and "children" in subtree_cache[ppid]:
                 sub_futs[ppid] = None
             else:
-                sub_futs[ppid] = executor.submit(_fetch_children, ppid)
+                sub_futs[ppid] = jobs.submit_task(_fetch_children, ppid)
 
         parent_children_map: dict[str, list[dict]] = {}
         for (ppid, _ppath, pself_key) in parents:
@@ -996,7 +999,7 @@ def _build_subcomponent_rows_recursive(root_pid: str, cache_key: str | None = No
                     logger.error(f"[ExecSum] get_subcomponents failed parent={ppid}: {e}")
                     children = []
                 if subtree_cache is not None:
-                    subtree_cache.setdefault(ppid, {})["children"] = children
+                    _execsum_cache.put(cache_key, ("subtree_cache", ppid, "children"), children)
 
             # set THIS parent node’s n_children (always)
             n_children = len(children or [])
@@ -1064,7 +1067,7 @@ def _build_subcomponent_rows_recursive(root_pid: str, cache_key: str | None = No
             if subtree_cache is not None and child_pid in subtree_cache and "status_flags" in subtree_cache[child_pid]:
                 continue
             if child_pid not in hw_futs:
-                hw_futs[child_pid] = executor.submit(_fetch_hwitem_status_flags, child_pid, cache_key)
+                hw_futs[child_pid] = jobs.submit_task(_fetch_hwitem_status_flags, child_pid, cache_key)
 
         status_flags_map: dict[str, tuple[str, bool, bool]] = {}
         for (child_pid, *_rest) in child_meta:
@@ -1080,7 +1083,7 @@ def _build_subcomponent_rows_recursive(root_pid: str, cache_key: str | None = No
 
             status_flags_map[child_pid] = status_flags
             if subtree_cache is not None:
-                subtree_cache.setdefault(child_pid, {})["status_flags"] = status_flags
+                _execsum_cache.put(cache_key, ("subtree_cache", child_pid, "status_flags"), status_flags)
 
         # ---------------------------------------------------------
         # 4) Emit rows + enqueue next parents
@@ -1200,8 +1203,9 @@ def _status_id_from_anywhere(*, status_id, pid: str, cache_key: str | None) -> i
 
     # 2) cache fallback (root PID only; we apply same sid to all)
     try:
-        if cache_key and cache_key in _execsum_cache:
-            it = (_execsum_cache[cache_key].get("by_pid", {}).get(pid, {}) or {}).get("item") or {}
+        bucket = _execsum_cache.get(cache_key) if cache_key else None
+        if bucket is not None:
+            it = (bucket.get("by_pid", {}).get(pid, {}) or {}).get("item") or {}
             status_text = str(_safe(it.get("status", ""))).strip()
             if status_text in STATUS_ID_BY_LABEL:
                 return int(STATUS_ID_BY_LABEL[status_text])
@@ -1224,12 +1228,211 @@ def _status_id_from_anywhere(*, status_id, pid: str, cache_key: str | None) -> i
 # Server-side cache to be used when a PID row is selected (so it doesn’t hit HWDB again).
 # ----------------------------
 # Server-side cache: cache_key -> {"typeid":..., "test_types":[...], "by_pid":{pid: {"item":..., "tests":{tt: test_data}}}}
-_execsum_cache = {}
+EXECSUM_CACHE_MAX_ENTRIES = 8
+EXECSUM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+def _deep_sizeof(obj, seen=None) -> int:
+    """Approximate size in bytes of a tree of dicts/lists/strings/bytes."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += _deep_sizeof(k, seen) + _deep_sizeof(v, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            size += _deep_sizeof(v, seen)
+    return size
+
+class _ExecSumCache:
+    """
+    The buckets made by each sync, as a bounded LRU.
+
+    Looks like a dict (`key in cache`, `cache[key]`, `cache.get(key)`) to the
+    rest of this module. Another thread's sync can drop a bucket at any time,
+    so look a bucket up once, with `get`, rather than checking `key in cache`
+    and then indexing. Buckets that haven't been used recently are dropped
+    once there are more than `max_entries` of them, or they add up to more
+    than `max_bytes`. The newest bucket is never dropped. Pages still holding
+    a dropped key fall back to fetching from the HWDB, as they always have
+    when the key was missing.
+
+    Sizes are kept up to date as things are added: the synced items are
+    measured when a bucket is stored, and each test, image, PID list, or
+    subtree entry is measured when it's cached with `put`. Only the new
+    value is measured, and not while holding the lock, so neither caching
+    nor asking for stats walks a whole bucket.
+
+    Syncing a type again reuses the bucket from the last sync of that type
+    (see `store_sync`), and the old key keeps pointing at it.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._buckets = OrderedDict()   # key -> bucket
+        self._sizes = {}                # key -> bytes
+        self._aliases = {}              # retired key -> current key
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "refreshes": 0}
+
+    def _resolve(self, key):
+        return self._aliases.get(key, key)
+
+    def _touch(self, key):
+        key = self._resolve(key)
+        if key in self._buckets:
+            self._buckets.move_to_end(key)
+            self._stats["hits"] += 1
+            return self._buckets[key]
+        self._stats["misses"] += 1
+        return None
+
+    def __contains__(self, key):
+        # (not a lookup: only `get` and `cache[key]` count as hits or misses)
+        with self._lock:
+            return self._resolve(key) in self._buckets
+
+    def __getitem__(self, key):
+        with self._lock:
+            bucket = self._touch(key)
+            if bucket is None:
+                raise KeyError(key)
+            return bucket
+
+    def get(self, key, default=None):
+        with self._lock:
+            bucket = self._touch(key)
+            return default if bucket is None else bucket
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def put(self, key, path, value):
+        """
+        Caches `value` at bucket[path[0]][path[1]]... (e.g.,
+        `("tests_cache", (pid, test_type))`) and adds its size to the
+        bucket's. Does nothing if the bucket has been dropped.
+        """
+        nbytes = _deep_sizeof(value)
+        with self._lock:
+            key = self._resolve(key)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return
+            d = bucket
+            for name in path[:-1]:
+                d = d.setdefault(name, {})
+            old = d.get(path[-1])
+            d[path[-1]] = value
+
+        # Whatever was replaced isn't in the cache anymore, so it can be
+        # measured without the lock
+        nbytes -= 0 if old is None else _deep_sizeof(old)
+        with self._lock:
+            # (unless the bucket was dropped or refreshed in the meantime)
+            if key in self._sizes:
+                self._sizes[key] += nbytes
+                self._enforce_limits()
+
+    def store_sync(self, typeid: str, by_pid: dict) -> str:
+        """
+        Stores the result of syncing `typeid` and returns its cache key.
+
+        If an earlier sync of the same type is still cached, its bucket is
+        refreshed in place: items that didn't change keep their entries, and
+        anything cached for items that changed or are gone is dropped. Tests
+        and images are always dropped, because an item's record doesn't show
+        when a test was added, and a new sync is how users ask for them.
+        """
+        cache_key = f"{typeid}:{int(time.time()*1000)}"
+        nbytes = _deep_sizeof(by_pid)
+
+        with self._lock:
+            old_key = next((k for k in reversed(self._buckets)
+                                if self._buckets[k].get("typeid") == typeid), None)
+
+            if old_key is None:
+                bucket = {
+                    "typeid": typeid,
+                    "by_pid": by_pid,
+                    "tests_cache": {},
+                    "subtree_cache": {},
+                    "pidlist_cache": {},
+                    "images_cache": {},
+                }
+            else:
+                bucket = self._buckets.pop(old_key)
+                self._sizes.pop(old_key, None)
+                old_by_pid = bucket.get("by_pid", {}) or {}
+
+                changed = {pid for pid, ent in old_by_pid.items()
+                                if (by_pid.get(pid) or {}).get("item") != (ent or {}).get("item")}
+                for pid, ent in by_pid.items():
+                    if pid in old_by_pid and pid not in changed:
+                        by_pid[pid] = old_by_pid[pid]
+
+                subtree_cache = bucket.setdefault("subtree_cache", {})
+                for pid in list(subtree_cache):
+                    # status flags only depend on the item record itself
+                    if pid in changed or pid not in by_pid:
+                        del subtree_cache[pid]
+                    else:
+                        subtree_cache[pid].pop("children", None)
+
+                # Only status flags are left, so this doesn't take long
+                nbytes += _deep_sizeof(subtree_cache)
+
+                bucket["by_pid"] = by_pid
+                bucket["tests_cache"] = {}
+                bucket["pidlist_cache"] = {}
+                bucket["images_cache"] = {}
+
+                for alias, target in self._aliases.items():
+                    if target == old_key:
+                        self._aliases[alias] = cache_key
+                self._aliases[old_key] = cache_key
+                self._stats["refreshes"] += 1
+
+            self._buckets[cache_key] = bucket
+            self._sizes[cache_key] = nbytes
+            self._enforce_limits()
+
+        return cache_key
+
+    def _enforce_limits(self):
+        while len(self._buckets) > 1 and (
+                    len(self._buckets) > self.max_entries
+                    or sum(self._sizes.values()) > self.max_bytes):
+            key, _ = self._buckets.popitem(last=False)
+            self._sizes.pop(key, None)
+            self._aliases = {a: t for a, t in self._aliases.items() if t != key}
+            self._stats["evictions"] += 1
+            logger.info(f"[ExecSum Cache] dropped bucket {key}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._buckets),
+                "max_entries": self.max_entries,
+                "bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+                **self._stats,
+                "hit_rate": (self._stats["hits"] / lookups) if lookups else None,
+            }
+
+_execsum_cache = _ExecSumCache(EXECSUM_CACHE_MAX_ENTRIES, EXECSUM_CACHE_MAX_BYTES)
+
+def execsum_cache_stats() -> dict:
+    return _execsum_cache.stats()
 
 # ----------------------------
 # Background job registry
 # ----------------------------
-_execsum_jobs = {}  # jobid -> {"processed","total","done","error","rows","stage"}
+_execsum_jobs = jobs.JobTable("execsum-sync", jobs.PRIORITY_BULK)  # jobid -> {"processed","total","done","error","rows","stage"}
 
 # ----------------------------
 # Get the full name
@@ -1280,11 +1483,8 @@ def _execsum_sync_worker(job_id: str):
         # -------------------------
         job["stage"] = "fetching_pids"
 
-        resp = get_hwitems(typeid, size=99999)
-        items = resp.get("data", []) or []
-
-        def _pid_key(it):
-            pid = str(it.get("part_id") or it.get("pid") or "").strip()
+        def _pid_key(row):
+            pid = str(row.get("pid") or "").strip()
             if "-" in pid:
                 a, b = pid.split("-", 1)
                 try:
@@ -1293,13 +1493,13 @@ def _execsum_sync_worker(job_id: str):
                     return (a, b)
             return (pid, 0)
 
-        items.sort(key=_pid_key, reverse=True)
-
-        job["total"] = len(items)
-
+        # Stream the listing page by page. Rows are published to the job as
+        # they arrive so the poller can show them before the last page lands.
         rows = []
         by_pid = {}
-        for it in items:
+        job["rows"] = rows
+        for it in ra_util.iter_hwitems(typeid):
+            jobs.check_cancelled()
             pid = _safe(it.get("part_id") or it.get("pid") or "")
             by_pid[pid] = {"item": it, "tests": {}}
 
@@ -1321,18 +1521,11 @@ def _execsum_sync_worker(job_id: str):
                 "certified": "✅" if bool(it.get("certified_qaqc")) else "❌",
                 "uploaded":  "✅" if bool(it.get("qaqc_uploaded")) else "❌",
             })
+            job["total"] = len(rows)
 
-        job["rows"] = rows
+        job["rows"] = sorted(rows, key=_pid_key, reverse=True)
 
-        cache_key = f"{typeid}:{int(time.time()*1000)}"
-        _execsum_cache[cache_key] = {
-            "typeid": typeid,
-            "by_pid": by_pid,
-            "tests_cache": {},
-            "subtree_cache": {},
-            "pidlist_cache": {},
-            "images_cache": {},
-        }
+        cache_key = _execsum_cache.store_sync(typeid, by_pid)
 
         job["cache_key"] = cache_key
         job["done"] = True
@@ -1990,8 +2183,9 @@ def _build_details_payload(
     # ---------- shared: title + selected items summary ----------
     typeid_here = ""
     try:
-        if cache_key and cache_key in _execsum_cache:
-            typeid_here = str(_execsum_cache[cache_key].get("typeid") or "").strip()
+        bucket = _execsum_cache.get(cache_key) if cache_key else None
+        if bucket is not None:
+            typeid_here = str(bucket.get("typeid") or "").strip()
     except Exception:
         typeid_here = ""
 
@@ -2041,8 +2235,9 @@ def _build_details_payload(
     # ---------- shared: Status pane ----------
     current_status_text = "—"
     try:
-        if cache_key and cache_key in _execsum_cache:
-            it = (_execsum_cache[cache_key]["by_pid"].get(pid, {}) or {}).get("item", {}) or {}
+        bucket = _execsum_cache.get(cache_key) if cache_key else None
+        if bucket is not None:
+            it = (bucket["by_pid"].get(pid, {}) or {}).get("item", {}) or {}
             current_status_text = str(_safe(it.get("status", ""))).strip() or "—"
     except Exception:
         current_status_text = "—"
@@ -2511,8 +2706,9 @@ def _build_details_payload(
 
     current_status_text = "—"
     try:
-        if cache_key and cache_key in _execsum_cache:
-            it = (_execsum_cache[cache_key]["by_pid"].get(pid, {}) or {}).get("item", {}) or {}
+        bucket = _execsum_cache.get(cache_key) if cache_key else None
+        if bucket is not None:
+            it = (bucket["by_pid"].get(pid, {}) or {}).get("item", {}) or {}
             current_status_text = str(_safe(it.get("status", ""))).strip() or "—"
     except Exception:
         current_status_text = "—"
@@ -2684,8 +2880,9 @@ def _build_details_payload(
     # derive typeid for subtitle (prefer cache -> fallback cfg)
     typeid_here = ""
     try:
-        if cache_key and cache_key in _execsum_cache:
-            typeid_here = str(_execsum_cache[cache_key].get("typeid") or "").strip()
+        bucket = _execsum_cache.get(cache_key) if cache_key else None
+        if bucket is not None:
+            typeid_here = str(bucket.get("typeid") or "").strip()
     except Exception:
         typeid_here = ""
     if not typeid_here:
@@ -3607,10 +3804,8 @@ def _get_pids_for_typeid(cache_key: str | None, typeid: str) -> list[str]:
 
     # Otherwise refetch from HWDB (and overwrite cache)
     try:
-        resp = get_hwitems(typeid, size=99999)
-        items = resp.get("data", []) or []
         pids = []
-        for it in items:
+        for it in ra_util.iter_hwitems(typeid):
             pid = _safe(it.get("part_id") or it.get("pid") or "")
             if pid:
                 pids.append(pid)
@@ -3627,13 +3822,13 @@ def _get_pids_for_typeid(cache_key: str | None, typeid: str) -> list[str]:
         pids.sort(key=_pid_key, reverse=True)
 
         if plc is not None:
-            plc[typeid] = pids
+            _execsum_cache.put(cache_key, ("pidlist_cache", typeid), pids)
         return pids
 
     except Exception as e:
         logger.error(f"[ExecSum] _get_pids_for_typeid failed typeid={typeid}: {e}")
         if plc is not None:
-            plc[typeid] = []   # ok to cache empty, because we refetch next time anyway
+            _execsum_cache.put(cache_key, ("pidlist_cache", typeid), [])   # ok to cache empty, because we refetch next time anyway
         return []
 
 
@@ -3646,16 +3841,17 @@ def _get_test_cached(cache_key: str | None, pid: str, test_type: str):
     Returns cached test_data dict or fetches via get_hwitem_test.
     Works even if pid is not in the synced PID table.
     """
-    if not cache_key or cache_key not in _execsum_cache:
+    bucket = _execsum_cache.get(cache_key) if cache_key else None
+    if bucket is None:
         return None
 
-    tc = _execsum_cache[cache_key].setdefault("tests_cache", {})
+    tc = bucket.setdefault("tests_cache", {})
     key = (pid, test_type)
     if key in tc:
         return tc[key]
 
     td = fetch_test_blob(pid, test_type)
-    tc[key] = td
+    _execsum_cache.put(cache_key, ("tests_cache", key), td)
     return td
 
 
@@ -3663,24 +3859,25 @@ def _prefetch_tests(cache_key: str | None, pids: list[str], test_type: str):
     """
     Fetch many tests concurrently into tests_cache for speed.
     """
-    if not cache_key or cache_key not in _execsum_cache:
+    bucket = _execsum_cache.get(cache_key) if cache_key else None
+    if bucket is None:
         return
 
-    tc = _execsum_cache[cache_key].setdefault("tests_cache", {})
-    executor = ra_util._executor
+    tc = bucket.setdefault("tests_cache", {})
 
     futs = {}
     for pid in (pids or []):
         k = (pid, test_type)
         if k in tc:
             continue
-        futs[k] = executor.submit(fetch_test_blob, pid, test_type)
+        futs[k] = jobs.submit_task(fetch_test_blob, pid, test_type)
 
     for k, fut in futs.items():
         try:
-            tc[k] = fut.result()
+            td = fut.result()
         except Exception:
-            tc[k] = None
+            td = None
+        _execsum_cache.put(cache_key, ("tests_cache", k), td)
 
 # MIME
 def _guess_mime_from_name(name: str) -> str:
@@ -3823,7 +4020,7 @@ def _get_test_attached_image_bytes(
     rec, err = _get_test_record_by_history_order(pid, tt, ho)
     if err or not rec:
         if icache is not None:
-            icache[ck] = {"bytes": None, "mime": _guess_mime_from_name(img_name), "error": err or "No record."}
+            _execsum_cache.put(cache_key, ("images_cache", ck), {"bytes": None, "mime": _guess_mime_from_name(img_name), "error": err or "No record."})
         return (None, _guess_mime_from_name(img_name), err or "No record.")
 
     # find image_id
@@ -3831,7 +4028,7 @@ def _get_test_attached_image_bytes(
     if not image_id:
         msg = f"Could not find image_name='{img_name}' in test record (pid={pid}, test={tt}, history_order={ho})."
         if icache is not None:
-            icache[ck] = {"bytes": None, "mime": _guess_mime_from_name(img_name), "error": msg}
+            _execsum_cache.put(cache_key, ("images_cache", ck), {"bytes": None, "mime": _guess_mime_from_name(img_name), "error": msg})
         return (None, _guess_mime_from_name(img_name), msg)
 
     # download to temp file, then read bytes
@@ -3852,13 +4049,13 @@ def _get_test_attached_image_bytes(
 
         mime = _guess_mime_from_name(img_name)
         if icache is not None:
-            icache[ck] = {"bytes": b, "mime": mime, "error": None, "image_id": str(image_id)}
+            _execsum_cache.put(cache_key, ("images_cache", ck), {"bytes": b, "mime": mime, "error": None, "image_id": str(image_id)})
         return (b, mime, None)
 
     except Exception as e:
         msg = f"Failed to download image (image_id={image_id}): {e}"
         if icache is not None:
-            icache[ck] = {"bytes": None, "mime": _guess_mime_from_name(img_name), "error": msg, "image_id": str(image_id)}
+            _execsum_cache.put(cache_key, ("images_cache", ck), {"bytes": None, "mime": _guess_mime_from_name(img_name), "error": msg, "image_id": str(image_id)})
         return (None, _guess_mime_from_name(img_name), msg)
 
 # Plot div builder for images
@@ -4420,7 +4617,7 @@ def register_executive_summary_callbacks(app):
             raise PreventUpdate
 
         job_id = f"SIG-RESET-{int(time.time()*1000)}"
-        _execsum_sig_jobs[job_id] = {"done": False, "error": None, "new_es": None, "msg": None, "new_table": None}
+        job_state = {"done": False, "error": None, "new_es": None, "msg": None, "new_table": None}
 
         def _worker():
             try:
@@ -4436,7 +4633,7 @@ def register_executive_summary_callbacks(app):
                 _execsum_sig_jobs[job_id]["error"] = str(e)
                 _execsum_sig_jobs[job_id]["done"] = True
 
-        threading.Thread(target=_worker, daemon=True).start()
+        _execsum_sig_jobs.submit(job_id, job_state, _worker)
 
         # Use busy to “grey out” signee buttons while reset runs
         return job_id, False, {"name": "__RESET__"}
@@ -4461,7 +4658,7 @@ def register_executive_summary_callbacks(app):
 
         pid = str(selected_pid).strip()
         job_id = f"SUBCOMP-{int(time.time()*1000)}"
-        _execsum_subcomp_jobs[job_id] = {"done": False, "error": None, "rowData": None}
+        job_state = {"done": False, "error": None, "rowData": None}
 
         def _worker():
             try:
@@ -4510,7 +4707,7 @@ def register_executive_summary_callbacks(app):
                 _execsum_subcomp_jobs[job_id]["error"] = str(e)
                 _execsum_subcomp_jobs[job_id]["done"] = True
 
-        threading.Thread(target=_worker, daemon=True).start()
+        _execsum_subcomp_jobs.submit(job_id, job_state, _worker)
 
         # show wrapper + message immediately; keep old rowData to avoid flicker
         return {"display":"block"}, "Preparing the list of sub-components…", job_id, False, no_update
@@ -4595,7 +4792,7 @@ def register_executive_summary_callbacks(app):
 
         pid = str(selected_pid).strip()
         job_id = f"DETAILS-{int(time.time() * 1000)}"
-        _execsum_details_jobs[job_id] = {"done": False, "error": None, "payload": None}
+        job_state = {"done": False, "error": None, "payload": None}
 
         wait_style = {"minHeight": "55vh", "display": "block", "pointerEvents": "none"}
         text_style = {"marginTop": "10px", "color": "#666", "display": "block", "pointerEvents": "none"}
@@ -4628,7 +4825,7 @@ def register_executive_summary_callbacks(app):
                 _execsum_details_jobs[job_id]["error"] = str(e)
                 _execsum_details_jobs[job_id]["done"] = True
 
-        threading.Thread(target=_worker, daemon=True).start()
+        _execsum_details_jobs.submit(job_id, job_state, _worker)
 
         return wait_style, "Preparing the sign-off and plot section…", text_style, DETAILS_STYLE_HIDDEN, job_id, False
     
@@ -4723,7 +4920,7 @@ def register_executive_summary_callbacks(app):
             return no_update, no_update, "No PID selected.", None, True
 
         job_id = f"PDF-{int(time.time() * 1000)}"
-        _execsum_pdf_jobs[job_id] = {"done": False, "error": None, "msg": None}
+        job_state = {"done": False, "error": None, "msg": None}
 
         # snapshot inputs
         cache_key_ = cache_key
@@ -4774,7 +4971,7 @@ def register_executive_summary_callbacks(app):
                 _execsum_pdf_jobs[job_id]["error"] = str(e)
                 _execsum_pdf_jobs[job_id]["done"] = True
 
-        threading.Thread(target=_worker, daemon=True).start()
+        _execsum_pdf_jobs.submit(job_id, job_state, _worker)
 
         return True, PDF_BTN_DISABLED_STYLE, "Uploading the PDF to the HWDB…", job_id, False
 
@@ -5017,7 +5214,7 @@ def register_executive_summary_callbacks(app):
 
         # Start background job immediately (config + pids happen in worker now)
         job_id = f"EXECSUM-{int(time.time()*1000)}"
-        _execsum_jobs[job_id] = {
+        job_state = {
             "processed": 0,
             "total": 0,
             "done": False,
@@ -5034,7 +5231,7 @@ def register_executive_summary_callbacks(app):
         #mode_now = (mode_now or "detail").strip().lower()
         mode_now = (mode_now).strip().lower()
         
-        threading.Thread(target=_execsum_sync_worker, args=(job_id,), daemon=True).start()
+        _execsum_jobs.submit(job_id, job_state, _execsum_sync_worker, job_id)
 
         # Return immediately so UI turns orange right away
         return (
@@ -5140,14 +5337,18 @@ def register_executive_summary_callbacks(app):
                 )
 
             if stage == "fetching_pids":
+                # Show the rows received so far; the final (sorted) table
+                # replaces them once the worker is done.
+                rows_so_far = list(job.get("rows") or [])
                 return (
-                    "Fetching PID list...", orange, True, False, job_id,
-                    no_update, no_update,
+                    f"Fetching PID list... ({len(rows_so_far)})", orange, True, False, job_id,
+                    (rows_so_far if rows_so_far else no_update), no_update,
                     cfg, (cfg_msg or "Config loaded."), type_name, effective_mode, has_config
                 )
 
             return (
-                "Working...", orange, True, False, job_id,
+                "Waiting for other syncs..." if _execsum_jobs.is_queued(job_id) else "Working...",
+                orange, True, False, job_id,
                 no_update, no_update,
                 cfg, (cfg_msg or "Working…"), type_name, effective_mode, has_config
             )
@@ -5440,10 +5641,11 @@ def register_executive_summary_callbacks(app):
         prevent_initial_call=True,
     )
     def prefill_status_dropdown(pid, cache_key):
-        if not pid or not cache_key or cache_key not in _execsum_cache:
+        bucket = _execsum_cache.get(cache_key) if cache_key else None
+        if not pid or bucket is None:
             raise PreventUpdate
 
-        it = (_execsum_cache[cache_key]["by_pid"].get(pid, {}) or {}).get("item", {}) or {}
+        it = (bucket["by_pid"].get(pid, {}) or {}).get("item", {}) or {}
         status_text = str(_safe(it.get("status", ""))).strip()
 
         # status_text may already be the label; map to ID
@@ -5503,9 +5705,10 @@ def register_executive_summary_callbacks(app):
         prevent_initial_call=True,
     )
     def preload_flags(pid, _form_children, cache_key):
-        if not pid or not cache_key or cache_key not in _execsum_cache:
+        bucket = _execsum_cache.get(cache_key) if cache_key else None
+        if not pid or bucket is None:
             raise PreventUpdate
-        item = (_execsum_cache[cache_key]["by_pid"].get(pid, {}) or {}).get("item", {}) or {}
+        item = (bucket["by_pid"].get(pid, {}) or {}).get("item", {}) or {}
         return bool(item.get("certified_qaqc")), bool(item.get("qaqc_uploaded"))
     
     # ----------------------------
@@ -5887,9 +6090,8 @@ def register_executive_summary_callbacks(app):
             comment = f"signed by {who}".strip()
 
         # run patches
-        executor = ra_util._executor
         futs = [
-            executor.submit(
+            jobs.submit_task(
                 _patch_one_hwitem_flags,
                 part_id=each_pid,
                 status_id=sid,
@@ -5918,8 +6120,8 @@ def register_executive_summary_callbacks(app):
 
         # update server-side cache snapshot (status/flags)
         try:
-            if cache_key and cache_key in _execsum_cache:
-                bucket = _execsum_cache[cache_key]
+            bucket = _execsum_cache.get(cache_key) if cache_key else None
+            if bucket is not None:
                 by_pid = bucket.get("by_pid", {}) or {}
                 subtree_cache = bucket.get("subtree_cache", {}) or {}
                 for each_pid in pids:
@@ -6109,7 +6311,7 @@ def register_executive_summary_callbacks(app):
 
             
         job_id = f"SIG-{int(time.time()*1000)}"
-        _execsum_sig_jobs[job_id] = {"done": False, "error": None, "new_es": None, "msg": None, "new_table": None}
+        job_state = {"done": False, "error": None, "new_es": None, "msg": None, "new_table": None}
 
 
         
@@ -6162,9 +6364,8 @@ def register_executive_summary_callbacks(app):
 
                 comment = f"[ExecSum] signature '{name} uploaded, also Status, QAQC Certified, and Uploaded flags updated."
 
-                executor = ra_util._executor
                 futs = [
-                    executor.submit(
+                    jobs.submit_task(
                         _patch_one_hwitem_flags,
                         part_id=each_pid,
                         status_id=sid,
@@ -6194,8 +6395,8 @@ def register_executive_summary_callbacks(app):
 
                 # ---- Keep server-side cache consistent with what we just PATCHed ----
                 try:
-                    if cache_key_ and cache_key_ in _execsum_cache:
-                        bucket = _execsum_cache[cache_key_]
+                    bucket = _execsum_cache.get(cache_key_) if cache_key_ else None
+                    if bucket is not None:
                         by_pid = bucket.get("by_pid", {}) or {}
                         subtree_cache = bucket.get("subtree_cache", {}) or {}
 
@@ -6243,7 +6444,7 @@ def register_executive_summary_callbacks(app):
                 _execsum_sig_jobs[job_id]["error"] = str(e)
                 _execsum_sig_jobs[job_id]["done"] = True
 
-        threading.Thread(target=_worker, daemon=True).start()
+        _execsum_sig_jobs.submit(job_id, job_state, _worker)
 
         # Immediate UI change: mark busy + enable poll interval
         return job_id, False, {"name": name}, ""
@@ -3,19 +3,22 @@ import dash
 from dash.exceptions import PreventUpdate
 import pandas as pd
 from Sisyphus.RestApiV1 import Utilities as ra_util
-import base64, io, json, pickle
+import base64, io, json, pickle, hashlib
 from datetime import datetime
 from Sisyphus.Gui.Dashboard.utils.data_utils import load_data, GETTestLog
+from Sisyphus.Gui.Dashboard.utils.dataset_store import (
+    save_dataset, read_dataset, column_types_for_test_type,
+)
+from Sisyphus.Gui.Dashboard.utils import jobs
 from Sisyphus.RestApiV1 import get_hwitem, get_hwitems, get_hwitem_test
 from Sisyphus.Configuration import config
 from pathlib import Path
 import os
 import time
-import threading
 
 logger = config.getLogger(__name__)
 
-_plot_jobs = {}
+_plot_jobs = jobs.JobTable("plot", jobs.PRIORITY_BULK)
 
 LONG_TIMEOUTS = (
     (5, 60),
@@ -33,10 +36,26 @@ LONG_TIMEOUTS = (
 # ------------------------------------------------------------------
 PLOTS_FETCH_ITEM_EDITED_HISTORY = True
 
+# ------------------------------------------------------------------
+# Plots tab option: "Only fetch changed items"
+#
+# Every sync leaves a small state file next to the data it saved,
+# recording each item's listing record (as a hash), its edited
+# timestamp, and the row that was built for it. A delta sync walks the
+# listing as usual, but reuses the saved edited timestamp and test row
+# for any item whose listing record hasn't changed since, and only makes
+# the per-item requests for items that are new or changed.
+#
+# The listing doesn't show when a test was added, so a delta sync won't
+# notice a new test on an otherwise unchanged item. Do a full sync for
+# that.
+# ------------------------------------------------------------------
+SYNC_STATE_DIRNAME = ".sync_state"
+
 
-def _extract_latest_edited(history_resp):
+def _extract_latest_edited(history_item):
     """
-    Extract the latest specs-history timestamp from:
+    Extract the latest specs-history timestamp from the item returned by:
         get_hwitem(part_id, history=True)
 
     In the returned DataFrame this should become:
@@ -44,7 +63,7 @@ def _extract_latest_edited(history_resp):
     after load_data().
     """
     try:
-        specs = history_resp.get("data", {}).get("specifications", [])
+        specs = history_item.get("specifications", [])
         if not isinstance(specs, list):
             return None
 
@@ -63,20 +82,61 @@ def _extract_latest_edited(history_resp):
         return None
 
 
-def _fetch_item_edited(part_id):
+# (one extra REST request per PID)
+EDITED_HISTORY_TIMEOUTS = [(5, 20), (5, 45), (5, 90)]
+
+def _item_fingerprint(item):
+    text = json.dumps(item, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _sync_state_path(save_dir, typeid, testtype, args):
     """
-    One extra REST request per PID.
+    One state file per type, test type, and set of pre-filters, since a
+    different filter gives a different listing.
     """
+    key = json.dumps({
+        "typeid": typeid,
+        "testtype": testtype,
+        "args": args,
+        "edited": PLOTS_FETCH_ITEM_EDITED_HISTORY,
+    }, sort_keys=True, default=str)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+    return Path(save_dir) / SYNC_STATE_DIRNAME / f"{digest}.pkl"
+
+
+def _load_sync_state(path):
     try:
-        resp = get_hwitem(
-            part_id,
-            history=True,
-            timeouts=[(5, 20), (5, 45), (5, 90)],
-        )
-        return _extract_latest_edited(resp)
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        logger.info(f"[Plots] No earlier sync to compare with; fetching everything")
     except Exception as e:
-        logger.warning(f"[Plots] Could not fetch edited timestamp for {part_id}: {e}")
-        return None
+        logger.warning(f"[Plots] Could not read sync state {path}: {e}")
+    return None
+
+
+def _save_sync_state(path, state):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning(f"[Plots] Could not save sync state {path}: {e}")
+
+
+def _get_working_dir():
+    pref_file = Path(config.active_profile.profile_dir) / "dash_user_preferences.txt"
+    if pref_file.exists():
+        working_dir = pref_file.read_text().strip()
+        if not os.path.isdir(working_dir):
+            working_dir = os.getcwd()
+    else:
+        working_dir = os.getcwd()
+    return working_dir
+
 
 def normalize_scalar_lists(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
@@ -105,8 +165,6 @@ def normalize_scalar_lists(df: pd.DataFrame) -> pd.DataFrame:
 
 def _plot_sync_worker(job_id):
     
-    executor = ra_util._executor
-
     job = _plot_jobs[job_id]
     args = job["args"]
     typeid = job["typeid"]
@@ -116,46 +174,96 @@ def _plot_sync_worker(job_id):
         testtype = None
 
     try:
-        resp = get_hwitems(**args)
-        #resp = get_hwitems(
-        #    **args,
-        #    timeouts=LONG_TIMEOUTS,
-        #)
-        items = resp["data"]
-        total = len(items)
-        #job["total"] = total
-
         # If enabled, we do two phases:
         #   Phase 1: fetch ITEM edited timestamp
         #   Phase 2: fetch test data OR append item data
         # If disabled, we only do the original one phase.
         fetch_item_edited_history = PLOTS_FETCH_ITEM_EDITED_HISTORY
 
-        job["total"] = total * 2 if fetch_item_edited_history else total
+        # Create subdirectory based on typeid, create one if it doesn't exist
+        save_dir = Path(_get_working_dir()) / typeid
+        save_dir.mkdir(parents=True, exist_ok=True)
+
+        state_path = _sync_state_path(save_dir, typeid, testtype, args)
+        prev_state = _load_sync_state(state_path) if job.get("delta") else None
+        prev_items = (prev_state or {}).get("items", {})
+        prev_edited = (prev_state or {}).get("edited", {})
+        prev_rows = (prev_state or {}).get("rows", {})
+
         job["processed"] = 0
         results = []
         edited_lookup = {}
+        fingerprints = {}
+        reused = set()
+        failed = set()
+
+        def _can_reuse(pid, fingerprint):
+            if not pid or prev_items.get(pid) != fingerprint:
+                return False
+            if fetch_item_edited_history and pid not in prev_edited:
+                return False
+            if testtype and pid not in prev_rows:
+                return False
+            return True
+
+        # Walk the listing page by page, yielding the PIDs that need their
+        # edited timestamp looked up.
+        list_args = {k: v for k, v in args.items() if k not in ("part_type_id", "size")}
+        items = []
+        def walk_listing():
+            for it in ra_util.iter_hwitems(args["part_type_id"], **list_args):
+                jobs.check_cancelled()
+                items.append(it)
+                pid = it.get("part_id")
+                if pid:
+                    fingerprints[pid] = _item_fingerprint(it)
+                    if _can_reuse(pid, fingerprints[pid]):
+                        reused.add(pid)
+                        if fetch_item_edited_history:
+                            edited_lookup[pid] = prev_edited[pid]
+                        continue
+                job["total"] = len(items) * 2 if fetch_item_edited_history else len(items)
+                if pid:
+                    yield pid
 
         if fetch_item_edited_history:
             # ------------------------------------------------------------
             # Phase 1: Fetch latest edited timestamp per item
             # ------------------------------------------------------------
-            edit_futures = {}
-            for it in items:
-                pid = it.get("part_id")
-                if pid:
-                    edit_futures[executor.submit(_fetch_item_edited, pid)] = pid
-                    
-            for idx, f in enumerate(edit_futures):
-                pid = edit_futures[f]
-                try:
-                    edited_lookup[pid] = f.result()
-                except Exception as e:
-                    logger.warning(f"[Plots] edited lookup failed for {pid}: {e}")
+            # The lookups are submitted as the listing's pages arrive, so
+            # they overlap with the download of the remaining pages. They
+            # run as this job's tasks, so they're dropped if it's cancelled.
+            # An item whose lookup fails is marked as failed, so that the
+            # next delta sync looks it up again instead of reusing a None.
+            looked_up = 0
+            for result in ra_util.fetch_hwitems_bulk(walk_listing(), ("item",),
+                        submit=jobs.submit_task, history=True,
+                        timeouts=EDITED_HISTORY_TIMEOUTS):
+                jobs.check_cancelled()
+                pid = result.part_id
+                if result.errors:
+                    logger.warning(f"[Plots] edited lookup failed for {pid}: "
+                                    f"{result.errors['Item']}")
                     edited_lookup[pid] = None
-                    
-                job["processed"] = idx + 1
+                    failed.add(pid)
+                else:
+                    edited_lookup[pid] = _extract_latest_edited(result.data["Item"])
+
+                looked_up += 1
+                job["processed"] = len(reused) + looked_up
+        else:
+            for _ in walk_listing():
+                pass
+
+        total = len(items)
+        job["total"] = total * 2 if fetch_item_edited_history else total
 
+        if prev_state is not None:
+            logger.info(f"[Plots] Delta sync: {len(reused)} of {total} items unchanged, "
+                        f"fetching {total - len(reused)}")
+
+        if fetch_item_edited_history:
+            job["processed"] = total
             for it in items:
                 pid = it.get("part_id")
                 it["edited"] = edited_lookup.get(pid)
@@ -171,15 +279,22 @@ def _plot_sync_worker(job_id):
         
         if testtype:
             # --- Fetch Test Data (TestLog) per item (PROGRESS LOOP) ---
-            futures = {
-                executor.submit(GETTestLog, it, testtype): it
+            # (Items that haven't changed since the last sync reuse its row.)
+            futures = [
+                prev_rows[it.get("part_id")] if it.get("part_id") in reused
+                    else jobs.submit_task(GETTestLog, it, testtype)
                 for it in items
-            }
+            ]
 
-            for idx, f in enumerate(futures):
-                it = futures[f]
+            for idx, (f, it) in enumerate(zip(futures, items)):
+                jobs.check_cancelled()
                 pid = it.get("part_id")
 
+                if pid in reused:
+                    results.append(f)
+                    job["processed"] = progress_offset + idx + 1
+                    continue
+
                 try:
                     row = f.result()
 
@@ -191,6 +306,7 @@ def _plot_sync_worker(job_id):
 
                 except Exception as e:
                     logger.error(f"[Plots] GETTestLog failed: {e}")
+                    failed.add(pid)
                     fallback = dict(it)
 
                     if fetch_item_edited_history:
@@ -257,30 +373,27 @@ def _plot_sync_worker(job_id):
         data = data[sorted_cols]
 
         #--- Also, save the loaded data locally ---
-        # Determine working directory
-        pref_file = Path(config.active_profile.profile_dir) / "dash_user_preferences.txt"
-        if pref_file.exists():
-            working_dir = pref_file.read_text().strip()
-            if not os.path.isdir(working_dir):
-                working_dir = os.getcwd()
-        else:
-            working_dir = os.getcwd()
-
-        # Create subdirectory based on typeid, create one if it doesn't exist
-        save_dir = Path(working_dir) / typeid
-        save_dir.mkdir(parents=True, exist_ok=True)
-        
         # Generate timestamped file name
         ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        pickle_filename = f"HWDB_downloaded_{typeid}_{ts}.pkl"
+        data_stem = f"HWDB_downloaded_{typeid}_{ts}"
         if testtype:
-            pickle_filename = f"HWDB_downloaded_{typeid}_{testtype}_{ts}.pkl"
-        pickle_path = save_dir / pickle_filename
-        
-        # Save the Pickle data
-        with open(pickle_path, "wb") as f:
-            #pickle.dump(data, f)
-            pickle.dump(data.copy(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            data_stem = f"HWDB_downloaded_{typeid}_{testtype}_{ts}"
+
+        # Save the data (Parquet, typed from the test type's definition
+        # where possible, or a pickle if pyarrow isn't installed)
+        data_path = save_dataset(data, save_dir / data_stem,
+                                    column_types_for_test_type(typeid, testtype))
+
+        # Remember what was fetched for each item, for the next delta sync
+        # (leaving out anything whose lookups failed, so they're retried)
+        _save_sync_state(state_path, {
+            "items": {pid: fp for pid, fp in fingerprints.items() if pid not in failed},
+            "edited": {pid: v for pid, v in edited_lookup.items() if pid not in failed},
+            "rows": {
+                it.get("part_id"): row for it, row in zip(items, results)
+                if testtype and it.get("part_id") and it.get("part_id") not in failed
+            },
+        })
 
         # --- Store result & mark done ---
         payload = data.to_dict("records")
@@ -302,7 +415,7 @@ def _plot_sync_worker(job_id):
 
         # Avoid to push full data into dcc.store.
         #job["data"] = payload
-        job["data_path"] = str(pickle_path) # Instead, save only a reference
+        job["data_path"] = str(data_path) # Instead, save only a reference
         job["columns"] = list(data.columns)
         job["done"] = True
 
@@ -476,7 +589,7 @@ def register_callbacks(app):
         if not done:
         #if not job["done"] or job.get("ui_done") is True:
             return (
-                f"{pct}% completed...",
+                "Waiting for other syncs..." if _plot_jobs.is_queued(job_id) else f"{pct}% completed...",
                 {
                     "fontSize": "20px",
                     "padding": "14px 32px",
@@ -557,6 +670,7 @@ def register_callbacks(app):
         State("upload-json", "filename"), # for loading a local file
         State("typeid-input", "value"),
         State("testtype-input", "value"),
+        State("delta-sync-toggle", "value"),
         
         Input("prefilter-pid", "value"),
         Input("prefilter-serialnum", "value"),
@@ -574,7 +688,7 @@ def register_callbacks(app):
         prevent_initial_call=True
     )
     #def load_json_file(n_clicks, upload_contents, upload_name, user_string, testtype_string, switch_value):
-    def load_json_file(n_clicks, upload_contents, upload_name, user_string, testtype_string,
+    def load_json_file(n_clicks, upload_contents, upload_name, user_string, testtype_string, delta_toggle,
                            pre_pid, pre_serial, pre_manu, pre_creator, pre_comments, pre_location,
                            pre_country, pre_institution, pre_status, pre_installed, pre_cert, pre_uploaded):
 
@@ -628,7 +742,6 @@ def register_callbacks(app):
                 # --- Setting up the Pre-Filters ---
                 args = {
                     "part_type_id"      : None,
-                    "size"              : None,
                     "part_id"           : None,
                     "serial_number"     : None,
                     "manufacturer"      : None,
@@ -643,7 +756,6 @@ def register_callbacks(app):
                     "is_installed"      : None,
                 }
                 args["part_type_id"] = user_string
-                args["size"]         = 99999
                 #+++++++++
                 if pre_pid is not None:
                     args["part_id"] = pre_pid
@@ -701,24 +813,16 @@ def register_callbacks(app):
 
                 # Register job
                 job_id = f"PLOT-{int(time.time()*1000)}"
-                global _plot_jobs
-                _plot_jobs[job_id] = {
+                _plot_jobs.submit(job_id, {
                     "processed": 0,
                     "total": 0,
                     "done": False,
                     "error": None,
                     "typeid": user_string,
                     "testtype": testtype_string,
+                    "delta": "delta" in (delta_toggle or []),
                     "args": args  # store filters
-                }
-
-                # Launch background thread
-                thread = threading.Thread(
-                    target=_plot_sync_worker,
-                    args=(job_id,),
-                    daemon=True,
-                )
-                thread.start()
+                }, _plot_sync_worker, job_id)
         
                 # start polling + disable button + show 0%
                 orange = {
@@ -777,6 +881,9 @@ def register_callbacks(app):
                 if ext in [".pkl", ".pickle"]:
                     # --- Pickle ---
                     df = pickle.loads(decoded)
+                elif ext in [".parquet"]:
+                    # --- Parquet ---
+                    df = read_dataset(io.BytesIO(decoded)).reset_index(drop=True)
                 elif ext in [".csv"]:
                     # --- CSV ---
                     df = pd.read_csv(io.StringIO(decoded.decode("utf-8")))
@@ -786,10 +893,7 @@ def register_callbacks(app):
                 # Save file to a temp / working location
                 pref_file = Path(config.active_profile.profile_dir) / "dash_user_preferences.txt"
                 working_dir = pref_file.read_text().strip() if pref_file.exists() else os.getcwd()
-                save_path = Path(working_dir) / upload_name
-
-                with open(save_path, "wb") as f:
-                    pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+                save_path = save_dataset(df, Path(working_dir) / Path(upload_name).stem)
 
                 meta = {
                     "path": str(save_path),
@@ -9,6 +9,8 @@ import numpy as np
 import plotly.express as px
 import pickle
 
+from Sisyphus.Gui.Dashboard.utils.data_resolver import load_df_from_store
+
 logger = config.getLogger(__name__)
 
 def register_callbacks(app):
@@ -61,8 +63,7 @@ def register_callbacks(app):
 
         try:
             # Load FULL dataframe (pickle created by main loader)
-            with open(filtered_store_data["path"], "rb") as f:
-                df_full = pickle.load(f)
+            df_full = load_df_from_store(filtered_store_data)
 
             # Apply row selection
             main_df = df_full.iloc[filtered_store_data["row_indices"]].copy()
@@ -6,66 +6,91 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import ast
+import itertools
 import pickle
 
 from Sisyphus.Configuration import config
 logger = config.getLogger(__name__)
 
+from Sisyphus.Gui.Dashboard.utils.data_resolver import load_df_from_store, memoize
+from Sisyphus.Gui.Dashboard.utils.dataset_store import is_parquet
+
+# Column used to remember which row of the full DataFrame an expanded row
+# came from
+_ROW_ID = "\0row"
+
+# Scatter plots with more points than this are binned here and sent to the
+# browser as a heatmap of counts (SCATTER_BINS x SCATTER_BINS), rather than
+# sending every point
+MAX_SCATTER_POINTS = 200_000
+SCATTER_BINS = 400
+
 def register_callbacks(app):
 
     #--------------------------------
     # to deal with lists:
 
+    def list_lengths(values):
+        # len() of each list, and 1 for anything that isn't a list
+        return np.fromiter((len(v) if isinstance(v, list) else 1 for v in values),
+                            dtype=np.int64, count=len(values))
+
+    def flatten_lists(values, lengths):
+        # The list items (and the non-list values) of a column, end to end
+        flat = itertools.chain.from_iterable(v if isinstance(v, list) else (v,) for v in values)
+        return np.fromiter(flat, dtype=object, count=int(lengths.sum()))
+
+    def as_column(values):
+        return pd.Series(values, dtype=object).infer_objects()
+
     #Expand list to columns
     def explode_list_column(df, col):
         if df is None or df.empty or col not in df.columns:
             return df.copy() if df is not None else pd.DataFrame()
         
+        values = df[col].to_numpy(dtype=object)
+
         #If the column does not have any list type values
-        if not df[col].apply(lambda v: isinstance(v, list)).any():
+        if not any(isinstance(v, list) for v in values):
             return df.copy()
         
-        rows = []
-        for _, row in df.iterrows():
-            val = row[col]
-            if isinstance(val, list):
-                for item in val:
-                    #nr = row.copy()
-                    nr = row.to_dict()
-                    nr[col] = item
-                    rows.append(nr)
-                
-            else: 
-                
-                rows.append(row.to_dict())
-
-        return pd.DataFrame(rows)
+        # Each row is repeated once per item in its list (and dropped if
+        # the list is empty)
+        lengths = list_lengths(values)
+        flat = flatten_lists(values, lengths)
+
+        out = df.iloc[np.repeat(np.arange(len(df)), lengths)].reset_index(drop=True)
+        out[col] = as_column(flat)
+        return out
         
     def explode_two_lists(df, col_x, col_y):
 
         if df is None or df.empty or col_x not in df.columns or col_y not in df.columns:
             return df.copy() if df is not None else pd.DataFrame()
                     
-        rows = []
-        for _, row in df.iterrows():
-            vx = row[col_x] if isinstance(row[col_x], list) else [row[col_x]]
-            vy = row[col_y] if isinstance(row[col_y], list) else [row[col_y]]
-
-            L = max(len(vx), len(vy))
-        
-            vx = list(vx) + [np.nan] * (L - len(vx))
-            vy = list(vy) + [np.nan] * (L - len(vy))
-
-            base = row.drop([col_x, col_y]).to_dict()
-            
-            
-            for i in range(L):
-                nr = dict(base)
-                nr[col_x] = vx[i]
-                nr[col_y] = vy[i]
-                rows.append(nr)   
-            
-        return pd.DataFrame(rows)
+        # Each row is repeated as many times as the longer of its two lists,
+        # and the shorter one is padded with NaN
+        vx = df[col_x].to_numpy(dtype=object)
+        vy = df[col_y].to_numpy(dtype=object)
+        lx, ly = list_lengths(vx), list_lengths(vy)
+        L = np.maximum(lx, ly)
+
+        rows = np.repeat(np.arange(len(df)), L)
+        # position of each output row within its input row's lists
+        pos = np.arange(int(L.sum())) - np.repeat(np.cumsum(L) - L, L)
+
+        def gather(values, lengths):
+            flat = flatten_lists(values, lengths)
+            offsets = np.repeat(np.cumsum(lengths) - lengths, L)
+            present = pos < np.repeat(lengths, L)
+            out = np.full(len(pos), np.nan, dtype=object)
+            out[present] = flat[(offsets + pos)[present]]
+            return as_column(out)
+
+        base = df.drop(columns=[col_x, col_y]).iloc[rows].reset_index(drop=True)
+        base[col_x] = gather(vx, lx)
+        base[col_y] = gather(vy, ly)
+        return base
 
     def build_hist2d(df, x, y, numbins):
         try:
@@ -81,6 +106,30 @@ def register_callbacks(app):
             logger.error(f"Error creating 2D histogram: {e}")
             return go.Figure()
     
+    def binned_scatter(df, x, y):
+        # Returns None if either axis isn't (mostly) numeric
+        xs = pd.to_numeric(df[x], errors="coerce").to_numpy(dtype=float)
+        ys = pd.to_numeric(df[y], errors="coerce").to_numpy(dtype=float)
+        keep = np.isfinite(xs) & np.isfinite(ys)
+        if keep.sum() < 0.8 * len(df):
+            return None
+
+        counts, xedges, yedges = np.histogram2d(xs[keep], ys[keep], bins=SCATTER_BINS)
+        z = counts.T
+        z[z == 0] = np.nan
+
+        fig = go.Figure(go.Heatmap(
+            x=(xedges[:-1] + xedges[1:]) / 2,
+            y=(yedges[:-1] + yedges[1:]) / 2,
+            z=z,
+            colorscale="Viridis",
+            colorbar=dict(title="points"),
+            hovertemplate=f"{x}: %{{x}}<br>{y}: %{{y}}<br>points: %{{z}}<extra></extra>",
+        ))
+        fig.update_xaxes(title_text=x)
+        fig.update_yaxes(title_text=y)
+        return fig
+
     #########################################
     def safe_list(v):
         if isinstance(v, list):
@@ -96,6 +145,61 @@ def register_callbacks(app):
                     # fallthrough: return original string if parsing fails
                     pass
         return v
+
+    def holds_objects(s):
+        # Numeric columns can't hold lists (or more than one type of value)
+        return s.dtype.kind not in "biufc"
+
+    def lists_to_scalars(df):
+        # Convert any list remnants to scalars if they somehow remain
+        for c in df.columns:
+            if df[c].dtype != object:
+                continue
+            if any(isinstance(v, list) for v in df[c].to_numpy()):
+                # If lists remain (unexpected), convert to string to keep things safe for plotting
+                df[c] = df[c].apply(lambda v: v if not isinstance(v, list) else (v[0] if len(v) > 0 else np.nan))
+        return df
+
+    def mixed_types_to_str(df):
+        # If column has mixed types → cast to string
+        df = df.copy()
+        for c in df.columns:
+            if holds_objects(df[c]) and len(set(map(type, df[c].to_numpy(dtype=object)))) > 1:
+                df[c] = df[c].astype(str)
+        return df
+
+    def expand_rows(df, list_cols, explode_cols, scalarize):
+        df = df.copy()
+        for c in list_cols:
+            if c and c in df.columns and holds_objects(df[c]):
+                df[c] = df[c].map(safe_list)
+        if len(explode_cols) == 2:
+            df = explode_two_lists(df, *explode_cols)
+        elif explode_cols:
+            df = explode_list_column(df, explode_cols[0])
+        if scalarize:
+            df = lists_to_scalars(df)
+        return df
+
+    def expanded_subset(data, DF, df_subset, list_cols, explode_cols, scalarize, projection):
+        '''Expands the rows of df_subset (a subset of the rows of DF)
+
+        Expanding is slow, so when DF came from a file, all of DF is
+        expanded once, and the rows for df_subset are picked out of that.
+        '''
+        list_cols = tuple(sorted(c for c in set(list_cols) if c))
+        if not (isinstance(data, dict) and "path" in data) or not DF.index.is_unique:
+            return expand_rows(df_subset, list_cols, explode_cols, scalarize)
+
+        def expand_all(_df):
+            tagged = DF.copy()
+            tagged[_ROW_ID] = DF.index
+            return expand_rows(tagged, list_cols, explode_cols, scalarize)
+
+        full = memoize(data, ("expanded", list_cols, tuple(explode_cols), scalarize), expand_all,
+                        **projection)
+        subset = full[full[_ROW_ID].isin(df_subset.index)]
+        return subset.drop(columns=[_ROW_ID]).reset_index(drop=True)
     #--------------------------------
 
 
@@ -140,20 +244,42 @@ def register_callbacks(app):
         if not data or data == {}:
             return dash.no_update, [], [], [] # Nov 12
 
+        invert = "exclude" in (invert_toggle or [])
+
+        # For Parquet datasets, only read the columns that are used, and
+        # let the reader skip rows that the value filter would drop anyway
+        # (just for "in": "not in" would also drop the empty cells).
+        projection = {"columns": None, "filters": None}
+        if isinstance(data, dict) and "path" in data and is_parquet(data["path"]):
+            projection["columns"] = [c for c in [plot_column, scatter_x, scatter_y, *(fields or [])] if c]
+            if value_filter and plot_column and not invert:
+                projection["filters"] = [(plot_column, "in", list(value_filter))]
+
         # --- Resolve dataframe from data-store ---
         if isinstance(data, dict) and "path" in data:
             try:
-                with open(data["path"], "rb") as f:
-                    DF = pickle.load(f)
+                try:
+                    DF = load_df_from_store(data, **projection)
+                except Exception as e:
+                    if not projection["filters"]:
+                        raise
+                    # e.g., the values don't match the column's type
+                    logger.debug(f"Reading without the value filter: {e}")
+                    projection["filters"] = None
+                    DF = load_df_from_store(data, **projection)
+                if projection["filters"] and len(DF.index) == 0:
+                    # Nothing matched; plot as if filtering afterwards
+                    projection["filters"] = None
+                    DF = load_df_from_store(data, **projection)
             except Exception as e:
                 logger.error(f"Failed to load pickle data for plotting: {e}")
                 raise PreventUpdate
         else:
             DF = pd.DataFrame(data)
 
-        invert = "exclude" in (invert_toggle or [])
-
-        if DF.empty or (plot_column and plot_column not in DF.columns):
+        # (a projection might have no columns, but still has rows)
+        no_rows = len(DF.index) == 0 if projection["columns"] is not None else DF.empty
+        if no_rows or (plot_column and plot_column not in DF.columns):
             return dash.no_update, [], [], []
         #DF = pd.DataFrame(data)
         #invert = "exclude" in (invert_toggle or [])
@@ -184,15 +310,18 @@ def register_callbacks(app):
         
 
         # If column has mixed types → cast to string
-        for c in DF.columns:
-            if DF[c].map(type).nunique() > 1:
-                DF[c] = DF[c].astype(str)
+        if isinstance(data, dict) and "path" in data:
+            DF = memoize(data, "mixed types to str", mixed_types_to_str, **projection)
+        else:
+            DF = mixed_types_to_str(DF)
         
         # --- Basic validation ---
         if DF is None or DF.empty:
             return go.Figure(), [], [], []
 
-        df_filtered = DF.copy()
+        # (DF is shared with other callbacks, so these are shallow copies,
+        # and none of them are modified in place)
+        df_filtered = DF.copy(deep=False)
 
         
         # Filter by selected value
@@ -203,12 +332,12 @@ def register_callbacks(app):
                 df_filtered = df_filtered[df_filtered[plot_column].isin(value_filter)]
 
         # keep a “base” dataframe for per-condition plotting
-        df_base = df_filtered.copy()
+        df_base = df_filtered.copy(deep=False)
 
                 
         # --- Apply all conditions to build final filtered subset ---
        
-        df_filtered = df_base.copy()
+        df_filtered = df_base.copy(deep=False)
 
         if apply_clicks and any(apply_clicks):
             condition_masks = []
@@ -236,7 +365,7 @@ def register_callbacks(app):
 
 
         # --- Freeze ITEM-level dataframe (never expand this) ---
-        df_for_store = df_filtered.copy()
+        df_for_store = df_filtered.copy(deep=False)
 
         # Determine selected chart type
         primary = chart_type or "histogram"
@@ -258,56 +387,37 @@ def register_callbacks(app):
         
 
         
-        # (Choose which dataframe to use for plotting)
-        df_plot = df_filtered.copy()
-        
         #--------------------------------
         # to deal with lists:
 
-        try:
-            # Only attempt normalization on relevant columns to limit work:
-            cols_to_check = set()
-            if plot_column:
-                cols_to_check.add(plot_column)
-            if scatter_x:
-                cols_to_check.add(scatter_x)
-            if scatter_y:
-                cols_to_check.add(scatter_y)
-
-            # Apply safe_list to those columns (if they exist in df_plot)
-            for c in list(cols_to_check):
-                if c and c in df_plot.columns:
-                    df_plot[c] = df_plot[c].apply(safe_list)
-        except Exception as e:
-            logger.error(f"Error normalizing list-like columns: {e}")
-
+        # Only attempt normalization on relevant columns to limit work:
+        cols_to_check = [plot_column, scatter_x, scatter_y]
 
         try:
             #if primary_base in ("scatter", "hist2d"):
             if primary_base == "scatter" or primary_base == "hist2d":
                 # For scatter expand both scatter_x and scatter_y if they are list-like
-                if scatter_x and scatter_y and scatter_x in df_plot.columns and scatter_y in df_plot.columns:
+                if scatter_x and scatter_y and scatter_x in df_filtered.columns and scatter_y in df_filtered.columns:
                     # Only expand two lists (handles non-lists gracefully)
-                    df_plot = explode_two_lists(df_plot, scatter_x, scatter_y)
+                    explode_cols = (scatter_x, scatter_y)
                 else:
                     # Not enough information to plot scatter
-                    df_plot = df_plot.copy()
+                    explode_cols = ()
             else:
                 # For histogram, cumhist, box, line -> expand only the plot_column if it contains lists
-                if plot_column and plot_column in df_plot.columns:
-                    df_plot = explode_list_column(df_plot, plot_column)
+                if plot_column and plot_column in df_filtered.columns:
+                    explode_cols = (plot_column,)
+                else:
+                    explode_cols = ()
+
+            df_plot = expanded_subset(data, DF, df_filtered, cols_to_check, explode_cols, True,
+                                        projection)
         except Exception as e:
             logger.error(f"Error expanding list columns for plotting: {e}")
             # fallback to unexpanded df
-            df_plot = df_filtered.copy()
+            df_plot = lists_to_scalars(df_filtered.copy())
 
         #--------------------------------
-
-        # Convert any list remnants in df_plot to scalars if they somehow remain
-        for c in df_plot.columns:
-            if df_plot[c].apply(lambda v: isinstance(v, list)).any():
-                # If lists remain (unexpected), convert to string to keep things safe for plotting
-                df_plot[c] = df_plot[c].apply(lambda v: v if not isinstance(v, list) else (v[0] if len(v) > 0 else np.nan))
                 
         # Helper for building px figures
         def build_px(chart, df, x=None, y=None):
@@ -344,6 +454,10 @@ def register_callbacks(app):
                     return px.box(df, y=y or plot_column)
                 elif chart == "scatter":
                     if x in df.columns and y in df.columns:
+                        if len(df) > MAX_SCATTER_POINTS:
+                            binned = binned_scatter(df, x, y)
+                            if binned is not None:
+                                return binned
                         return px.scatter(df, x=x, y=y)
                     else:
                         return go.Figure()
@@ -446,7 +560,7 @@ def register_callbacks(app):
                 if f not in df_base.columns:
                     continue
 
-                cond = df_base.copy()
+                cond = df_base.copy(deep=False)
                 try:
                     if op == "contains":
                         cond = cond[cond[f].astype(str).str.contains(str(t), case=False, na=False)]
@@ -461,15 +575,18 @@ def register_callbacks(app):
                     continue
 
                 # Expand lists consistently for plotting
-                cond_plot = cond.copy()
                 if primary_base in ("scatter", "hist2d") and scatter_x and scatter_y:
-                    cond_plot[scatter_x] = cond_plot[scatter_x].apply(safe_list) if scatter_x in cond_plot.columns else cond_plot.get(scatter_x)
-                    cond_plot[scatter_y] = cond_plot[scatter_y].apply(safe_list) if scatter_y in cond_plot.columns else cond_plot.get(scatter_y)
-                    cond_plot = explode_two_lists(cond_plot, scatter_x, scatter_y)
+                    if scatter_x in cond.columns and scatter_y in cond.columns:
+                        cond_plot = expanded_subset(data, DF, cond, (scatter_x, scatter_y),
+                                                    (scatter_x, scatter_y), False, projection)
+                    else:
+                        cond_plot = cond.copy()
                 else:
-                    if plot_column in cond_plot.columns:
-                        cond_plot[plot_column] = cond_plot[plot_column].apply(safe_list)
-                        cond_plot = explode_list_column(cond_plot, plot_column)
+                    if plot_column in cond.columns:
+                        cond_plot = expanded_subset(data, DF, cond, (plot_column,),
+                                                    (plot_column,), False, projection)
+                    else:
+                        cond_plot = cond.copy()
 
                 label = f"{f} {op} {t}"
 
@@ -526,13 +643,9 @@ def register_callbacks(app):
                 )
 
         else:
-            # No conditions → use existing px-based base plot
-            fig = build_px(
-                primary_base,
-                df_plot,
-                x=(scatter_x if primary_base in ("scatter", "hist2d") else (plot_column if primary_base == "line" else None)),
-                y=(scatter_y if primary_base in ("scatter", "hist2d") else None),
-            )
+            # No conditions → use existing px-based base plot (already
+            # built above)
+            pass
 
    
 
@@ -3,17 +3,17 @@ from dash.dependencies import Input, Output, State, MATCH
 import dash
 from dash.exceptions import PreventUpdate
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor
 import base64, io, json, pickle
 from datetime import datetime
 from Sisyphus.Gui.Dashboard.utils.data_utils import load_data, GETTestLog
 from Sisyphus.RestApiV1 import get_hwitem, get_hwitems, get_hwitem_locations, get_hwitem_image_list, get_image
+from Sisyphus.RestApiV1 import Utilities as ra_util
+from Sisyphus.Gui.Dashboard.utils import jobs
 from Sisyphus.Configuration import config
 from pathlib import Path
 import os
 import re
 import time
-import threading
 #import qrcode
 
 logger = config.getLogger(__name__)
@@ -21,7 +21,7 @@ logger = config.getLogger(__name__)
 # ============================================================
 #   GLOBAL SHIPMENT JOB REGISTRY (like Downloader)
 # ============================================================
-_shipment_jobs = {}   # jobid → {"processed", "total", "done", "error"}
+_shipment_jobs = jobs.JobTable("shipment", jobs.PRIORITY_BULK)   # jobid → {"processed", "total", "done", "error", "results"}
 
 
 # ============================================================
@@ -54,7 +54,7 @@ def _combinedItemsLocs(itemDATA):
     return each_item
 
 def _run_shipment_worker(jobid, items):
-    """Runs in background thread. Uses shared REST executor pool."""
+    """Runs as a background job. The lookups are run as the job's tasks."""
     job = _shipment_jobs[jobid]
     try:
         #resp = get_hwitems(typeid, size=99999)
@@ -62,50 +62,19 @@ def _run_shipment_worker(jobid, items):
         
         job["total"] = len(items)
 
-        from Sisyphus.RestApiV1 import Utilities as ra_util
-        executor = ra_util._executor
-
-        processed = 0
-        for _ in executor.map(lambda d: _combinedItemsLocs(d), items):
-            processed += 1
-            job["processed"] = processed
+        results = []
+        for each_item in jobs.map_tasks(_combinedItemsLocs, items):
+            jobs.check_cancelled()
+            results.append(each_item)
+            job["processed"] = len(results)
 
+        job["results"] = results
         job["done"] = True
 
     except Exception as e:
         job["error"] = str(e)
         logger.error(f"[Shipment Worker] {e}")
         
-def _fetch_shipments(typeid: str):
-    """Used only in the sync completion stage"""
-    
-    # No Component Type ID was provided...
-    if not typeid:
-        return []
-        
-    try:
-        resp = get_hwitems(typeid,size=99999)
-        
-        resp = resp["data"]
-
-        if not isinstance(resp, list):
-            logger.warning(f"[Shipment] get_hwitems() returned unexpected type: {type(resp)}")
-            return []
-
-        if not len(resp)>0:
-            return []
-        
-        # Let's use the global, persistent HWDB session pool used by all other Sisyphus REST utilities:
-        from Sisyphus.RestApiV1 import Utilities as ra_util
-        executor = ra_util._executor
-        results = list(executor.map(lambda d: _combinedItemsLocs(d), resp))
-
-        return results
-
-    except Exception as e:
-        logger.error(f"[Shipment] _fetch_shipments failed: {e}")
-        return []
-    
 # ============================================================
 #   CALLBACKS
 # ============================================================
@@ -120,7 +89,6 @@ def register_callbacks(app):
             Output("fetch-shipments", "children"),
             Output("fetch-shipments", "style"),
             Output("fetch-shipments", "disabled"),
-            Output("fetch-shipments-trigger", "data"),
             Output("shipment-total", "data"),
             Output("shipment-interval", "disabled"),
             Output("shipment-items-cache", "data"),
@@ -152,37 +120,28 @@ def register_callbacks(app):
 
         # fetch list of items to know the total
         try:
-            resp = get_hwitems(typeid, size=99999)
-            items = resp.get("data", [])
+            items = list(ra_util.iter_hwitems(typeid))
             total = len(items)
             logger.info(f"[Shipment Sync] Total items = {total}")
         except Exception as e:
             logger.error(f"[Shipment Sync] Fetch failed: {e}")
-            return "Error fetching shipments", syncing_style, False, None, None, True, None, None, None
+            return "Error fetching shipments", syncing_style, False, None, True, None, None, None
 
         if not total:
-            return "No Shipments found", syncing_style, False, None, 0, True, None, None, None
+            return "No Shipments found", syncing_style, False, 0, True, None, None, None
 
         # create a job id
         jobid = f"SHIP-{int(time.time()*1000)}"
-        _shipment_jobs[jobid] = {
+        _shipment_jobs.submit(jobid, {
             "processed": 0,
             "total": total,
             "done": False,
             "error": None,
-        }
-
-        # background thread
-        thread = threading.Thread(
-            target=_run_shipment_worker,
-            args=(jobid, items),
-            daemon=True,
-        )
-        thread.start()
+        }, _run_shipment_worker, jobid, items)
 
         logger.info("[Shipment] Shipment button clicked — showing 'Syncing...' feedback")
         
-        return "Syncing to the HWDB...", syncing_style, True, jobid, total, False, items, jobid, {"last_typeid": typeid}
+        return "Syncing to the HWDB...", syncing_style, True, total, False, items, jobid, {"last_typeid": typeid}
 
     # Pre-populate the input on startup
     @app.callback(
@@ -198,12 +157,15 @@ def register_callbacks(app):
     
     # --------------------------------------------------------
     # Poll background job status
+    # (when the job is done, its results are handed on through
+    # "shipment-results", so no callback has to wait for it)
     # --------------------------------------------------------
     @app.callback(
         Output("fetch-shipments", "children", allow_duplicate=True),
         Output("fetch-shipments", "style", allow_duplicate=True),
         Output("fetch-shipments", "disabled", allow_duplicate=True),
         Output("shipment-interval", "disabled", allow_duplicate=True),
+        Output("shipment-results", "data"),
         Input("shipment-interval", "n_intervals"),
         State("shipment-job-id", "data"),
         State("shipment-total", "data"),
@@ -216,17 +178,18 @@ def register_callbacks(app):
 
         job = _shipment_jobs.get(jobid)
         if not job:
-            return "Error: Job missing", None, False, True
+            return "Error: Job missing", None, False, True, no_update
 
         processed = job.get("processed", 0)
         done = job.get("done", False)
         err = job.get("error")
 
         if err:
-            return f"Error: {err}", {"backgroundColor":"#e74c3c"}, False, True
+            return f"Error: {err}", {"backgroundColor":"#e74c3c"}, False, True, no_update
 
         if not done:
             pct = int(processed * 100 / total) if total else 0
+            label = "Waiting for other syncs..." if _shipment_jobs.is_queued(jobid) else f"{pct}% completed..."
             style = {
                 "fontSize": "20px",
                 "padding": "14px 32px",
@@ -238,7 +201,7 @@ def register_callbacks(app):
                 "transition": "all 0.2s",
                 "marginRight": "50px",
             }
-            return f"{pct}% completed...", style, True, False
+            return label, style, True, False, no_update
 
         # finished → restore original look
         style = {
@@ -255,7 +218,7 @@ def register_callbacks(app):
         # remove this job so no more ticks can reuse stale data
         _shipment_jobs.pop(jobid, None)
 
-        return "Sync to the HWDB", style, False, True
+        return "Sync to the HWDB", style, False, True, job.get("results") or []
 
 
 
@@ -272,15 +235,14 @@ def register_callbacks(app):
             Output("fetch-shipments", "style",allow_duplicate=True),
             Output("fetch-shipments", "disabled",allow_duplicate=True),
         ],    
-        Input("fetch-shipments-trigger", "data"),
-        State("shipment-typeid", "value"),
+        Input("shipment-results", "data"),
         #State("shipments-selected-pid", "data"),
         #State("tg-cache", "data"),
         prevent_initial_call=True,
     )
 
-    def _sync_shipments(trigger_data,typeid):
-        if not trigger_data:
+    def _sync_shipments(data):
+        if data is None:
             raise dash.exceptions.PreventUpdate
 
         style = {
@@ -300,8 +262,6 @@ def register_callbacks(app):
             
         logger.info("[Shipment] fetch-shipments syncing...")
 
-
-        data = _fetch_shipments(typeid)
         if not len(data)>0:
             return [], [], "Sync to the HWDB", style, False
 
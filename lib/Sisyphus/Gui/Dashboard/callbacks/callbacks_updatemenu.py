@@ -7,6 +7,8 @@ import base64, io, json, pickle
 from Sisyphus.Configuration import config
 logger = config.getLogger(__name__)
 
+from Sisyphus.Gui.Dashboard.utils.data_resolver import columns_from_store
+
 
 # Update the dropdown menus based on the downloaded data
 def register_callbacks(app):
@@ -34,8 +36,7 @@ def register_callbacks(app):
         if not store or "path" not in store:
             raise PreventUpdate
 
-        with open(store["path"], "rb") as f:
-            df = pickle.load(f)
+        columns = columns_from_store(store)
         
-        options = [{"label": c, "value": c} for c in df.columns]
+        options = [{"label": c, "value": c} for c in columns]
         return options, options, options
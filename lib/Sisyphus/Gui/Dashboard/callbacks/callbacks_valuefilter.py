@@ -5,6 +5,8 @@ import dash
 from Sisyphus.Configuration import config
 logger = config.getLogger(__name__)
 
+from Sisyphus.Gui.Dashboard.utils.data_resolver import load_df_from_store
+
 
 # Filter variables
 def register_callbacks(app):
@@ -19,7 +21,11 @@ def register_callbacks(app):
         if chart_type in ("scatter", "hist2d"):
             return []
         
-        DF = pd.DataFrame(data)
+        # (only the selected column is needed)
+        if isinstance(data, dict) and "path" in data:
+            DF = load_df_from_store(data, columns=[selected_column] if selected_column else [])
+        else:
+            DF = pd.DataFrame(data)
         
         if DF is None or DF.empty or not selected_column or selected_column not in DF.columns:
             return []
@@ -270,11 +270,22 @@ def plots_layout():
                             "marginRight": "50px",
                         },
                     ),
+                    # Reuse the last sync's data for items that haven't changed
+                    dbc.Checklist(
+                        id="delta-sync-toggle",
+                        options=[
+                            {"label": "Only fetch changed items", "value": "delta"}
+                        ],
+                        value=[],
+                        switch=True,
+                        persistence=True,
+                        style={"marginRight": "50px"},
+                    ),
                     # Select JSON/CSV/PKL
                     dcc.Upload(
                         id="upload-json",
                         children=html.Button(
-                            "Select a file (csv/pkl)",
+                            "Select a file (csv/pkl/parquet)",
                             style={
                                 "fontSize": "20px",
                                 "padding": "14px 32px",
@@ -290,7 +301,7 @@ def plots_layout():
                             },
                         ),
                         multiple=False,
-                        accept=".pkl,.pickle,.csv",
+                        accept=".pkl,.pickle,.csv,.parquet",
                     ),
                     # Overlay CSV
                     dcc.Upload(
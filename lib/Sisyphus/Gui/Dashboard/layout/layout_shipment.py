@@ -7,7 +7,6 @@ def shipment_layout():
         style={"padding": "15px"},
         children=[
 
-            dcc.Store(id="fetch-shipments-trigger", storage_type="memory"),
             dcc.Store(id="shipments-selected-pid",data={"pid": None},storage_type="local"),   # ✅ persist selection
             dcc.Store(id="fetch-shipments-store", storage_type="memory"),  # persist synced shipment data until refresh
             dcc.Store(id="shippinglabel-id-store"),
@@ -19,6 +18,7 @@ def shipment_layout():
             dcc.Store(id="shipment-total", storage_type="memory"),
             dcc.Store(id="shipment-processed", storage_type="memory"),
             dcc.Store(id="shipment-items-cache", storage_type="memory"),
+            dcc.Store(id="shipment-results", storage_type="memory"),
             dcc.Store(id="launch-workflow-request", storage_type="memory"),
             dcc.Store(id="launch-workflow-opened", storage_type="memory"),
             # Title
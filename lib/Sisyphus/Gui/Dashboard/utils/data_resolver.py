@@ -1,12 +1,204 @@
+import os
 import pickle
+import threading
+from collections import OrderedDict
+
 import pandas as pd
 
-def load_df_from_store(store):
+from Sisyphus.Configuration import config
+logger = config.getLogger(__name__)
+
+from Sisyphus.Gui.Dashboard.utils.dataset_store import is_parquet, read_dataset, dataset_columns
+
+# The data-store only holds the path of the pickled DataFrame, so every
+# callback that needs the data used to load the whole pickle again. Loaded
+# DataFrames are kept here instead, keyed by the path and the file's mtime
+# (so a file that's rewritten is loaded again), and the least recently used
+# ones are dropped when they add up to more than MAX_CACHE_BYTES.
+#
+# The DataFrames are shared between callbacks, so callers must not modify
+# them in place. Anything derived from one (e.g., with list columns
+# exploded) can be kept alongside it with memoize(), and is dropped with it.
+#
+# Parquet datasets can be read a few columns (and rows) at a time, so for
+# those, each projection is cached separately. For pickles, the whole
+# DataFrame is always loaded, and 'columns' and 'filters' are ignored, so
+# callers must still select the columns and filter the rows themselves.
+#
+# _cache_lock is only held to look things up, add them, and drop them, not
+# while reading a file or computing a derived value. If a second callback
+# asks for something that's already being loaded, it waits for that instead
+# of loading it again.
+MAX_CACHE_BYTES = 1024 ** 3
+
+class _Entry:
+    def __init__(self, df, nbytes):
+        self.df = df
+        self.nbytes = nbytes
+        self.derived = {}
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.RLock()
+_loading = {} # key -> Event that's set when it's done loading
+_MISSING = object()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _frame_bytes(obj):
+    try:
+        if isinstance(obj, pd.DataFrame):
+            return int(obj.memory_usage(index=True, deep=True).sum())
+        if isinstance(obj, pd.Series):
+            return int(obj.memory_usage(index=True, deep=True))
+    except Exception:
+        pass
+    return 0
+
+def _cache_key(path, columns=None, filters=None):
+    st = os.stat(path)
+    if not is_parquet(path):
+        columns = filters = None
+    return (os.path.realpath(path), st.st_mtime_ns, st.st_size,
+                None if columns is None else tuple(columns),
+                None if not filters else repr(filters))
+
+def _evict(keep=None):
+    global _cache_bytes
+    while _cache_bytes > MAX_CACHE_BYTES and len(_cache) > 1:
+        key, entry = next(iter(_cache.items()))
+        if key == keep:
+            break
+        del _cache[key]
+        _cache_bytes -= entry.nbytes
+        _stats["evictions"] += 1
+        logger.debug(f"Dropped cached DataFrame {key[0]} ({entry.nbytes} bytes)")
+
+def _load_once(key, lookup, load, store):
+    '''Returns lookup(), or else load(), making sure only one thread loads it
+
+    lookup() and store(value) are called with _cache_lock held, and load()
+    without it. lookup() returns _MISSING if it isn't there.
+    '''
+    while True:
+        with _cache_lock:
+            value = lookup()
+            if value is not _MISSING:
+                return value
+            done = _loading.get(key)
+            if done is None:
+                done = _loading[key] = threading.Event()
+                break
+        # Someone else is loading it. When they're done, it should be there
+        # (unless it failed, or was dropped already, and then we try it)
+        done.wait()
+
+    try:
+        value = load()
+        with _cache_lock:
+            store(value)
+        return value
+    finally:
+        with _cache_lock:
+            del _loading[key]
+        done.set()
+
+def _get_entry(path, columns=None, filters=None):
+    key = _cache_key(path, columns, filters)
+
+    def lookup():
+        entry = _cache.get(key)
+        if entry is None:
+            return _MISSING
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return entry
+
+    def load():
+        with _cache_lock:
+            _stats["misses"] += 1
+        if is_parquet(path):
+            df = read_dataset(path, columns=columns, filters=filters)
+        else:
+            with open(path, "rb") as f:
+                df = pickle.load(f)
+        return _Entry(df, _frame_bytes(df))
+
+    def store(entry):
+        global _cache_bytes
+        # Any older versions of the same file won't be asked for again
+        for old_key in [k for k in _cache if k[0] == key[0] and k[1:3] != key[1:3]]:
+            _cache_bytes -= _cache.pop(old_key).nbytes
+
+        _cache[key] = entry
+        _cache_bytes += entry.nbytes
+        _evict(keep=key)
+
+    return key, _load_once(key, lookup, load, store)
+
+def load_df_from_store(store, columns=None, filters=None):
+    '''The store's DataFrame
+
+    columns: the columns needed (others may come too)
+    filters: the rows needed, as pyarrow-style (column, op, value) tuples
+             (other rows may come too)
+    '''
     if not store or "path" not in store:
         return pd.DataFrame()
 
-    with open(store["path"], "rb") as f:
-        return pickle.load(f)
+    return _get_entry(store["path"], columns, filters)[1].df
+
+def columns_from_store(store):
+    '''The column names of the store's DataFrame (without reading it, if possible)'''
+    if not store or "path" not in store:
+        return []
+    if is_parquet(store["path"]):
+        return dataset_columns(store["path"])
+    return list(load_df_from_store(store).columns)
+
+def memoize(store, name, func, columns=None, filters=None):
+    '''Returns func(df) for the store's DataFrame, computing it only once
+
+    'name' must identify what func computes (e.g., ("explode", "col_x")).
+    'columns' and 'filters' are as for load_df_from_store.
+    '''
+    key, entry = _get_entry(store["path"], columns, filters)
+
+    nbytes = 0
+
+    def lookup():
+        return entry.derived.get(name, _MISSING)
+
+    def load():
+        nonlocal nbytes
+        value = func(entry.df)
+        nbytes = _frame_bytes(value)
+        return value
+
+    def save(value):
+        global _cache_bytes
+        # The entry might have been dropped while computing
+        if _cache.get(key) is entry:
+            entry.derived[name] = value
+            entry.nbytes += nbytes
+            _cache_bytes += nbytes
+            _evict(keep=key)
+
+    return _load_once((key, name), lookup, load, save)
+
+def clear_cache():
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+def cache_stats():
+    with _cache_lock:
+        return {
+            "entries": len(_cache),
+            "bytes": _cache_bytes,
+            "max_bytes": MAX_CACHE_BYTES,
+            **_stats,
+        }
 
 
 def apply_row_indices(df, indices):
@@ -0,0 +1,186 @@
+"""
+Stores the datasets downloaded by the Plots tab as Parquet files.
+
+A Parquet file is read a column at a time, so a callback that only needs
+one or two columns of a large dataset only reads those (see read_dataset),
+and row groups that can't match a filter are skipped without being read.
+The file is memory-mapped rather than copied in. Unlike a pickle, loading
+one can't run code, so datasets are safe to pass between users.
+
+Each file carries a ROW_COLUMN holding the row's position in the whole
+dataset. read_dataset makes it the index, so that rows read with a filter
+can still be matched up with rows read without one.
+
+If pyarrow isn't installed, datasets are pickled as before.
+"""
+
+from Sisyphus.Configuration import config
+logger = config.getLogger(__name__)
+
+from Sisyphus.RestApiV1 import get_test_types, get_test_type
+
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+DATASET_EXT = ".parquet" if HAVE_ARROW else ".pkl"
+ROW_COLUMN = "__row__"
+ROW_GROUP_SIZE = 64 * 1024
+
+def is_parquet(path) -> bool:
+    return str(path).lower().endswith(".parquet")
+
+#--------------------------------------------------------------------------
+# Schema
+#--------------------------------------------------------------------------
+def _arrow_type_for(example):
+    if isinstance(example, bool):
+        return pa.bool_()
+    if isinstance(example, (int, float)):
+        # placeholders like -1 are common, so don't assume integers
+        return pa.float64()
+    if isinstance(example, str):
+        return pa.string()
+    return None
+
+def column_types_from_datasheet(datasheet, prefix="TEST: test_data", sep="_"):
+    """
+    Guesses a type for each test data column from a test type's datasheet.
+
+    The datasheet gives either an example value, or a list of allowed
+    values, for each field. Nested fields are named the way load_data()
+    flattens them.
+    """
+    types = {}
+    for key, value in (datasheet or {}).items():
+        col = f"{prefix}{sep}{key}".replace(".", "_")
+        if isinstance(value, dict):
+            types.update(column_types_from_datasheet(value, col, sep))
+            continue
+        if isinstance(value, list):
+            value = next((v for v in value if v is not None), None)
+        arrow_type = _arrow_type_for(value) if HAVE_ARROW else None
+        if arrow_type is not None:
+            types[col] = arrow_type
+    return types
+
+def column_types_for_test_type(typeid, testtype):
+    """Column types from the latest specification of a test type, or {}"""
+    if not HAVE_ARROW or not testtype:
+        return {}
+    try:
+        resp = get_test_types(typeid)
+        test_type_id = next((t.get("id") for t in resp.get("data", [])
+                                if t.get("name") == testtype), None)
+        if test_type_id is None:
+            return {}
+        resp = get_test_type(typeid, test_type_id)
+        specs = resp.get("data", {}).get("properties", {}).get("specifications", [])
+        if not specs:
+            return {}
+        latest = max(specs, key=lambda s: s.get("version") or 0)
+        return column_types_from_datasheet(latest.get("datasheet"))
+    except Exception as e:
+        logger.warning(f"[Dataset] Could not get the test type definition for "
+                        f"{typeid}/{testtype}: {e}")
+        return {}
+
+#--------------------------------------------------------------------------
+# Writing
+#--------------------------------------------------------------------------
+def _to_arrow_array(series, arrow_type=None):
+    """
+    Uses the given type if the values fit it, then whatever Arrow infers,
+    and as a last resort (e.g., mixed types) stores the values as strings.
+    """
+    if arrow_type is not None:
+        try:
+            return pa.array(series, type=arrow_type, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            pass
+    try:
+        return pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return pa.array([None if v is None or (isinstance(v, float) and np.isnan(v))
+                            else str(v) for v in series], type=pa.string())
+
+def save_dataset(df, path, column_types=None) -> Path:
+    """
+    Saves a DataFrame and returns where it went.
+
+    'path' is given without an extension: DATASET_EXT is added.
+    """
+    path = Path(f"{path}{DATASET_EXT}")
+
+    if not HAVE_ARROW:
+        with open(path, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    column_types = column_types or {}
+    names = [str(c) for c in df.columns]
+    arrays = [_to_arrow_array(df.iloc[:, i], column_types.get(name))
+                    for i, name in enumerate(names)]
+    names.append(ROW_COLUMN)
+    arrays.append(pa.array(np.arange(len(df), dtype=np.int64)))
+
+    table = pa.Table.from_arrays(arrays, names=names)
+    pq.write_table(table, path, row_group_size=ROW_GROUP_SIZE)
+    return path
+
+#--------------------------------------------------------------------------
+# Reading
+#--------------------------------------------------------------------------
+def _to_list(value):
+    if isinstance(value, np.ndarray):
+        return [_to_list(v) for v in value.tolist()]
+    return value
+
+def dataset_columns(source) -> list:
+    """The column names of a Parquet dataset, without reading any data"""
+    names = pq.read_schema(source).names
+    return [n for n in names if n != ROW_COLUMN]
+
+def read_dataset(source, columns=None, filters=None) -> pd.DataFrame:
+    """
+    Reads a Parquet dataset (a path or a file-like object).
+
+    columns: only read these (the ones not in the dataset are ignored)
+    filters: rows to keep, as a list of (column, op, value) tuples, e.g.
+             [("TEST: status", "in", ["green", "yellow"])], which are
+             checked against each row group's statistics before it's read
+
+    List columns come back as Python lists, like they were before saving.
+    """
+    schema = pq.read_schema(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+    if columns is not None:
+        columns = [c for c in dict.fromkeys(columns) if c in schema.names and c != ROW_COLUMN]
+    if filters:
+        filters = [f for f in filters if f[0] in schema.names] or None
+
+    read_columns = columns
+    if columns is not None and ROW_COLUMN in schema.names:
+        read_columns = columns + [ROW_COLUMN]
+    table = pq.read_table(source, columns=read_columns, filters=filters, memory_map=True)
+    df = table.to_pandas()
+
+    for name in df.columns:
+        if pa.types.is_list(schema.field(name).type) or pa.types.is_large_list(schema.field(name).type):
+            df[name] = df[name].map(_to_list)
+
+    if ROW_COLUMN in df.columns:
+        df = df.set_index(ROW_COLUMN)
+        df.index.name = None
+    return df
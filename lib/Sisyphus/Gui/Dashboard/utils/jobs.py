@@ -0,0 +1,425 @@
+"""
+Runs the dashboard's long-running work (syncs, downloads, lookups) in the
+background, on a fixed number of threads shared by everyone using it.
+
+A callback starts a job with JobTable.submit() and gets back its job ID.
+The job's state (a dict the job updates with its progress, e.g.,
+"processed" and "total") is then looked up by ID, like the dicts of jobs
+it replaces, by the callback that polls for progress.
+
+Jobs have a priority. Lookups a user is waiting on (PRIORITY_INTERACTIVE)
+go ahead of bulk syncs and downloads (PRIORITY_BULK), and bulk jobs are
+only given some of the threads (MAX_RUNNING_BULK_JOBS), and only a couple
+per user (MAX_BULK_JOBS_PER_USER), so that one user's 20k item download
+can't hold up everyone else's clicks. Jobs that can't run yet wait in the
+queue.
+
+The HWDB requests a job makes in parallel go through submit_task() rather
+than a thread pool of its own. Tasks are run in priority order too, and
+tasks of the same priority are taken from each job in turn, so a job that
+has queued thousands of requests doesn't make a job that's just started
+wait for all of them.
+
+Cancelling a job (with cancel(), or by popping it from its JobTable
+before it's done) drops its queued tasks, and the job itself stops the
+next time it calls check_cancelled(). Jobs that nobody has asked about for
+ABANDON_AFTER seconds (e.g., the browser tab was closed) are cancelled,
+and finished jobs are forgotten after RESULT_TTL seconds.
+"""
+
+from Sisyphus.Configuration import config
+logger = config.getLogger(__name__)
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+try:
+    from flask import has_request_context, request
+except ImportError:
+    has_request_context = lambda: False
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 10
+PRIORITY_BULK = 20
+
+MAX_RUNNING_JOBS = 8
+MAX_RUNNING_BULK_JOBS = 4
+MAX_BULK_JOBS_PER_USER = 2
+NUM_TASK_THREADS = 32
+
+RESULT_TTL = 15 * 60
+ABANDON_AFTER = 5 * 60
+
+class JobCancelled(BaseException):
+    '''Raised by check_cancelled() when the job has been cancelled
+
+    (It isn't an Exception, so that the "except Exception" in the jobs,
+    which records the job as failed, lets it through.)
+    '''
+
+class _Job:
+    def __init__(self, job_id, kind, state, func, args, kwargs, priority, owner):
+        self.job_id = job_id
+        self.kind = kind
+        self.state = state
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.owner = owner
+        self.seq = next(_seq)
+
+        # queued, running, done, failed, or cancelled
+        self.status = "queued"
+        self.submitted_at = self.last_seen = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        self.cancelled = threading.Event()
+        self.tasks = set()
+        self.num_tasks = 0
+
+    @property
+    def is_bulk(self):
+        return self.priority >= PRIORITY_BULK
+
+_jobs = {}          # job_id -> _Job
+_queue = []         # the jobs waiting to run
+_jobs_cond = threading.Condition()
+
+_tasks = []         # heap of (priority, turn, seq, future, job, func, args, kwargs)
+_tasks_cond = threading.Condition()
+
+_seq = itertools.count()
+_local = threading.local()
+_threads = []
+_stats = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0, "abandoned": 0, "tasks": 0}
+
+def _current_job():
+    return getattr(_local, "job", None)
+
+def _current_user():
+    if has_request_context():
+        return request.remote_addr or "local"
+    return "local"
+
+def _start_threads():
+    # (called with _jobs_cond held)
+    if _threads:
+        return
+    for n in range(MAX_RUNNING_JOBS):
+        t = threading.Thread(target=_job_loop, name=f"dashboard-job-{n}", daemon=True)
+        t.start()
+        _threads.append(t)
+    for n in range(NUM_TASK_THREADS):
+        t = threading.Thread(target=_task_loop, name=f"dashboard-task-{n}", daemon=True)
+        t.start()
+        _threads.append(t)
+
+def _mark_stopped(state, message):
+    # Job states record failure in different ways, so fill in both
+    state["error"] = message
+    state["done"] = True
+    if "status" in state:
+        state["status"] = "error"
+        state["message"] = message
+
+#--------------------------------------------------------------------------
+# Jobs
+#--------------------------------------------------------------------------
+def _next_job():
+    # (called with _jobs_cond held)
+    running_bulk = {}
+    for job in _jobs.values():
+        if job.status == "running" and job.is_bulk:
+            running_bulk[job.owner] = running_bulk.get(job.owner, 0) + 1
+    total_bulk = sum(running_bulk.values())
+
+    for job in sorted(_queue, key=lambda j: (j.priority, j.seq)):
+        if job.is_bulk and (total_bulk >= MAX_RUNNING_BULK_JOBS
+                            or running_bulk.get(job.owner, 0) >= MAX_BULK_JOBS_PER_USER):
+            continue
+        _queue.remove(job)
+        return job
+    return None
+
+def _job_loop():
+    while True:
+        with _jobs_cond:
+            _prune()
+            job = _next_job()
+            while job is None:
+                _jobs_cond.wait(timeout=30)
+                _prune()
+                job = _next_job()
+            job.status = "running"
+            job.started_at = time.time()
+
+        _run(job)
+
+        with _jobs_cond:
+            # A thread (and maybe a user's bulk slot) is free
+            _jobs_cond.notify_all()
+
+def _run(job):
+    _local.job = job
+    try:
+        if job.cancelled.is_set():
+            raise JobCancelled()
+        job.func(*job.args, **job.kwargs)
+        status = "done"
+    except JobCancelled:
+        logger.info(f"[Jobs] {job.kind} job {job.job_id} was cancelled")
+        _mark_stopped(job.state, "Cancelled")
+        status = "cancelled"
+    except Exception as e:
+        logger.exception(f"[Jobs] {job.kind} job {job.job_id} failed: {e}")
+        _mark_stopped(job.state, str(e))
+        status = "failed"
+    finally:
+        _local.job = None
+
+    _cancel_tasks(job)
+    with _jobs_cond:
+        job.status = status
+        job.finished_at = time.time()
+        _stats[status] += 1
+
+def _prune():
+    # (called with _jobs_cond held)
+    now = time.time()
+    for job_id, job in list(_jobs.items()):
+        if job.finished_at is not None:
+            if now - job.finished_at > RESULT_TTL:
+                del _jobs[job_id]
+        elif now - job.last_seen > ABANDON_AFTER and not job.cancelled.is_set():
+            logger.info(f"[Jobs] Nobody is waiting for {job.kind} job {job_id}; cancelling it")
+            _stats["abandoned"] += 1
+            _cancel(job)
+
+def _cancel(job):
+    # (called with _jobs_cond held)
+    job.cancelled.set()
+    if job.status == "queued":
+        _queue.remove(job)
+        _mark_stopped(job.state, "Cancelled")
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        _stats["cancelled"] += 1
+    _cancel_tasks(job)
+
+def submit(kind, job_id, state, func, *args, priority=PRIORITY_NORMAL, **kwargs):
+    '''Queues func(*args, **kwargs) to run in the background
+
+    'state' is the job's state, which func should update as it goes (and
+    which is looked up through the JobTable for 'kind'). Returns job_id.
+    '''
+    job = _Job(job_id, kind, state, func, args, kwargs, priority, _current_user())
+    with _jobs_cond:
+        _start_threads()
+        _prune()
+        _jobs[job_id] = job
+        _queue.append(job)
+        _stats["submitted"] += 1
+        _jobs_cond.notify_all()
+    logger.debug(f"[Jobs] Queued {kind} job {job_id} for {job.owner} (priority {priority})")
+    return job_id
+
+def cancel(job_id):
+    '''Cancels a job, if it hasn't finished. Returns whether it was cancelled.'''
+    with _jobs_cond:
+        job = _jobs.get(job_id)
+        if job is None or job.finished_at is not None:
+            return False
+        _cancel(job)
+        return True
+
+def cancelled():
+    '''Whether the job this thread is running has been cancelled'''
+    job = _current_job()
+    return job is not None and job.cancelled.is_set()
+
+def check_cancelled():
+    '''Stops the job this thread is running, if it has been cancelled
+
+    Jobs should call this every so often (e.g., for each item).
+    '''
+    if cancelled():
+        raise JobCancelled()
+
+#--------------------------------------------------------------------------
+# Tasks
+#--------------------------------------------------------------------------
+def _task_loop():
+    _local.in_task = True
+    while True:
+        with _tasks_cond:
+            while not _tasks:
+                _tasks_cond.wait()
+            _, _, _, future, job, func, args, kwargs = heapq.heappop(_tasks)
+
+        if future.set_running_or_notify_cancel():
+            _local.job = job
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                _local.job = None
+
+        if job is not None:
+            with _tasks_cond:
+                job.tasks.discard(future)
+
+def _cancel_tasks(job):
+    with _tasks_cond:
+        tasks = list(job.tasks)
+        job.tasks.clear()
+    for future in tasks:
+        future.cancel()
+
+def submit_task(func, *args, **kwargs):
+    '''Runs func(*args, **kwargs) on the task threads, and returns a Future
+
+    The task gets the priority of the job that submits it (or, outside of
+    any job, PRIORITY_INTERACTIVE, unless task_priority() says otherwise),
+    and is dropped if the job is cancelled.
+    '''
+    job = _current_job()
+    future = Future()
+
+    if getattr(_local, "in_task", False):
+        # A task that waited for tasks of its own could end up holding
+        # every task thread, so these are just run right away
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    if job is not None and job.cancelled.is_set():
+        future.cancel()
+        return future
+
+    with _jobs_cond:
+        _start_threads()
+    with _tasks_cond:
+        if job is not None:
+            turn = job.num_tasks
+            job.num_tasks += 1
+            job.tasks.add(future)
+            priority = job.priority
+        else:
+            turn = 0
+            priority = getattr(_local, "priority", PRIORITY_INTERACTIVE)
+        heapq.heappush(_tasks, (priority, turn, next(_seq), future, job, func, args, kwargs))
+        _stats["tasks"] += 1
+        _tasks_cond.notify()
+    return future
+
+@contextmanager
+def task_priority(priority):
+    '''Sets the priority of the tasks submitted outside of any job'''
+    old = getattr(_local, "priority", PRIORITY_INTERACTIVE)
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = old
+
+def map_tasks(func, iterable):
+    '''Like Executor.map(), with submit_task()'''
+    futures = [submit_task(func, item) for item in iterable]
+    for future in futures:
+        yield future.result()
+
+#--------------------------------------------------------------------------
+# Looking up jobs
+#--------------------------------------------------------------------------
+class JobTable:
+    '''The jobs of one kind, looked up by job ID like a dict of their states
+
+    Looking a job up counts as someone still waiting for it (see
+    ABANDON_AFTER), unless it's done by the job itself.
+    '''
+    def __init__(self, kind, priority=PRIORITY_NORMAL):
+        self.kind = kind
+        self.priority = priority
+
+    def submit(self, job_id, state, func, *args, **kwargs):
+        return submit(self.kind, job_id, state, func, *args, priority=self.priority, **kwargs)
+
+    def _job(self, job_id):
+        with _jobs_cond:
+            job = _jobs.get(job_id)
+            if job is None or job.kind != self.kind:
+                return None
+            if _current_job() is None:
+                job.last_seen = time.time()
+            return job
+
+    def __contains__(self, job_id):
+        return self._job(job_id) is not None
+
+    def __getitem__(self, job_id):
+        job = self._job(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job.state
+
+    def get(self, job_id, default=None):
+        job = self._job(job_id)
+        return default if job is None else job.state
+
+    def is_queued(self, job_id):
+        job = self._job(job_id)
+        return job is not None and job.status == "queued"
+
+    def pop(self, job_id, default=None):
+        '''Forgets a job (cancelling it, if it hasn't finished)'''
+        with _jobs_cond:
+            job = _jobs.get(job_id)
+            if job is None or job.kind != self.kind:
+                return default
+            if job.finished_at is None:
+                _cancel(job)
+            del _jobs[job_id]
+            return job.state
+
+    def items(self):
+        with _jobs_cond:
+            return [(job_id, job.state) for job_id, job in _jobs.items() if job.kind == self.kind]
+
+    def __len__(self):
+        return len(self.items())
+
+def job_stats():
+    now = time.time()
+    with _jobs_cond:
+        jobs = [{
+            "id": job.job_id,
+            "kind": job.kind,
+            "owner": job.owner,
+            "priority": job.priority,
+            "status": job.status,
+            "processed": job.state.get("processed"),
+            "total": job.state.get("total"),
+            "age_s": round(now - job.submitted_at, 1),
+        } for job in _jobs.values()]
+    with _tasks_cond:
+        queued_tasks = len(_tasks)
+    return {
+        "jobs": jobs,
+        "queued_jobs": sum(1 for j in jobs if j["status"] == "queued"),
+        "running_jobs": sum(1 for j in jobs if j["status"] == "running"),
+        "queued_tasks": queued_tasks,
+        "max_running_jobs": MAX_RUNNING_JOBS,
+        "max_running_bulk_jobs": MAX_RUNNING_BULK_JOBS,
+        "max_bulk_jobs_per_user": MAX_BULK_JOBS_PER_USER,
+        **_stats,
+    }
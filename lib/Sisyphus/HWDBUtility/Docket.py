@@ -13,7 +13,7 @@ logger = config.getLogger(__name__)
 
 from Sisyphus.HWDBUtility.keywords import *
 from Sisyphus.HWDBUtility.Encoder import Encoder
-from Sisyphus.HWDBUtility.SheetReader import Sheet
+from Sisyphus.HWDBUtility.SheetReader import Sheet, load_workbook, clear_workbook_cache
 from Sisyphus.HWDBUtility.Source import Source
 
 import Sisyphus.RestApiV1 as ra
@@ -131,6 +131,9 @@ class Docket:
                 "Source": source,
                 "Sheet": sheet_obj
             })
+
+        # Every Sheet has what it needs now, so the raw workbooks can go
+        clear_workbook_cache()
         #}}}
     
     #--------------------------------------------------------------------------
@@ -188,7 +191,21 @@ class Docket:
     
     def apply_encoders(self):
         #{{{
-        jobs = []
+        return list(self.iter_jobs(release_sheets=False))
+        #}}}
+
+    #--------------------------------------------------------------------------
+
+    def iter_jobs(self, release_sheets=True):
+        #{{{
+        '''Yields the jobs for each sheet, one at a time
+
+        Each sheet is only encoded when the jobs before it have been taken,
+        so whatever is consuming the jobs can get started on them while
+        the later sheets are still being encoded. If release_sheets is
+        True, each sheet is let go once its jobs have been handed out, so
+        that its memory can be freed.
+        '''
         for sheet_node in self.sheets:
             #Style.info.print("applying encoder to sheet")
             
@@ -210,13 +227,14 @@ class Docket:
 
             job_list = encoder.encode(sheet)
 
+            if release_sheets:
+                sheet_node["Sheet"] = sheet = None
+
+            # The template only holds strings and the encoder, which is
+            # shared by every job from this sheet anyway, so don't copy it
             for job_unit in job_list:
-                job = deepcopy(job_template)
-                job["Data"] = job_unit
-                jobs.append(job)
+                yield {**job_template, "Data": job_unit}
                 #Style.error.print(json.dumps(job, indent=4))
-        
-        return jobs
         #}}}
 
 
@@ -335,8 +353,8 @@ class Docket:
             filename = src_node['Files'][0]
             ext = filename.split('.')[-1].casefold()
             if ext == 'xlsx' and 'Sheet Name' not in src_node:
-                excel_file = pd.ExcelFile(filename)
-                for sheet_name in excel_file.sheet_names:
+                # The Sheets made from these will use the same parsed copy
+                for sheet_name in load_workbook(filename).keys():
                     src_copy = deepcopy(src_node)
                     src_copy["Sheet Name"] = sheet_name
                     self.sources.append(src_copy)
@@ -13,7 +13,7 @@ logger = config.getLogger(__name__)
 import Sisyphus.RestApiV1 as ra
 import Sisyphus.RestApiV1.Utilities as ut
 
-from Sisyphus.HWDBUtility.SheetReader import Sheet, Cell
+from Sisyphus.HWDBUtility.SheetReader import Sheet, Cell, CellLocation
 from Sisyphus.HWDBUtility import TypeCheck as tc
 from Sisyphus.Utils.Terminal.Style import Style
 from Sisyphus.Utils.CI_dict import CI_dict
@@ -970,63 +970,107 @@ class Encoder:
         
         #......................................................................
 
-        def encode_group(sheet, row_index, parent_field_def):
-            #{{{ 
-            group_value = {} 
- 
+        def note_warnings(location, warnings):
+            #{{{
+            if not warnings:
+                return
+
+            loc_col, loc_row = location
+
+            if loc_row == "header":
+                if loc_col not in header_warnings:
+                    header_warnings[loc_col] = f"for field '{loc_col}': {warnings[-1]}"
+            elif loc_row == "inherited":
+                if loc_col not in global_warnings:
+                    global_warnings[loc_col] = f"for field '{loc_col}': {warnings[-1]}"
+            else:
+                row_warnings.setdefault(loc_row, {})[loc_col] = warnings[-1]
+            #}}}
+
+        #......................................................................
+
+        def compile_group(parent_field_def):
+            #{{{
+            # Work out where every field in the group gets its value from,
+            # once for the whole sheet, so that encoding a row is just a
+            # matter of going down the list. Values that don't come from the
+            # table (header, inherited, and fixed values, and defaults) are
+            # the same for every row, so they're only converted once. Table
+            # columns are converted a whole column at a time.
+            steps = []
+
             for schema_key, field_def in parent_field_def[KW_MEMBERS].items():
-                
+
                 if field_def[KW_TYPE] in ("group", "schema", "collection", "datasheet"):
-                    k, v = encode_group(sheet, row_index, field_def)
-                    group_value[schema_key] = {k: v} 
+                    steps.append((schema_key, "group", compile_group(field_def)))
                     continue
 
                 if KW_COLUMN in field_def:
-                    columns = deepcopy(field_def[KW_COLUMN])
-                    field_contents = sheet.coalesce(
-                                columns, 
-                                row_index, 
-                                field_def[KW_TYPE],
-                                field_def.get(KW_CHOICES)
-                            )
-                    if field_contents.location == "not found":
-                        field_contents.value = field_def[KW_DEFAULT]
-                elif KW_VALUE in field_def:
-                    field_contents = Cell(  
-                            source="encoder", 
-                            location=None,
-                            warnings=[], 
-                            datatype=field_def[KW_TYPE],
-                            value=field_def[KW_VALUE])
-                
-                # TODO: handle warnings
-                if field_contents.warnings:
-                    warnings = field_contents.warnings
-                    location = field_contents.location
-                    loc_col = location.column       
-                    loc_row = location.row
-                    
-                    if loc_row == "header":
-                        if loc_col not in header_warnings:
-                            header_warnings[loc_col] = f"for field '{loc_col}': {warnings[-1]}"
-                    elif loc_row == "inherited":
-                        if loc_col not in global_warnings:
-                            global_warnings[loc_col] = f"for field '{loc_col}': {warnings[-1]}"
+                    where, column = sheet.locate(field_def[KW_COLUMN])
+                    if where == "table":
+                        values, warnings = tc.cast_column(
+                                    sheet.column_values(column), field_def[KW_TYPE])
+                        if choices := field_def.get(KW_CHOICES):
+                            for index, value in enumerate(values):
+                                cell = sheet.apply_choices(
+                                            Cell(source=None, value=value,
+                                                    warnings=warnings.get(index, [])),
+                                            choices)
+                                values[index] = cell.value
+                                if cell.warnings:
+                                    warnings[index] = cell.warnings
+                        steps.append((schema_key, "column", (column, values, warnings)))
+                        continue
+                    elif where == "not found":
+                        value = field_def[KW_DEFAULT]
                     else:
-                        row_warnings.setdefault(loc_row, {})[loc_col] = warnings[-1]
+                        field_contents = sheet.coalesce(
+                                    field_def[KW_COLUMN], 
+                                    None, 
+                                    field_def[KW_TYPE],
+                                    field_def.get(KW_CHOICES)
+                                )
+                        note_warnings(field_contents.location, field_contents.warnings)
+                        value = field_contents.value
+                else:
+                    value = field_def.get(KW_VALUE, None)
 
-                    #conversion_warnings.append(f"
-                    #Style.warning.print("Conversion warning")
-                    #Style.warning.print(field_contents)
+                steps.append((schema_key, "constant", value))
 
-                group_value[schema_key] = field_contents.value
-            
             if parent_field_def[KW_TYPE] in ('collection', 'datasheet'):
-                key = ()
+                key_fields = None
             else:
-                key = tuple( group_value[key] for key in parent_field_def[KW_KEY])
-            
-            return key, group_value
+                key_fields = parent_field_def[KW_KEY]
+
+            def encode_row(row_index):
+                group_value = {} 
+
+                for schema_key, kind, step in steps:
+                    if kind == "column":
+                        column, values, warnings = step
+                        if row_index in warnings:
+                            note_warnings(
+                                    CellLocation(column, sheet.row_offset+row_index+1),
+                                    warnings[row_index])
+                        group_value[schema_key] = values[row_index]
+                    elif kind == "group":
+                        k, v = step(row_index)
+                        group_value[schema_key] = {k: v}
+                    elif isinstance(step, (dict, list)):
+                        # Every row needs its own copy, since records get
+                        # merged later on
+                        group_value[schema_key] = deepcopy(step)
+                    else:
+                        group_value[schema_key] = step
+
+                if key_fields is None:
+                    key = ()
+                else:
+                    key = tuple( group_value[key] for key in key_fields)
+                
+                return key, group_value
+
+            return encode_row
             #}}}
         #......................................................................
 
@@ -1040,9 +1084,11 @@ class Encoder:
         Style.info.print(f"    \u2022 Encoding sheet '{sheet.description()}' with encoder '{self.name}'")
         print()
 
+        encode_row = compile_group(self.schema)
+
         for row_index in range(sheet.rows):
             print(f"\x1b[1F        Processing row {row_index+1} of {sheet.rows}\x1b[K")
-            key, group_value = encode_group(sheet, row_index, self.schema)
+            key, group_value = encode_row(row_index)
 
             if key not in result:
                 result[key] = group_value
@@ -14,17 +14,133 @@ import io
 import sys
 import re
 from copy import deepcopy
-import multiprocessing.dummy as mp # multiprocessing interface, but uses threads instead
+import multiprocessing
 import tempfile
+import itertools
+import hashlib
+import os
+import concurrent.futures
 
 try:
     from reportlab.pdfgen import canvas
     from reportlab.lib import units
+    from reportlab.graphics import renderPDF
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.graphics.barcode.qr import QrCodeWidget
+    from reportlab.graphics.barcode.widgets import BarcodeCode128
     _reportlab_available = True
 
 except ModuleNotFoundError:
     _reportlab_available = False
 
+# What the server puts in its QR codes and barcodes. The QR code is a link
+# to the item's page on the HWDB website, and the barcode is the part ID
+# followed by the country code and institution ID (i.e., "external_id").
+# These can be changed under "scan codes" in the label configuration.
+DEFAULT_SCAN_CODES = {
+    "render locally": True,
+    "qr url": "https://dbweb9.fnal.gov:8443/{database}/view/component/{part_id}",
+}
+
+# The server's images are cropped down to just the code (see
+# _download_codes), which leaves them with these proportions. Codes drawn
+# locally are given the same proportions, so that layouts look the same
+# either way.
+QR_SIZE = (370, 370)
+BAR_SIZE = (628, 178)
+
+# How many pages ahead of the one being drawn to make or download codes
+PAGES_AHEAD = 2
+
+# Encoding QR codes is slow in pure Python, so if there are at least this
+# many to make, they're made in other processes
+MIN_CODES_FOR_PROCESSES = 64
+
+NUM_DOWNLOAD_THREADS = 15
+
+def _process_context():
+    '''How to start the processes that encode QR codes
+
+    They're started fresh rather than forked: by then, the REST API's
+    threads are running, and a forked copy of a process with threads can
+    be left holding a lock that no thread will ever release.
+    '''
+    if "forkserver" in multiprocessing.get_all_start_methods() \
+                and not getattr(sys, "frozen", False):
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+def qr_modules(value):
+    '''The dark (True) and light (False) modules of a QR code'''
+    qr = QrCodeWidget(value, barLevel='M', barBorder=0).qr
+    qr.make()
+    return [[bool(module) for module in row] for row in qr.modules]
+
+class VectorCode:
+    '''A QR code or barcode, drawn as vectors instead of as an image
+
+    Has a "size" like a PIL image, so that it can be laid out the same way.
+
+    Each code is drawn once per canvas, as a form named after what's in it,
+    and every label with the same code reuses the form. So, a QR code only
+    has to be encoded the first time it's drawn, and not at all if its
+    modules were already worked out (see qr_modules).
+    '''
+
+    def __init__(self, kind, value, modules=None):
+        self.kind = kind
+        self.value = value
+        self.modules = modules
+        self.size = QR_SIZE if kind == "qr" else BAR_SIZE
+        digest = hashlib.sha1(f"{kind}:{value}".encode("utf-8")).hexdigest()[:20]
+        self.form_name = f"{kind}-{digest}"
+
+    @staticmethod
+    def drawn_forms(cvs):
+        return cvs.__dict__.setdefault("_vector_code_forms", set())
+
+    def drawOn(self, cvs, x, y, width, height):
+        forms = self.drawn_forms(cvs)
+        if self.form_name not in forms:
+            # Draw it in a 1x1 box, and scale it when it's used
+            cvs.beginForm(self.form_name, 0, 0, 1, 1)
+            if self.kind == "qr":
+                self._draw_qr(cvs)
+            else:
+                self._draw_bar(cvs)
+            cvs.endForm()
+            forms.add(self.form_name)
+
+        cvs.saveState()
+        cvs.translate(x, y)
+        cvs.scale(width, height)
+        cvs.doForm(self.form_name)
+        cvs.restoreState()
+
+    def _draw_qr(self, cvs):
+        modules = self.modules or qr_modules(self.value)
+        box = 1 / len(modules)
+
+        path = cvs.beginPath()
+        for row_num, row in enumerate(modules):
+            col_num = 0
+            for is_dark, run in itertools.groupby(row):
+                count = len(list(run))
+                if is_dark:
+                    path.rect(col_num * box, 1 - (row_num + 1) * box, count * box, box)
+                col_num += count
+
+        cvs.setFillColorRGB(0, 0, 0)
+        cvs.drawPath(path, stroke=0, fill=1)
+
+    def _draw_bar(self, cvs):
+        widget = BarcodeCode128(value=self.value, quiet=0, humanReadable=0)
+        x0, y0, x1, y1 = widget.getBounds()
+        sx, sy = 1 / (x1 - x0), 1 / (y1 - y0)
+        drawing = Drawing(1, 1, transform=[sx, 0, 0, sy, -x0 * sx, -y0 * sy])
+        drawing.add(widget)
+        renderPDF.draw(drawing, cvs, 0, 0)
+
 
 class PDFLabels:
     def __init__(self, parts_list=None, label_set=None):
@@ -35,7 +151,10 @@ class PDFLabels:
         self.label_jobs = {}
     
         self._load_configuration()
-        self._get_hwitems()
+        # If we can, draw the codes ourselves rather than downloading two
+        # images per part from the server
+        self.qr_url_format = self._qr_url_format()
+        # (Each part's item data is fetched page by page, while drawing.)
         self._sort_jobs()
 
 
@@ -44,10 +163,10 @@ class PDFLabels:
         jobs = self.label_jobs
         label_templates = self.config["label templates"]
         
-        for part_id, part_data in self.parts_data.items():
+        for part_id in self.parts_list:
 
-            part_type_id = part_data["part_type_id"]
-            part_name = part_data["part_name"]
+            # (A part ID is its part type ID, a dash, and a serial number)
+            part_type_id = part_id.rsplit("-", 1)[0]
 
             if self._label_set is not None:
                 label_set = self.config["label sets"]["default"]
@@ -97,78 +216,129 @@ class PDFLabels:
         #print(f"merged: {json.dumps(self.config, indent=4)}")
         #}}}
 
-    def _get_hwitems(self):
+    def _qr_url_format(self):
         #{{{
-        # get the part names and qr/bar images for each part in the parts_list
-
-        NUM_THREADS = 15
-        pool = mp.Pool(processes=NUM_THREADS)
-
-        def get_hwitem_async(part_id):
-            def async_fn(args, kwargs):
-                data = ut.fetch_hwitems(*args, **kwargs)[part_id]
-                cc = data["Item"]["country_code"]
-                inst = data["Item"]["institution"]["id"]
-
-                ext_id = f'''{part_id}-{cc}{inst:03d}'''
-
-                #retval = {
-                #    "part_id": part_id,
-                #    "ext_id": ext_id,
-                #    "part_type_id": data["Item"]["component_type"]["part_type_id"],
-                #    "part_name": data["Item"]["component_type"]["name"],
-                #}
-                retval = data["Item"]
-                retval['external_id'] = ext_id
-                retval['part_type_id'] = data["Item"]["component_type"]["part_type_id"]
-                retval['part_name'] = data["Item"]["component_type"]["name"]
-
-                retval['specifications'] = retval['specifications'][0]
-                
-                logger.warning(json.dumps(retval, indent=4))
-
-                return retval
-            return pool.apply_async(async_fn, ((), {"part_id": part_id}))
-
-        def get_qr_async(part_id):
-            crop_bbox = (40, 40, 410, 410)
-            def async_fn(args, kwargs):
-                resp = ra.get_hwitem_qrcode(*args, **kwargs)
-                img_bytes = resp.content
-                img_obj = PIL.Image.open(io.BytesIO(img_bytes))
-                cropped_obj = img_obj.crop(crop_bbox)
-                return cropped_obj
-            return pool.apply_async(async_fn, ((), {"part_id": part_id}))
-
-        def get_bar_async(part_id):
-            crop_bbox = (30, 11, 658, 189)
-            def async_fn(args, kwargs):
-                resp = ra.get_hwitem_barcode(*args, **kwargs)
-                img_bytes = resp.content
-                img_obj = PIL.Image.open(io.BytesIO(img_bytes))
-                cropped_obj = img_obj.crop(crop_bbox)
-                return cropped_obj
-            return pool.apply_async(async_fn, ((), {"part_id": part_id}))
-
-        parts_data_futures = {}
-        qr_data_futures = {}
-        bar_data_futures = {}
+        '''The format for the QR code's contents, or None to use the server's'''
+        scan_codes = {**DEFAULT_SCAN_CODES, **self.config.get("scan codes", {})}
+
+        if not _reportlab_available or not scan_codes["render locally"]:
+            return None
+
+        # The website is on the same path as the REST API (e.g., "cdbdev").
+        # If we don't recognize it, we don't know what the server would put
+        # in the QR code, so let the server make it.
+        database = config.active_profile.rest_api.rstrip('/').rsplit('/', 1)[-1]
+        if database not in ("cdb", "cdbdev"):
+            logger.info(f"Not rendering codes locally for REST API "
+                        f"'{config.active_profile.rest_api}'")
+            return None
+
+        return scan_codes["qr url"].replace("{database}", database)
+        #}}}
 
-        for part_id in self.parts_list:
-            parts_data_futures[part_id] = get_hwitem_async(part_id)
-            qr_data_futures[part_id] = get_qr_async(part_id)
-            bar_data_futures[part_id] = get_bar_async(part_id)
+    def _fetch_part_data(self, part_id):
+        #{{{
+        '''Gets the data for a part that its labels can show'''
+        data = ra.get_hwitem(part_id)["data"]
+        cc = data["country_code"]
+        inst = data["institution"]["id"]
 
-        pool.close()
-        pool.join()
+        ext_id = f'''{part_id}-{cc}{inst:03d}'''
 
-        self.parts_data = {}
+        data['external_id'] = ext_id
+        data['part_type_id'] = data["component_type"]["part_type_id"]
+        data['part_name'] = data["component_type"]["name"]
 
+        data['specifications'] = data['specifications'][0]
+        
+        logger.warning(json.dumps(data, indent=4))
 
-        for part_id in self.parts_list:
-            self.parts_data[part_id] = parts_data_futures[part_id].get()
-            self.parts_data[part_id]['qr'] = qr_data_futures[part_id].get()
-            self.parts_data[part_id]['bar'] = bar_data_futures[part_id].get()
+        return data
+        #}}}
+
+    def _download_codes(self, part_id):
+        #{{{
+        '''Gets the qr/bar images for a part from the server'''
+        codes = {}
+        for kind, get_image, crop_bbox in (
+                    ("qr", ra.get_hwitem_qrcode, (40, 40, 410, 410)),
+                    ("bar", ra.get_hwitem_barcode, (30, 11, 658, 189))):
+            resp = get_image(part_id=part_id)
+            img_obj = PIL.Image.open(io.BytesIO(resp.content))
+            codes[kind] = img_obj.crop(crop_bbox)
+        return codes
+        #}}}
+
+    def _iter_page_codes(self, pages):
+        #{{{
+        '''Yields {part_id: {"qr": ..., "bar": ..., "data": ...}} for each page
+
+        'pages' is a list of the part IDs on each page. The item data and
+        codes for the next few pages are fetched (and the codes made or
+        downloaded) while the current page is being drawn, and each page's
+        codes are let go once it's done, so that only a few pages' worth
+        are ever held at once. (The item data is kept in self._parts_data,
+        since a part usually has labels in more than one template.)
+        '''
+        downloader = concurrent.futures.ThreadPoolExecutor(
+                                max_workers=NUM_DOWNLOAD_THREADS)
+        executor = None
+
+        if self.qr_url_format is not None:
+            forms = VectorCode.drawn_forms(self.cvs)
+            qr_futures = {}
+
+            if sum(len(page) for page in pages) >= MIN_CODES_FOR_PROCESSES:
+                executor = concurrent.futures.ProcessPoolExecutor(
+                                    max_workers=os.cpu_count(),
+                                    mp_context=_process_context())
+
+        def submit(part_id):
+            job = {"data": self._parts_data.get(part_id)
+                            or downloader.submit(self._fetch_part_data, part_id)}
+            if self.qr_url_format is None:
+                job["codes"] = downloader.submit(self._download_codes, part_id)
+            else:
+                qr = VectorCode("qr", self.qr_url_format.replace("{part_id}", part_id))
+                # Only encode QR codes that haven't already been drawn
+                if (executor is not None and qr.form_name not in forms
+                            and qr.form_name not in qr_futures):
+                    qr_futures[qr.form_name] = executor.submit(qr_modules, qr.value)
+                job["qr"] = qr
+            return job
+
+        def result(part_id, job):
+            data = job["data"]
+            if isinstance(data, concurrent.futures.Future):
+                data = self._parts_data[part_id] = data.result()
+            if "codes" in job:
+                codes = job["codes"].result()
+            else:
+                qr = job["qr"]
+                if qr.form_name in qr_futures:
+                    qr.modules = qr_futures.pop(qr.form_name).result()
+                # (The barcode is the external ID, which needs the data)
+                codes = {"qr": qr, "bar": VectorCode("bar", data["external_id"])}
+            return {**codes, "data": data}
+
+        pending = {}
+        try:
+            for page_num in range(len(pages)):
+                for ahead in pages[page_num:page_num + PAGES_AHEAD + 1]:
+                    for part_id in ahead:
+                        if part_id not in pending:
+                            pending[part_id] = submit(part_id)
+
+                page_codes = {}
+                for part_id in pages[page_num]:
+                    if part_id not in page_codes:
+                        page_codes[part_id] = result(part_id, pending.pop(part_id))
+                yield page_codes
+                del page_codes
+        finally:
+            downloader.shutdown(cancel_futures=True)
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
         #}}}
 
     def generate_label_sheets(self, filename):
@@ -179,6 +349,7 @@ class PDFLabels:
             return
        
         self.cvs = cvs = canvas.Canvas(filename)
+        self._parts_data = {}
         cvs.setTitle("HWDB Item Bar/QR Code Labels")
         cvs.setAuthor(f"HWDB Python Utility {Sisyphus.version}")
 
@@ -348,7 +519,14 @@ class PDFLabels:
         full_pages, leftovers = divmod(len(scan_codes), label_template["labels_per_page"])
         num_pages = full_pages + (1 if leftovers else 0)
 
+        labels_per_page = label_template["labels_per_page"]
+        page_codes = self._iter_page_codes([
+                    [code_data["part_id"] for code_data in
+                        scan_codes[page_num * labels_per_page:(page_num + 1) * labels_per_page]]
+                    for page_num in range(num_pages)])
+
         for page_num in range(num_pages):
+            codes = next(page_codes)
             for pos_index, offset in enumerate(position_index):
                 total_index = page_num * label_template["labels_per_page"] + pos_index
                 label_index = total_index
@@ -363,7 +541,7 @@ class PDFLabels:
 
                 cvs.saveState()
                 cvs.translate(offset[0], page_height-offset[1])
-                self._generate_label(label_template, offset, code_data)
+                self._generate_label(label_template, offset, code_data, codes)
                 cvs.restoreState()
 
 
@@ -371,7 +549,7 @@ class PDFLabels:
                     cvs.showPage()
         #}}}            
     
-    def _generate_label(self, label_template, offset, code_data):
+    def _generate_label(self, label_template, offset, code_data, codes):
         #{{{
         def convert_percent(s, size):
             #{{{
@@ -458,7 +636,9 @@ class PDFLabels:
             cvs.translate(x, -y)
             cvs.rotate(rotate)
 
-            if img is not None:
+            if isinstance(img, VectorCode):
+                img.drawOn(cvs, -hh_offset, -hh + vv_offset, ww, hh)
+            elif img is not None:
                 with tempfile.NamedTemporaryFile() as tf:
                     img.save(tf, 'png')
                     cvs.drawImage(
@@ -548,7 +728,6 @@ class PDFLabels:
         if code_data is not None:
             layout_def = self.config['layouts'][code_data['layout_name']]
             debug = layout_def.get('debug', False)
-            part_data = self.parts_data[code_data['part_id']]
 
         if debug or label_template.get("draw outline", False) == True:
             cvs.setLineWidth(1)
@@ -565,7 +744,7 @@ class PDFLabels:
         if code_data is None:
             return
 
-        part_data = self.parts_data[code_data['part_id']]
+        part_data = codes[code_data['part_id']]["data"]
 
 
         orientation = layout_def.get("orientation", "portrait")
@@ -627,7 +806,7 @@ class PDFLabels:
                 draw_element(
                     anchor_h, anchor_v,
                     size_h, size_v,
-                    img = part_data[element['element type']],
+                    img = codes[code_data['part_id']][element['element type']],
                     preserve_aspect = preserve_aspect,
                     align = align,
                     debug = debug,
@@ -16,6 +16,10 @@ A sheet that only has the header data and is not followed by row data
 is considered to have exactly one "row" that consists of whatever keys 
 that are supplied in the header and/or "Values" node.
 
+Each file is only parsed once (see load_workbook). Working out the layout
+of a sheet, and reading its table, is done from the raw cells in memory,
+using the same parser that pandas.read_excel uses, so the values come out
+the same as if the file had been read several times.
 """
 
 from Sisyphus import version
@@ -36,12 +40,16 @@ import json
 import sys
 import numpy as np
 import pandas as pd
+from pandas.io.parsers import TextParser
+from pandas.errors import EmptyDataError
 import os
+import csv
+import threading
 from copy import deepcopy
 import re
 
 from dataclasses import dataclass, field
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 
 pp = lambda s: print(json.dumps(s, indent=4))
 
@@ -56,6 +64,67 @@ class Cell:
     datatype: str = None
     value: 'typing.Any' = None
 
+#------------------------------------------------------------------------------
+
+# Parsed files, most recently used last. A docket usually reads every sheet
+# of a workbook one after another, so only a few need to be kept.
+_WORKBOOK_CACHE_SIZE = 4
+_workbooks = OrderedDict()
+_workbooks_lock = threading.Lock()
+
+def load_workbook(filename):
+    #{{{
+    '''Get the raw cells of every sheet in an XLSX file, or of a CSV file
+
+    Returns a dictionary of {sheet name: rows}, where each row is a list of
+    cell values, all the same length, with "" for empty cells. A CSV file
+    has a single sheet named None.
+
+    The file is only parsed again if it has changed since the last time.
+    '''
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+
+    with _workbooks_lock:
+        if key in _workbooks:
+            _workbooks.move_to_end(key)
+            return _workbooks[key]
+
+    ext = filename.split('.')[-1].casefold()
+    if ext in ('csv', 'txt'):
+        with open(filename, newline='') as f:
+            rows = list(csv.reader(f))
+        width = max((len(row) for row in rows), default=0)
+        workbook = {None: [row + [""] * (width - len(row)) for row in rows]}
+    elif ext in ('xlsx',):
+        # With dtype=object and no NA handling, read_excel just hands back
+        # the cells, which is what we want to keep.
+        frames = pd.read_excel(
+                    filename,
+                    sheet_name=None,
+                    header=None,
+                    dtype=object,
+                    keep_default_na=False,
+                    na_filter=False)
+        workbook = {name: df.values.tolist() for name, df in frames.items()}
+    else:
+        raise ValueError(f"Unrecognized file type '{filename}'")
+
+    with _workbooks_lock:
+        _workbooks[key] = workbook
+        _workbooks.move_to_end(key)
+        while len(_workbooks) > _WORKBOOK_CACHE_SIZE:
+            _workbooks.popitem(last=False)
+
+    return workbook
+    #}}}
+
+def clear_workbook_cache():
+    with _workbooks_lock:
+        _workbooks.clear()
+
+#------------------------------------------------------------------------------
+
 class Sheet:
     #{{{
     '''Load a CSV or Excel sheet and provide an interface for Encoders to extract data'''
@@ -76,6 +145,7 @@ class Sheet:
             #self.global_values["HWDB Utility Version"] = version
             self.local_values = None
             self.dataframe = None
+            self.table_columns = None
             self.rows = None
 
             # 
@@ -99,6 +169,81 @@ class Sheet:
                 datatype=datatype,
                 value=value)
     
+    @property
+    def tabledata(self):
+        '''The rows of the table, as case-insensitive dictionaries'''
+        # Only made if someone asks, since it takes a lot of memory for a
+        # big sheet and the Encoder reads whole columns instead
+        if self._tabledata is None:
+            self._tabledata = [ CI_dict(d) for d in self.dataframe.to_dict(orient='records') ]
+        return self._tabledata
+
+    def locate(self, column, in_table=True):
+        #{{{
+        '''Find where the value for a column comes from
+
+        "column" can be a list of aliases, or a single value. Returns a
+        tuple (where, name), where "where" is one of "table", "header",
+        "inherited", or "not found", and "name" is the alias that matched.
+        Every row in the table has the same columns, so the answer is the
+        same for every row. Set in_table=False to only look at the header
+        and the globals.
+        '''
+        if isinstance(column, (list, tuple)):
+            columns = column
+        else:
+            columns = [column]
+
+        # Try all the possible column names in the main part of the sheet
+        # before resorting to looking for it in locals or globals
+        if in_table:
+            for column in columns:
+                if column in self.table_columns:
+                    return "table", column
+
+        # Try all possible columns for locals before going on to globals
+        for column in columns:
+            if column in self.local_values:
+                return "header", column
+
+        # Try the globals as a last resort
+        for column in columns:
+            if column in self.global_values:
+                return "inherited", column
+
+        return "not found", None
+        #}}}
+
+    def column_values(self, column):
+        '''Get all the values in a column of the table, as a pandas Series'''
+        return self.dataframe[self.table_columns[column]]
+
+    @staticmethod
+    def apply_choices(cell, choices):
+        #{{{
+        '''Make a cell's value match the casing of one of the choices
+
+        Adds a warning to the cell if its value isn't one of the choices.
+        '''
+        if not choices:
+            return cell
+
+        lc_choices = { choice.casefold(): choice 
+                        for choice in choices 
+                        if isinstance(choice, str) }
+        
+        if isinstance(cell.value, str):
+            if cell.value.casefold() in lc_choices:
+                cell.value = lc_choices[cell.value.casefold()]
+            else:
+                cell.warnings.append(f"'{cell.value}' was not one of the defined choices")
+        else:
+            if cell.value not in choices:
+                cell.warnings.append(f"'{cell.value}' was not one of the defined choices")
+
+        return cell
+        #}}}
+
     def coalesce(self, column, row_index=None, datatype='any', choices=None):
         #{{{
         '''
@@ -109,79 +254,34 @@ class Sheet:
         of them exist, returns None.
         '''
 
-        def inner_coalesce(self, columns, row_index, datatype):
-            if row_index is not None and (row_index >= self.rows or row_index < 0):
-                msg = f"{self.sheet_source}: row index {row_index} out of range"
-                logger.error(msg)
-                raise IndexError(msg)
-
-            # Try all the possible column names in the main part of the sheet
-            # before resorting to looking for it in locals or globals
-            if row_index is not None:
-                record = self.tabledata[row_index]
-                for column in columns:
-                    if column in record:
-                        cell = self.create_cell(
-                                CellLocation(column, self.row_offset+row_index+1),
-                                record[column],
-                                datatype)
-                        #print(columns, cell)
-                        return cell
-
-            # Try all possible columns for locals before going on to globals
-            for column in columns:
-                if column in self.local_values:
-                    cell = self.create_cell(
-                            #"header",
-                            CellLocation(column, "header"),
-                            self.local_values[column],
-                            datatype)
-                    #print(columns, cell)
-                    return cell
-
-            # Try the globals as a last resort
-            for column in columns:
-                if column in self.global_values:
-                    cell = self.create_cell(
-                            "inherited",
-                            self.global_values[column],
-                            datatype)
-                    #print(columns, cell)
-                    return cell
-
-            # We didn't find anything, so let's just see if it was prefaced
-            # by "S:", "C:", or "T:" and try again.
-            #if column[:2] in ("S:", "C:", "T:"):
-            #    return inner_coalesce(self, column[2:], row_index, datatype)
-            
-            return self.create_cell("not found", None, "any")
-
-        # sort of a late-addition hack:
-        # "column" can be a list of aliases, or a single value.
-        # if it's a single value, convert it to a list first.
-        if isinstance(column, (list, tuple)):
-            columns = column
+        if row_index is not None and (row_index >= self.rows or row_index < 0):
+            msg = f"{self.sheet_source}: row index {row_index} out of range"
+            logger.error(msg)
+            raise IndexError(msg)
+
+        where, name = self.locate(column, in_table=(row_index is not None))
+
+        if where == "table":
+            cell = self.create_cell(
+                    CellLocation(name, self.row_offset+row_index+1),
+                    self.tabledata[row_index][name],
+                    datatype)
+        elif where == "header":
+            cell = self.create_cell(
+                    CellLocation(name, "header"),
+                    self.local_values[name],
+                    datatype)
+        elif where == "inherited":
+            cell = self.create_cell(
+                    CellLocation(name, "inherited"),
+                    self.global_values[name],
+                    datatype)
         else:
-            columns = [column]
+            cell = self.create_cell("not found", None, "any")
 
-        cell = tc.cast(inner_coalesce(self, columns, row_index, datatype))
+        cell = tc.cast(cell)
         
-        if choices:
-            lc_choices = { choice.casefold(): choice 
-                            for choice in choices 
-                            if isinstance(choice, str) }
-            
-            if isinstance(cell.value, str):
-                if cell.value.casefold() in lc_choices:
-                    cell.value = lc_choices[cell.value.casefold()]
-                else:
-                    cell.warnings.append(f"'{cell.value}' was not one of the defined choices")
-            else:
-                if cell.value not in choices:
-                    cell.warnings.append(f"'{cell.value}' was not one of the defined choices")
-
-        return cell
-
+        return self.apply_choices(cell, choices)
         #}}}        
 
     def _read_data(self): 
@@ -195,44 +295,43 @@ class Sheet:
         sheetname = self.sheetname
 
 
-        # make read_excel and read_csv look the same, so we don't
-        # have to keep handling each case differently.
-        if filetype == DKT_EXCEL:
-            #print("SETTING EXCEL READ")
-            def read_sheet(**kwargs):
-                #print("READING EXCEL")
-                try:
-                    return pd.read_excel(
-                                filename,
-                                sheetname,
-                                keep_default_na=False,
-                                **kwargs)
-                except ValueError as err:
-                    msg = f"Could not load sheet '{sheetname}' from '{filename}'"
-                    logger.error(msg)
-                    logger.info(err)
-                    raise ValueError(msg)
-        elif filetype == DKT_CSV:
-            #print("SETTING CSV READ")
-            def read_sheet(**kwargs):
-                #print("READING CSV")
-                try:
-                    return pd.read_csv(
-                                filename,
-                                keep_default_na=False,
-                                skip_blank_lines=False,
-                                **kwargs)
-                except ValueError as err2:
-                    msg = f"Could not load '{filename}'"
-                    logger.error(msg)
-                    logger.info(f"err")
-                    raise ValueError(msg)
-        else:
+        if filetype not in (DKT_EXCEL, DKT_CSV):
             msg = f"Unknown File Type '{filetype}'"
             logger.error(msg)
-            logger.info(f"err")
             raise ValueError(msg)
 
+        try:
+            workbook = load_workbook(filename)
+            if filetype == DKT_CSV:
+                cells = workbook[None]
+            elif sheetname is None:
+                cells = next(iter(workbook.values()))
+            elif isinstance(sheetname, int) and sheetname not in workbook:
+                cells = list(workbook.values())[sheetname]
+            else:
+                cells = workbook[sheetname]
+        except (ValueError, KeyError, IndexError, StopIteration) as err:
+            if filetype == DKT_EXCEL:
+                msg = f"Could not load sheet '{sheetname}' from '{filename}'"
+            else:
+                msg = f"Could not load '{filename}'"
+            logger.error(msg)
+            logger.info(err)
+            raise ValueError(msg)
+
+        # Parse (part of) the cells into a DataFrame, the same way that
+        # read_excel would have
+        def read_sheet(header=0, **kwargs):
+            try:
+                return TextParser(
+                            cells,
+                            header=header,
+                            keep_default_na=False,
+                            skip_blank_lines=False,
+                            **kwargs).read()
+            except EmptyDataError:
+                return pd.DataFrame()
+
         # Read only the first two columns of the sheet, which we will analyze
         # further to determine what the true layout of the sheet might be
         locals_df = read_sheet(header=None, usecols=lambda x: x is None or x<2)
@@ -263,10 +362,7 @@ class Sheet:
                 #    raise ValueError(msg)
                 local_values[locals_df[0][row_index]] = locals_df[1][row_index]
                 if series[0] == "":
-                    blank_line_df = read_sheet(
-                                header=None, 
-                                skiprows=lambda x: x!=row_index)
-                    row_values = list(blank_line_df.values[0])
+                    row_values = cells[row_index]
                     nonblanks = len([x for x in row_values if x!=""])
                     if nonblanks > 0:
                         # Since we hit a row that started with an empty cell
@@ -285,8 +381,7 @@ class Sheet:
 
                 # does it have more than two columns, if we ask for it?
                 # if so, it's a table.
-                locals_df = read_sheet(header=None)
-                if len(locals_df.columns) > 2:
+                if len(cells[0]) > 2:
                     column_header_row = 0
                     local_values = {}
 
@@ -311,7 +406,9 @@ class Sheet:
             self.rows = len(self.dataframe.index)
             self.row_offset = column_header_row
         
-        self.tabledata = [ CI_dict(d) for d in self.dataframe.to_dict(orient='records') ]
+        self._tabledata = None
+        # column name (in any casing) -> the actual column name
+        self.table_columns = CI_dict({col: col for col in self.dataframe.columns})
 
 
 
@@ -81,7 +81,7 @@ import re
 import math
 import numpy as np
 from datetime import datetime
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from collections import namedtuple
 
 CastWarning = namedtuple("CastResult", ["dtype", "reason"])
@@ -121,7 +121,6 @@ def can_cast_null(value):
 
 def cast_generic_blank(cell, blank_type_name, blank_type_value):
     #{{{
-    cell = deepcopy(cell)
     if can_cast_null(cell.value):
         # This is a successful cast. No warnings.
         cell.value = blank_type_value
@@ -143,7 +142,6 @@ def cast_nan(cell):
 def cast_str(cell):
     #{{{
     # As far as I know, anything can be cast to as string. So just do it.
-    cell = deepcopy(cell)
     cell.value = str(cell.value)
     cell.warnings = []
     return cell
@@ -151,7 +149,6 @@ def cast_str(cell):
 
 def cast_int(cell):
     #{{{
-    cell = deepcopy(cell)
     if type(cell.value) in (int, np.int64):
         cell.value = int(cell.value)
         cell.warnings = []
@@ -207,15 +204,9 @@ def cast_int(cell):
 
 def cast_unixtime(cell):
     #{{{
-    
-    cell = deepcopy(cell)
-    cell_original = deepcopy(cell)
-
     cell.warnings = []
     cell = cast_number(cell)
     if len(cell.warnings) > 0:
-        cell_original.warnings.append(f"Cannot interpret '{cell_original.value}' as "
-                "Unix time")
         return cell
 
     cell.value = datetime.fromtimestamp(cell.value).isoformat()
@@ -228,8 +219,6 @@ def cast_float(cell):
     # even though it is of type float. To get it to accept NaN without warnings,
     # make the type "float,nan", so it can fall back to NaN.
     
-    cell = deepcopy(cell)
-    
     if type(cell.value) in (float, np.float64, int, np.int64): 
         if not isnan(cell.value):
             cell.value = float(cell.value)
@@ -256,13 +245,16 @@ def cast_number(cell):
     #{{{
     # Try casting this to an int. If that fails, try as a float. Only
     # return the warnings from the float.
-    cell = deepcopy(cell)
-    cell_copy = deepcopy(cell)
-    cell_copy.warnings = []
-    cell_copy = cast_int(cell_copy)
-    if len(cell_copy.warnings) == 0:
-        return cell_copy
+    warnings = cell.warnings
+    value = cell.value
 
+    cell.warnings = []
+    cell = cast_int(cell)
+    if len(cell.warnings) == 0:
+        return cell
+
+    cell.warnings = warnings
+    cell.value = value
     return cast_float(cell)
 
 
@@ -274,7 +266,6 @@ def cast_bool(cell):
     # Interpret 1, True, "true", "t", "yes", or "y" as True
     # String values are not case-sensitive
 
-    cell = deepcopy(cell)
     
     if str(cell.value).lower() in ("0", "0.0", "false", "f", "no", "n"):
         cell.value = False
@@ -292,7 +283,6 @@ def cast_bool(cell):
 
 def cast_list(cell):
     #{{{
-    cell = deepcopy(cell)
     try:
         value = json.loads(str(cell.value))
         if type(value) is list:
@@ -307,7 +297,6 @@ def cast_list(cell):
 
 def cast_dict(cell):
     #{{{
-    cell = deepcopy(cell)
     try:
         value = json.loads(str(cell.value))
         if type(value) is dict:
@@ -321,7 +310,6 @@ def cast_dict(cell):
 
 def cast_json(cell):
     #{{{
-    cell = deepcopy(cell)
     try:
         cell.value = json.loads(str(cell.value))
         return cell
@@ -340,7 +328,6 @@ def cast_any(cell):
     # list, we might as well do that as well. Otherwise, it should
     # just leave it as it is.
     # This shouldn't return any warnings.
-    cell = deepcopy(cell)
 
     try:
         value = json.loads(str(cell.value))
@@ -363,7 +350,53 @@ def cast_any(cell):
 
     #}}}
 
-def cast(cell):
+def _caster(typedef):
+    #{{{
+    if typedef in ('str', 'string', 'text'):
+        return cast_str
+    elif typedef in ('int', 'integer'):
+        return cast_int
+    elif typedef in ('float', 'real'):
+        return cast_float
+    elif typedef in ('number', 'numeric'):
+        return cast_number
+    elif typedef in ('unixtime',):
+        return cast_unixtime
+    elif typedef in ('bool', 'boolean', 'bit'):
+        return cast_bool
+    elif typedef in ('null', 'none'):
+        return cast_null
+    elif typedef in ('empty',):
+        return cast_empty
+    elif typedef in ('nan',):
+        return cast_nan
+    elif typedef in ('list', 'array'):
+        return cast_list
+    elif typedef in ('dict', 'obj', 'object'):
+        return cast_dict
+    elif typedef in ('json',):
+        return cast_json
+    elif typedef in ('any'):
+        return cast_any
+    else:
+        def cast_unknown(cell):
+            cell = cast_any(cell)
+            cell.warnings.append(f"Unknown type '{typedef}'")
+            return cell
+        return cast_unknown
+    #}}}
+
+_type_chains = {}
+
+def type_chain(datatype):
+    '''Turns a datatype like "int,null" into the list of cast functions to try'''
+    chain = _type_chains.get(datatype, None)
+    if chain is None:
+        chain = tuple(_caster(typedef) for typedef in datatype.lower().split(','))
+        _type_chains[datatype] = chain
+    return chain
+
+def _cast_in_place(cell, chain):
     #{{{
     # If the value is literally "<null>", treat this as an overwriting null.
     # We really needed there to be two kinds of nulls. One that's just a plain 
@@ -381,41 +414,81 @@ def cast(cell):
             cell.value = "<nan>"
             return cell
 
-    type_chain = cell.datatype.lower().split(',')
-
-    for typedef in type_chain:
-        if typedef in ('str', 'string', 'text'):
-            cell = cast_str(cell)
-        elif typedef in ('int', 'integer'):
-            cell = cast_int(cell)
-        elif typedef in ('float', 'real'):
-            cell = cast_float(cell)
-        elif typedef in ('number', 'numeric'):
-            cell = cast_number(cell)
-        elif typedef in ('unixtime',):
-            cell = cast_unixtime(cell)
-        elif typedef in ('bool', 'boolean', 'bit'):
-            cell = cast_bool(cell)
-        elif typedef in ('null', 'none'):
-            cell = cast_null(cell)
-        elif typedef in ('empty',):
-            cell = cast_empty(cell)
-        elif typedef in ('nan',):
-            cell = cast_nan(cell)
-        elif typedef in ('list', 'array'):
-            cell = cast_list(cell)
-        elif typedef in ('dict', 'obj', 'object'):
-            cell = cast_dict(cell)
-        elif typedef in ('json',):
-            cell = cast_json(cell)
-        elif typedef in ('any'):
-            cell = cast_any(cell)
-        else:
-            cell = cast_any(cell)
-            cell.warnings.append(f"Unknown type '{typedef}'")
+    for caster in chain:
+        cell = caster(cell)
         if not cell.warnings:
             break
 
     return cell
     #}}}
 
+def cast(cell):
+    #{{{
+    '''Cast a cell's value to its datatype
+
+    Returns a new Cell. The cell passed in is left as it was. (The cast_*
+    functions, on the other hand, change the cell they're given.)
+    '''
+    # The casts only ever replace the value, never change it, so a shallow
+    # copy (with its own list of warnings) is enough to protect the original
+    cell = replace(cell, warnings=list(cell.warnings))
+    return _cast_in_place(cell, type_chain(cell.datatype))
+    #}}}
+
+def cast_column(values, datatype):
+    #{{{
+    '''Cast a whole column of values to a datatype
+
+    "values" may be a list, a numpy array, or a pandas Series. Returns a
+    tuple (values, warnings), where "values" is a list of the cast values,
+    and "warnings" is a dictionary of {index: [warnings]} for only those
+    values that had warnings.
+
+    The type chain is only worked out once for the column, and columns
+    that pandas has already given a numeric type are converted all at
+    once when the result is already known.
+    '''
+    chain = type_chain(datatype)
+    first = chain[0]
+
+    dtype = getattr(values, "dtype", None)
+    if dtype is not None and dtype.kind in "iufb":
+        array = np.asarray(values)
+
+        if dtype.kind in "iu" and first in (cast_int, cast_number, cast_any):
+            return array.tolist(), {}
+        if dtype.kind in "iu" and first is cast_float:
+            return array.astype(float).tolist(), {}
+        if dtype.kind == "b" and first in (cast_bool, cast_any):
+            return array.tolist(), {}
+        if dtype.kind in "iub" and first is cast_str:
+            return [str(value) for value in array.tolist()], {}
+        if dtype.kind == "f" and first in (cast_float, cast_any):
+            # Only the NaN's need any more attention
+            result = array.tolist()
+            nans = np.flatnonzero(np.isnan(array))
+            if first is cast_any or len(nans) == 0:
+                return result, {}
+            warnings = {}
+            for index in nans.tolist():
+                cell = _cast_in_place(Cell(source=None, value=result[index]), chain)
+                result[index] = cell.value
+                if cell.warnings:
+                    warnings[index] = cell.warnings
+            return result, warnings
+
+        values = array.tolist()
+    elif dtype is not None:
+        values = list(values)
+
+    result = []
+    warnings = {}
+    for index, value in enumerate(values):
+        cell = _cast_in_place(Cell(source=None, value=value), chain)
+        result.append(cell.value)
+        if cell.warnings:
+            warnings[index] = cell.warnings
+
+    return result, warnings
+    #}}}
+
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sisyphus/HWDBUtility/Upload/JobGraph.py
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+Runs a set of jobs that depend on each other, as concurrently as the
+dependencies allow.
+
+Each job is added with the keys of the jobs that have to finish before it
+can start. Because a job can only depend on jobs that were added before
+it, the graph can't have cycles. Jobs whose dependencies are all done are
+started in the order they were added, on a bounded thread pool.
+
+If a job raises an exception, no new jobs are started (and nothing that
+depends on the failed job ever runs). The jobs already running are allowed
+to finish, and then the first exception is raised.
+"""
+
+from Sisyphus.Configuration import config
+logger = config.getLogger(__name__)
+
+import concurrent.futures
+from collections import deque
+
+class JobGraph:
+    #{{{
+    class _Node:
+        def __init__(self, key, func, group, deps):
+            self.key = key
+            self.func = func
+            self.group = group
+            self.deps = deps
+            self.dependents = []
+
+    def __init__(self):
+        self.nodes = {}
+        self.group_totals = {}
+
+    def add(self, key, func, group=None, deps=()):
+        '''Adds a job
+
+        key:   a unique, hashable name for the job
+        func:  a callable taking no arguments
+        group: a label to count the job under for progress reports
+        deps:  the keys of jobs that must finish first
+        '''
+        if key in self.nodes:
+            raise ValueError(f"Job {key!r} was already added")
+
+        deps = set(deps)
+        for dep in deps:
+            if dep not in self.nodes:
+                raise ValueError(f"Job {key!r} depends on unknown job {dep!r}")
+
+        node = self._Node(key, func, group, deps)
+        self.nodes[key] = node
+        for dep in deps:
+            self.nodes[dep].dependents.append(key)
+        self.group_totals[group] = self.group_totals.get(group, 0) + 1
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def run(self, num_threads, progress=None):
+        '''Runs all the jobs
+
+        progress, if given, is called on the calling thread with a
+        dictionary of {group: number of jobs finished} each time any jobs
+        finish.
+        '''
+        waiting_on = {key: len(node.deps) for key, node in self.nodes.items()}
+        ready = deque(key for key, count in waiting_on.items() if count == 0)
+        finished = {group: 0 for group in self.group_totals}
+        running = {}
+        first_exc = None
+
+        if progress is not None:
+            progress(finished)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads) as executor:
+            while ready or running:
+                while ready and first_exc is None:
+                    key = ready.popleft()
+                    running[executor.submit(self.nodes[key].func)] = key
+
+                if not running:
+                    break
+
+                done, _ = concurrent.futures.wait(running,
+                            return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for fut in done:
+                    node = self.nodes[running.pop(fut)]
+                    exc = fut.exception()
+                    if exc is not None:
+                        logger.error(f"Job {node.key!r} failed: {exc!r}")
+                        if first_exc is None:
+                            first_exc = exc
+                        continue
+
+                    finished[node.group] += 1
+                    for dependent in node.dependents:
+                        waiting_on[dependent] -= 1
+                        if waiting_on[dependent] == 0:
+                            ready.append(dependent)
+
+                if progress is not None:
+                    progress(finished)
+
+        if first_exc is not None:
+            raise first_exc
+    #}}}
@@ -14,6 +14,8 @@ import Sisyphus.RestApiV1 as ra
 import Sisyphus.RestApiV1.Utilities as ut
 from Sisyphus.DataModel import HWItem
 from Sisyphus.DataModel import HWTest
+from .JobGraph import JobGraph
+from .Journal import STAGE_CORE, STAGE_LOCATION, STAGE_DONE
 #from Sisyphus.HWDBUtility.PDFLabels import PDFLabels
 
 import multiprocessing.dummy as mp # multiprocessing interface, but uses threads instead
@@ -31,14 +33,23 @@ _lock = mp.threading.Lock()
 
 _debug_no_async = False
 _num_threads = 25
+_bulk_batch_size = 100
+
+# How many job requests may be waiting in the thread pool at once, per
+# thread. When job requests come from a generator, this keeps the Docket
+# from encoding everything before any of it has been looked up.
+_queue_depth = 4
 
 class JobManager:
 
-    def __init__(self, parent, job_requests, num_threads=_num_threads):
+    def __init__(self, parent, job_requests, num_threads=_num_threads, journal=None):
         #{{{
         self.parent = parent
+        self.journal = journal
+        self.num_threads = num_threads
         logger.debug(f"initializing JobManager with num_threads={num_threads}")
         self.thread_pool = mp.Pool(processes=num_threads)
+        self._pending = mp.threading.BoundedSemaphore(_queue_depth * num_threads)
 
         if _debug_no_async:
             self._apply = self.thread_pool.apply
@@ -60,307 +71,522 @@ class JobManager:
         self.item_image_jobs = {}
         self.test_image_jobs = {}
 
+        # (part_type_id, serial_number) -> [test jobs], so that tests can be
+        # found for an item without looking through all of them
+        self.test_sn_index = {}
+
+        # (record type, job number) -> the job's key in the journal
+        self.journal_keys = {}
+
         self.add_jobs(job_requests)
         #}}}
 
     def add_jobs(self, job_requests):
         #{{{
-        # Let's count up each type of job first
-        for job_request in job_requests:
-            record_type = job_request["Record Type"]
-            if record_type == "Item":
-                self.item_job_total += 1
-            if record_type == "Test":
-                self.test_job_total += 1
-            if record_type == "Item Image":
-                self.item_image_job_total += 1
-            if record_type == "Test Image":
-                self.test_image_job_total += 1
-
-        while job_requests and not hasattr(self, "_exception"):
-            job_request = job_requests.pop(0)
+        '''Queues up job requests to be turned into HWItems/HWTests
+
+        job_requests may be a list, or an iterator (such as the one from
+        Docket.iter_jobs) that makes them as they are needed. Only a limited
+        number are allowed to wait in the thread pool, so that encoding the
+        later sheets overlaps with looking up the items in the earlier ones.
+        '''
+        def count(job_request):
             record_type = job_request["Record Type"]
-            
-            if record_type == "Item":
-                self.add_item(job_request)
-            if record_type == "Test":
-                self.add_test(job_request)
-            if record_type == "Item Image":
-                self.add_item_image(job_request)
-            if record_type == "Test Image":
-                self.add_test_image(job_request)
+            with _lock:
+                if record_type == "Item":
+                    self.item_job_total += 1
+                if record_type == "Test":
+                    self.test_job_total += 1
+                if record_type == "Item Image":
+                    self.item_image_job_total += 1
+                if record_type == "Test Image":
+                    self.test_image_job_total += 1
+
+        # If we already have all of them, we can count up each type of job
+        # first. Otherwise, the totals will grow as they come in.
+        precounted = isinstance(job_requests, (list, tuple))
+
+        # The journal has to see every job request before anything changes
+        # it, to work out its key (and skip it, if we're resuming)
+        if self.journal is not None:
+            job_requests = self.journal.unfinished(job_requests)
+            if precounted:
+                job_requests = list(job_requests)
+        if precounted:
+            for job_request in job_requests:
+                count(job_request)
+
+        try:
+            for job_request in job_requests:
+                while not self._pending.acquire(timeout=0.1):
+                    if hasattr(self, "_exception"):
+                        break
+                if hasattr(self, "_exception"):
+                    break
+
+                if not precounted:
+                    count(job_request)
+
+                record_type = job_request["Record Type"]
+                
+                if record_type == "Item":
+                    self.add_item(job_request)
+                if record_type == "Test":
+                    self.add_test(job_request)
+                if record_type == "Item Image":
+                    self.add_item_image(job_request)
+                if record_type == "Test Image":
+                    self.add_test_image(job_request)
+        except Exception:
+            # Something went wrong making the job requests (e.g., a sheet
+            # couldn't be encoded), so don't leave the pool running. If a
+            # job had already failed and shut down the pool, that's the
+            # error to report.
+            self.thread_pool.terminate()
+            if hasattr(self, "_exception"):
+                raise self._exception
+            raise
 
         self.thread_pool.close()
         self.thread_pool.join()
 
         if hasattr(self, "_exception"):
             raise(self._exception)
+
+        if self.journal is not None and self.journal.resume:
+            Style.notice.print(f"Skipped {self.journal.skipped} job(s) "
+                                "that were already done")
         #}}}
 
 
     def execute(self, submit=False):
-
-        #sn_index = {}
-        #
-        #for job_num in sorted(self.item_jobs.keys()):
-        #    job = self.item_jobs[job_num]
-        #    pt_index = sn_index.setdefault(job.part_type_id, {})
-        #    
-        #    # TODO: check for serial number conficts
-        #    # print(job_num, (job.part_type_id, job.part_id, job.serial_number, job._sn_conflicts))
+        #{{{
+        '''Carries out all the jobs
+
+        The jobs are arranged in a JobGraph so that the ones that don't
+        depend on each other can run at the same time:
+
+          * Items are grouped by part type (see HWItem.bulk_key) into
+            batches of up to _bulk_batch_size, and each batch's core
+            properties and enabled status are sent with the bulk endpoints.
+            Then each item's location is updated, and any subcomponents
+            that are changing are released.
+          * Attaching subcomponents waits until every item has been created
+            and every release is done, because an item might want a
+            subcomponent that another item is about to give up, or that
+            hasn't been created yet.
+          * Tests wait for the item they belong to (a new item doesn't have
+            a part ID until it's created).
+          * Item images wait for their item, and test images wait for their
+            item and their test.
+          * Jobs that touch the same item (or the same test of the same
+            item) still run in the order they appear in the sheets.
+        '''
+
+        conflicts = self.check_serial_numbers()
+        if conflicts:
+            Style.error.print("Serial number conflicts found:")
+            for conflict in conflicts:
+                Style.error.print(f"    \u2022 {conflict}")
+            msg = f"{len(conflicts)} serial number conflict(s) found"
+            logger.error(msg)
+            raise ValueError(msg)
 
         def update_part_id(part_type_id, part_id, serial_number):
             # find any tests with the same part_type and serial_number
             # but don't have the part_id updated yet and update them.
-            for merge_test in self.test_jobs.values():
-                if HWTest._is_unassigned(merge_test._current['part_id']):
-                    if (merge_test._current['part_type_id'] == part_type_id
-                            and merge_test._current['serial_number'] == serial_number):
+            with _lock:
+                for merge_test in self.test_sn_index.get((part_type_id, serial_number), ()):
+                    if HWTest._is_unassigned(merge_test._current['part_id']):
                         merge_test._current['part_id'] = part_id
-    
-        # .....................................................................
 
-        def execute_item_jobs():
+        def simulate():
+            time.sleep(0.01)
 
-            #{{{
-            # . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . .
-            
-            def execute_item_core():
-                # Update the "core" part of the item, i.e., all but subcomponents
-                
-                if self.item_jobs:
-                    Style.info.print(f"    \u2022 Item Jobs: 0 / {len(self.item_jobs)}\x1b[K")
-                else:
-                    return
-
-                for job_index in sorted(self.item_jobs.keys()):
-                    job = self.item_jobs[job_index]
-                    logger.info(f"Item Job:\n{job}")
-                    if submit:
-                        # store this value, because it will change after updating
-                        is_new = job.is_new()
-
-                        # update the job
-                        job.update_core()
-                        job.update_enabled()
-                        job.update_location()
-
-                        if is_new:
-                            # update the part id in tests
-                            # (this is only necessary for new items, because old items
-                            # will already have their part id's looked up)
-                            # TODO: what if the user has changed the serial number??
-                            update_part_id(job.part_type_id, job.part_id, job.serial_number)
-                        #hwitems_touched.append(job.part_id)
-                    else:
-                        time.sleep(0.01)
-                    
-                    Style.info.print(f"\x1b[F    \u2022 Item Jobs: {job_index} / "
-                                f"{len(self.item_jobs)}\x1b[K")
-       
-            # . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . .
-            
-            def execute_item_clear_subcomponents():
-                # Clear any subcomponents that have changed.
-                # We do this instead of just attaching the new ones directly 
-                # because it's possible for an item to want to attach a subcomp
-                # that another item currently owns but is planning to change to
-                # a different one.
-
-                if self.item_jobs:
-                    Style.info.print(f"    \u2022 Evaluating subcomponents: 0 / {len(self.item_jobs)}\x1b[K")
-                else:
-                    return
-
-                for job_index in sorted(self.item_jobs.keys()):
-                    job = self.item_jobs[job_index]
-
-                    if submit:
-                        job.release_subcomponents()
-
-                    else:
-                        time.sleep(0.01)
-                    
-                    Style.info.print(f"\x1b[F    \u2022 Evaluating subcomponents: {job_index} / "
-                                f"{len(self.item_jobs)}\x1b[K")
-
-
-            # . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . .
-            
-            def execute_item_attach_subcomponents():
-                
-        
-                if self.item_jobs:
-                    Style.info.print(f"    \u2022 Updating subcomponents: 0 / {len(self.item_jobs)}\x1b[K")
-                else:
-                    return
-
-                for job_index in sorted(self.item_jobs.keys()):
-                    job = self.item_jobs[job_index]
-
-                    if submit:
-                        job.update_subcomponents()
-
-                    else:
-                        time.sleep(0.01)
-                    
-                    Style.info.print(f"\x1b[F    \u2022 Updating subcomponents: {job_index} / "
-                                f"{len(self.item_jobs)}\x1b[K")
-
-            # . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . . .
-           
-            #hwitems_touched = []
- 
-            execute_item_core()
-            execute_item_clear_subcomponents()
-            execute_item_attach_subcomponents()
-
-            #hwitems_touched.sort()
-            #logger.info(f"Making labels for: {hwitems_touched}")
-            # 
-            #if hwitems_touched:
-            #    pdflabels = PDFLabels(hwitems_touched)
-            #    pdflabels.use_default_label_types()
-            #    pdflabels.generate_label_sheets("ItemLabels.pdf")
-
-            #}}}
+        def journal_item(job_index, stage):
+            if self.journal is None:
+                return
+            job = self.item_jobs[job_index]
+            self.journal.record(self.journal_keys.get(("Item", job_index)), stage, "Item",
+                        part_id=job.part_id, part_type_id=job.part_type_id,
+                        part_type_name=job.part_type_name, serial_number=job.serial_number)
+
+        def journal_has_reached(job_index, stage):
+            if self.journal is None:
+                return False
+            return self.journal.has_reached(self.journal_keys.get(("Item", job_index)), stage)
+
+        def journal_job(record_type, job_index, part_id, part_type_id):
+            if self.journal is None:
+                return
+            self.journal.record(self.journal_keys.get((record_type, job_index)),
+                        STAGE_DONE, record_type, part_id=part_id,
+                        part_type_id=part_type_id)
 
         # .....................................................................
-       
-        def execute_test_jobs(): 
-            if self.test_jobs:
-                Style.info.print(f"    \u2022 Test Jobs: 0 / {len(self.test_jobs)}\x1b[K")
-            else:
-                return
-            
-            for job_index in sorted(self.test_jobs.keys()):
-                job = self.test_jobs[job_index]
+        #
+        #  The jobs themselves
+        #
+        # .....................................................................
 
-                if submit:
-                    job.update()
-                else:
-                    time.sleep(0.01)
+        def item_batch(batch):
+            jobs = [self.item_jobs[job_index] for job_index in batch]
+            for job in jobs:
+                logger.info(f"Item Job:\n{job}")
+            try:
+                HWItem.update_core_bulk(jobs)
+            finally:
+                # Journal every item that exists now (even if the bulk
+                # update failed partway), so that resuming edits them
+                # rather than creating them again
+                for job_index, job in zip(batch, jobs):
+                    if not HWTest._is_unassigned(job.part_id):
+                        journal_item(job_index, STAGE_CORE)
+            HWItem.update_enabled_bulk(jobs)
+
+        def item_core(job_index, is_new):
+            job = self.item_jobs[job_index]
+            # (Posting a location adds to the item's location history, so
+            # don't post it again if it was posted before resuming)
+            if not journal_has_reached(job_index, STAGE_LOCATION):
+                job.update_location()
+                journal_item(job_index, STAGE_LOCATION)
+
+            if is_new:
+                # update the part id in tests
+                # (this is only necessary for new items, because old items
+                # will already have their part id's looked up)
+                # TODO: what if the user has changed the serial number??
+                update_part_id(job.part_type_id, job.part_id, job.serial_number)
+
+        def item_attach(job_index):
+            self.item_jobs[job_index].update_subcomponents()
+            journal_item(job_index, STAGE_DONE)
+
+        def test(job_index):
+            job = self.test_jobs[job_index]
+            job.update()
+            journal_job("Test", job_index, job._current['part_id'],
+                        job._current['part_type_id'])
+
+        def item_image(job_index, job):
+            if job['Data']['External ID'] is None:
+
+                resp = ut.fetch_hwitems(
+                                job['Part Type ID'],
+                                job['Part Type Name'], 
+                                job['Data']['External ID'],
+                                job['Data']['Serial Number'])
+                job['Data']['External ID'] = list(resp)[0]
+
+            for image_job in job['Data']['Images']:
+
+                data = {"comments": image_job['Comments']}
+                resp = ra.post_hwitem_image(
+                        job['Data']['External ID'], 
+                        data, 
+                        image_job['Image File'])
+
+            journal_job("Item Image", job_index, job['Data']['External ID'],
+                        job['Part Type ID'])
+
+        def test_image(job_index, job):
+            # Resolve part_id if only Serial Number was provided
+            if job['Data']['External ID'] is None:
+                resp = ut.fetch_hwitems(
+                    job['Part Type ID'],
+                    job['Part Type Name'],
+                    job['Data']['External ID'],
+                    job['Data']['Serial Number']
+                )
+                job['Data']['External ID'] = list(resp)[0]
 
-                Style.info.print(f"\x1b[F    \u2022 Test Jobs: {job_index} / "
-                            f"{len(self.test_jobs)}\x1b[K")
+            for image_job in job['Data']['Images']:
+                comments = image_job.get('Comments') or ""
+                filename = image_job.get('Image File')
 
-        # .....................................................................
-        
-        def execute_item_image_jobs():
-            if self.item_image_jobs:
-                Style.info.print(f"    \u2022 Item Image Jobs: 0 / {len(self.item_image_jobs)}\x1b[K")
-            else:
-                return
+                if not filename:
+                    raise ValueError(
+                        f"Missing test image filename for job #{job_index}: {image_job}"
+                    )
 
-            logger.info(f"{self.item_image_jobs}")
+                hist_order = image_job.get('History Order', 0)
 
-            for job_index in sorted(self.item_image_jobs.keys()):
-                job = self.item_image_jobs[job_index]
+                data = {"comments": comments}
 
-                if submit:
+                resp = ra.post_test_image(
+                    part_id=job['Data']['External ID'],
+                    test_type_name=job['Test Name'],
+                    data=data,
+                    filename=filename,
+                    hist_order=hist_order,
+                )
 
-                    if job['Data']['External ID'] is None:
+            journal_job("Test Image", job_index, job['Data']['External ID'],
+                        job['Part Type ID'])
 
-                        resp = ut.fetch_hwitems(
-                                        job['Part Type ID'],
-                                        job['Part Type Name'], 
-                                        job['Data']['External ID'],
-                                        job['Data']['Serial Number'])
-                        #print(json.dumps(resp, indent=4))
-                        job['Data']['External ID'] = list(resp)[0]
+        # .....................................................................
+        #
+        #  Working out which jobs belong to the same item
+        #
+        # .....................................................................
 
-                    #print(job['Part Type ID'], 
-                    #    job['Part Type Name'], 
-                    #    job['Data']['External ID'],
-                    #    job['Data']['Serial Number'],
-                    #    job['Data']['Comments'], 
-                    #    sep='\n')
+        def item_keys(part_type_id, part_type_name, part_id, serial_number):
+            # An item may be identified by its part ID, or by its part type
+            # (ID or name) and serial number, so give every way that this
+            # row might refer to it.
+            keys = []
+            if not HWTest._is_unassigned(part_id):
+                keys.append(("part_id", part_id))
+            if serial_number is not None:
+                if part_type_id is not None:
+                    keys.append(("part_type_id", part_type_id, serial_number))
+                if part_type_name is not None:
+                    keys.append(("part_type_name", part_type_name, serial_number))
+            return keys
+
+        # item key -> the graph key of the last job that touched that item
+        last_core = {}
+        last_release = {}
+        last_attach = {}
+        # (item key, test name) -> the graph key of the last test job
+        last_test = {}
+
+        def deps_on(index, keys):
+            found = set()
+            for key in keys:
+                if key in index:
+                    found.add(index[key])
+            return found
+
+        def remember(index, keys, job_key):
+            for key in keys:
+                index[key] = job_key
 
-                    for image_job in job['Data']['Images']:
+        # .....................................................................
+        #
+        #  Building the graph
+        #
+        # .....................................................................
 
-                        data = {"comments": image_job['Comments']}
-                        resp = ra.post_hwitem_image(
-                                job['Data']['External ID'], 
-                                data, 
-                                image_job['Image File'])
+        graph = JobGraph()
+
+        GROUP_BATCH = "Item Batches"
+        GROUP_ITEM = "Item Jobs"
+        GROUP_RELEASE = "Evaluating subcomponents"
+        GROUP_ATTACH = "Updating subcomponents"
+        GROUP_TEST = "Test Jobs"
+        GROUP_ITEM_IMAGE = "Item Image Jobs"
+        GROUP_TEST_IMAGE = "Test Image Jobs"
+
+        def run(func, *args):
+            if not submit:
+                return simulate
+            return lambda: func(*args)
+
+        item_job_keys = {}
+        for job_index in sorted(self.item_jobs.keys()):
+            job = self.item_jobs[job_index]
+            item_job_keys[job_index] = item_keys(job.part_type_id, job.part_type_name,
+                                job.part_id, job.serial_number)
+
+        # Put the item jobs into batches. If an item shows up more than once,
+        # the later one has to go in a later batch, so that they're still
+        # done in order.
+        batches = []
+        open_batches = {}
+        batched_keys = set()
+        for job_index in sorted(self.item_jobs.keys()):
+            job = self.item_jobs[job_index]
+            keys = item_job_keys[job_index]
+            bulk_key = HWItem.bulk_key(job)
+
+            batch = open_batches.get(bulk_key, None)
+            if (batch is None or len(batch) >= _bulk_batch_size
+                    or batched_keys.intersection(keys)):
+                batch = []
+                batches.append(batch)
+                open_batches[bulk_key] = batch
+            batch.append(job_index)
+            batched_keys.update(keys)
+
+        all_cores_and_releases = []
+        for batch_num, batch in enumerate(batches):
+            batch_key = ("item batch", batch_num)
+            batch_deps = set()
+            for job_index in batch:
+                batch_deps |= deps_on(last_core, item_job_keys[job_index])
+            graph.add(batch_key, run(item_batch, batch),
+                        GROUP_BATCH, deps=batch_deps)
+            all_cores_and_releases.append(batch_key)
+
+            for job_index in batch:
+                job = self.item_jobs[job_index]
+                keys = item_job_keys[job_index]
+                core_key = ("item core", job_index)
+                graph.add(core_key, run(item_core, job_index, job.is_new()), GROUP_ITEM,
+                            deps={batch_key})
+                remember(last_core, keys, core_key)
+
+        for job_index in sorted(self.item_jobs.keys()):
+            job = self.item_jobs[job_index]
+            keys = item_job_keys[job_index]
+            core_key = ("item core", job_index)
+
+            release_key = ("item release", job_index)
+            graph.add(release_key, run(job.release_subcomponents), GROUP_RELEASE,
+                        deps={core_key} | deps_on(last_release, keys))
+            remember(last_release, keys, release_key)
+
+            all_cores_and_releases.extend([core_key, release_key])
+
+        for job_index in sorted(self.item_jobs.keys()):
+            job = self.item_jobs[job_index]
+            keys = item_job_keys[job_index]
+
+            attach_key = ("item attach", job_index)
+            graph.add(attach_key, run(item_attach, job_index), GROUP_ATTACH,
+                        deps=set(all_cores_and_releases) | deps_on(last_attach, keys))
+            remember(last_attach, keys, attach_key)
+
+        for job_index in sorted(self.test_jobs.keys()):
+            job = self.test_jobs[job_index]
+            current = job._current
+            keys = item_keys(current['part_type_id'], current['part_type_name'],
+                                current['part_id'], current['serial_number'])
+            test_keys = [(key, current['test_name']) for key in keys]
+
+            test_key = ("test", job_index)
+            graph.add(test_key, run(test, job_index), GROUP_TEST,
+                        deps=deps_on(last_core, keys) | deps_on(last_test, test_keys))
+            remember(last_test, test_keys, test_key)
+
+        last_item_image = {}
+        for job_index in sorted(self.item_image_jobs.keys()):
+            job = self.item_image_jobs[job_index]
+            keys = item_keys(job['Part Type ID'], job['Part Type Name'],
+                                job['Data']['External ID'], job['Data']['Serial Number'])
+
+            image_key = ("item image", job_index)
+            graph.add(image_key, run(item_image, job_index, job), GROUP_ITEM_IMAGE,
+                        deps=deps_on(last_core, keys) | deps_on(last_item_image, keys))
+            remember(last_item_image, keys, image_key)
+
+        last_test_image = {}
+        for job_index in sorted(self.test_image_jobs.keys()):
+            job = self.test_image_jobs[job_index]
+            keys = item_keys(job['Part Type ID'], job['Part Type Name'],
+                                job['Data']['External ID'], job['Data']['Serial Number'])
+            test_keys = [(key, job['Test Name']) for key in keys]
+
+            image_key = ("test image", job_index)
+            graph.add(image_key, run(test_image, job_index, job), GROUP_TEST_IMAGE,
+                        deps=(deps_on(last_core, keys) | deps_on(last_test, test_keys)
+                                | deps_on(last_test_image, test_keys)))
+            remember(last_test_image, test_keys, image_key)
 
-                else:
-                    time.sleep(0.01)
-                
-                Style.info.print(f"\x1b[F    \u2022 Item Image Jobs: {job_index} / "
-                            f"{len(self.item_image_jobs)}\x1b[K")
         # .....................................................................
-        def execute_test_image_jobs():
-            if self.test_image_jobs:
-                Style.info.print(f"    \u2022 Test Image Jobs: 0 / {len(self.test_image_jobs)}\x1b[K")
-            else:
-                return
-
-            logger.info(f"{self.test_image_jobs}")
-
-            for job_index in sorted(self.test_image_jobs.keys()):
-                job = self.test_image_jobs[job_index]
-
-                if submit:
-                    # Resolve part_id if only Serial Number was provided
-                    if job['Data']['External ID'] is None:
-                        resp = ut.fetch_hwitems(
-                            job['Part Type ID'],
-                            job['Part Type Name'],
-                            job['Data']['External ID'],
-                            job['Data']['Serial Number']
-                        )
-                        job['Data']['External ID'] = list(resp)[0]
-
-                    for image_job in job['Data']['Images']:
-                        comments = image_job.get('Comments') or ""
-                        filename = image_job.get('Image File')
-
-                        if not filename:
-                            raise ValueError(
-                                f"Missing test image filename for job #{job_index}: {image_job}"
-                            )
-
-                        hist_order = image_job.get('History Order', 0)
-
-                        data = {"comments": comments}
-
-                        resp = ra.post_test_image(
-                            part_id=job['Data']['External ID'],
-                            test_type_name=job['Test Name'],
-                            data=data,
-                            filename=filename,
-                            hist_order=hist_order,
-                        )
-
-                else:
-                    time.sleep(0.01)
-
-                Style.info.print(
-                    f"\x1b[F    \u2022 Test Image Jobs: {job_index} / "
-                    f"{len(self.test_image_jobs)}\x1b[K"
-                )
+        #
+        #  Running the graph
+        #
         # .....................................................................
-        
+
         if submit:
             Style.notice.print(f"Executing Jobs")
         else:
             Style.notice.print(f"Executing Jobs (SIMULATED! Use '--submit' to commit to the HWDB)")
                 
-        if (not self.item_jobs and not self.test_jobs and not self.item_image_jobs
-                        and not self.test_image_jobs):
+        if not len(graph):
             Style.error.print("    No jobs to execute")
             return
 
-        execute_item_jobs()
-        execute_test_jobs()
-        execute_item_image_jobs()
-        execute_test_image_jobs()
+        groups = [group for group in (GROUP_BATCH, GROUP_ITEM, GROUP_RELEASE, GROUP_ATTACH,
+                        GROUP_TEST, GROUP_ITEM_IMAGE, GROUP_TEST_IMAGE)
+                    if group in graph.group_totals]
+        lines_shown = 0
+
+        def show_progress(finished):
+            nonlocal lines_shown
+            if lines_shown:
+                print(f"\x1b[{lines_shown}F", end='')
+            for group in groups:
+                Style.info.print(f"    \u2022 {group}: {finished[group]} / "
+                            f"{graph.group_totals[group]}\x1b[K")
+            lines_shown = len(groups)
+
+        graph.run(self.num_threads, progress=show_progress)
+        #}}}
+
+    def check_serial_numbers(self):
+        #{{{
+        '''Looks for item jobs that would leave two items with the same serial number
+
+        Returns a list of messages describing each problem. Nothing is sent
+        to the HWDB. The serial numbers already in use were looked up when
+        the jobs were queued (in HWItem._sn_conflicts).
+        '''
+        conflicts = []
+
+        # (part_type_id, serial_number) -> {item: [job numbers]} for the
+        # serial numbers the items will have after the jobs are done. An
+        # existing item is identified by its part ID, so that several jobs
+        # editing the same item don't count as a conflict. Each new item is
+        # a different item.
+        sn_index = {}
+        # part_id -> serial number it will have, for items in this docket
+        final_sn = {}
+
+        for job_num in sorted(self.item_jobs.keys()):
+            job = self.item_jobs[job_num]
+            if job.serial_number is None:
+                continue
+            item = ("new", job_num) if job.is_new() else job.part_id
+            (sn_index.setdefault((job.part_type_id, job.serial_number), {})
+                    .setdefault(item, []).append(job_num))
+            if not job.is_new():
+                final_sn[job.part_id] = job.serial_number
+
+        for (part_type_id, serial_number), items in sn_index.items():
+            job_nums = sorted(n for nums in items.values() for n in nums)
+            if len(items) > 1:
+                conflicts.append(
+                        f"Item jobs {', '.join(f'#{n}' for n in job_nums)} "
+                        f"all use serial number '{serial_number}' "
+                        f"for part type {part_type_id}")
+
+            # If the serial number is being changed to one that another item
+            # already has, that item has to be changing its serial number too
+            for nums in items.values():
+                job_num = nums[0]
+                job = self.item_jobs[job_num]
+                for other_part_id in getattr(job, "_sn_conflicts", None) or ():
+                    if other_part_id == job.part_id:
+                        continue
+                    if final_sn.get(other_part_id, serial_number) == serial_number:
+                        conflicts.append(
+                                f"Item job #{job_num} changes the serial number of "
+                                f"{job.part_id} to '{serial_number}', which is "
+                                f"already used by {other_part_id}")
+
+        for msg in conflicts:
+            logger.warning(msg)
+
+        return conflicts
+        #}}}
+
+    def _submit(self, func, job_request):
+        def release_after(job_request):
+            try:
+                func(job_request)
+            finally:
+                self._pending.release()
+
+        self._apply(release_after, (job_request,), {}, self.regular_callback, self.error_callback)
 
     def error_callback(self, *args, **kwargs):
         #print("error callback:", args, kwargs)
-        self.thread_pool.terminate()
         self._exception = args[0]
+        self.thread_pool.terminate()
 
     def regular_callback(self, *args, **kwargs):
         #print("callback:", args, kwargs)
@@ -373,13 +599,15 @@ class JobManager:
                 item_job_number = self.item_job_count
                 self.display_job_queue_status()
 
+            journal_key = job_request.get("Journal Key")
             hwitem = HWItem.fromUserData(job_request['Data'])
 
             with _lock:
                 self.item_jobs[item_job_number] = hwitem
+                self.journal_keys["Item", item_job_number] = journal_key
                 self.display_job_queue_status()
 
-        self._apply(async_add_item, (job_request,), {}, self.regular_callback, self.error_callback)
+        self._submit(async_add_item, job_request)
                  
     def add_test(self, job_request):
         def async_add_test(job_request):
@@ -388,13 +616,17 @@ class JobManager:
                 test_job_number = self.test_job_count
                 self.display_job_queue_status()
 
+            journal_key = job_request.get("Journal Key")
             hwtest = HWTest.fromUserData(job_request['Data'])
 
             with _lock:
                 self.test_jobs[test_job_number] = hwtest
+                self.journal_keys["Test", test_job_number] = journal_key
+                sn_key = (hwtest._current['part_type_id'], hwtest._current['serial_number'])
+                self.test_sn_index.setdefault(sn_key, []).append(hwtest)
                 self.display_job_queue_status()
         
-        self._apply(async_add_test, (job_request,), {}, self.regular_callback, self.error_callback)
+        self._submit(async_add_test, job_request)
 
 
     def add_item_image(self, job_request):
@@ -408,9 +640,11 @@ class JobManager:
 
             with _lock:
                 self.item_image_jobs[item_image_job_number] = job_request
+                self.journal_keys["Item Image", item_image_job_number] = \
+                            job_request.get("Journal Key")
                 self.display_job_queue_status()
                  
-        self._apply(async_add_item_image, (job_request,), {}, self.regular_callback, self.error_callback)
+        self._submit(async_add_item_image, job_request)
 
 
     def add_test_image(self, job_request):
@@ -422,9 +656,11 @@ class JobManager:
 
             with _lock:
                 self.test_image_jobs[test_image_job_number] = job_request
+                self.journal_keys["Test Image", test_image_job_number] = \
+                            job_request.get("Journal Key")
                 self.display_job_queue_status()
 
-        self._apply(async_add_test_image, (job_request,), {}, self.regular_callback, self.error_callback)
+        self._submit(async_add_test_image, job_request)
 
     def display_job_queue_status(self):
         #{{{
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sisyphus/HWDBUtility/Upload/Journal.py
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+Keeps a record of the upload jobs that have been completed, so that an
+upload that dies partway through can pick up where it left off.
+
+When an upload is submitted, every job that finishes is appended to a
+journal file in the profile's directory, along with the part ID it ended
+up with. There is one journal per docket, named after a hash of the
+docket's definition. Running the upload again with --resume reads the
+journal back, and any job found in it is skipped before anything is looked
+up in the HWDB.
+
+The file is only ever appended to. An upload that isn't resumed starts a
+new run in the same file, so the part IDs recorded by earlier runs are
+still there to be found if needed, but --resume only picks up from the
+start of the last run.
+
+Jobs are identified by a hash of their contents (the record type, part
+type, test name, and the encoded data), plus a count of how many times the
+same contents have come up before, in case a sheet has two identical rows.
+So, if the row that made the upload fail is fixed in the spreadsheet, that
+row is not in the journal and will be uploaded, but all the rows that did
+make it are still skipped.
+
+Items are journalled in stages: as soon as the item has been created or
+updated, again when its location has been posted, and again when its
+subcomponents have been attached. If the upload dies before the last
+stage, resuming fills in the item's part ID so that it's treated as an
+edit, rather than creating the item a second time, and a location that
+was already posted isn't posted again. Tests and images that belong to a
+journalled item (and don't give its part ID) get the part ID from the
+journal as well.
+"""
+
+from Sisyphus.Configuration import config
+logger = config.getLogger(__name__)
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+JOURNAL_DIRNAME = "upload_journals"
+
+STAGE_CORE = "core"
+STAGE_LOCATION = "location"
+STAGE_DONE = "done"
+
+_STAGE_ORDER = {STAGE_CORE: 0, STAGE_LOCATION: 1, STAGE_DONE: 2}
+
+_UNASSIGNED = (None, '', '<unassigned>', '<tbd>', '<null>')
+
+def _is_unassigned(part_id):
+    return (part_id is None) or (str(part_id).casefold() in _UNASSIGNED)
+
+def _digest(obj):
+    text = json.dumps(obj, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class UploadJournal:
+    #{{{
+    '''An append-only record of completed upload jobs
+
+    Use UploadJournal.for_docket() to get the journal for a docket in the
+    active profile's directory.
+    '''
+
+    @classmethod
+    def for_docket(cls, docket, resume=False, profile=None):
+        profile = profile or config.active_profile
+        journal_dir = os.path.join(profile.profile_dir, JOURNAL_DIRNAME)
+        os.makedirs(journal_dir, mode=0o700, exist_ok=True)
+        filename = os.path.join(journal_dir, f"{cls.docket_hash(docket)}.jsonl")
+        return cls(filename, resume=resume)
+
+    @staticmethod
+    def docket_hash(docket):
+        '''Identifies a docket by its definition, not by its data
+
+        (The data might have been fixed since the last attempt.)
+        '''
+        return _digest(docket._raw)[:32]
+
+    def __init__(self, filename, resume=False):
+        self.filename = filename
+        self.resume = resume
+        self.lock = threading.Lock()
+
+        # job key -> the last entry for that job
+        self.entries = {}
+        # (part type ID or name, serial number) -> part ID
+        self.part_ids = {}
+        self._occurrences = {}
+
+        if resume:
+            self._load()
+        elif os.path.exists(filename) and os.path.getsize(filename) > 0:
+            logger.warning(f"Starting a new run in '{filename}'. Jobs journalled "
+                            "by earlier runs are kept, but won't be skipped.")
+
+        self._fp = open(filename, "a", encoding="utf-8")
+        if not resume:
+            self._write({"run": "start", "time": datetime.now().isoformat()})
+
+    def _load(self):
+        #{{{
+        if not os.path.exists(self.filename):
+            logger.warning(f"No upload journal found at '{self.filename}'; "
+                            "nothing will be skipped")
+            return
+
+        with open(self.filename, "r", encoding="utf-8") as fp:
+            for line_num, line in enumerate(fp, 1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Probably the last line, if we died while writing it
+                    logger.warning(f"Ignoring unreadable line {line_num} "
+                                    f"in '{self.filename}'")
+                    continue
+                if "run" in entry:
+                    # Only the last run is resumed
+                    self.entries.clear()
+                    self.part_ids.clear()
+                    continue
+                self._remember(entry)
+
+        logger.info(f"Loaded {len(self.entries)} job(s) from '{self.filename}'")
+        #}}}
+
+    def _remember(self, entry):
+        # A resumed upload may journal an earlier stage of a job again, but
+        # the furthest stage it got to is what counts
+        old = self.entries.get(entry["key"])
+        if old is None or _STAGE_ORDER.get(entry["stage"], 0) >= _STAGE_ORDER.get(old["stage"], 0):
+            self.entries[entry["key"]] = entry
+        if entry["record_type"] == "Item" and not _is_unassigned(entry.get("part_id")):
+            for part_type in (entry.get("part_type_id"), entry.get("part_type_name")):
+                if part_type is not None and entry.get("serial_number") is not None:
+                    self.part_ids[part_type, entry["serial_number"]] = entry["part_id"]
+
+    def close(self):
+        with self.lock:
+            if not self._fp.closed:
+                self._fp.close()
+
+    #--------------------------------------------------------------------------
+
+    def key_for(self, job_request):
+        '''Returns the key identifying a job request
+
+        Must be called for every job request, in order, before it's changed
+        by creating an HWItem or HWTest from it.
+        '''
+        content_key = _digest({
+            "Record Type": job_request.get("Record Type"),
+            "Part Type ID": job_request.get("Part Type ID"),
+            "Part Type Name": job_request.get("Part Type Name"),
+            "Test Name": job_request.get("Test Name"),
+            "Data": job_request.get("Data"),
+        })
+        with self.lock:
+            occurrence = self._occurrences.get(content_key, 0)
+            self._occurrences[content_key] = occurrence + 1
+        return f"{content_key}-{occurrence}"
+
+    def is_done(self, key):
+        return self.has_reached(key, STAGE_DONE)
+
+    def has_reached(self, key, stage):
+        entry = self.entries.get(key)
+        return (entry is not None
+                    and _STAGE_ORDER.get(entry["stage"], 0) >= _STAGE_ORDER[stage])
+
+    def finished_count(self, part_type_id):
+        '''How many jobs for a part type are done (and will be skipped)'''
+        return sum(1 for entry in self.entries.values()
+                        if entry["stage"] == STAGE_DONE
+                            and entry.get("part_type_id") == part_type_id)
+
+    def part_id_for(self, part_type_id, part_type_name, serial_number):
+        if serial_number is None:
+            return None
+        return (self.part_ids.get((part_type_id, serial_number))
+                    or self.part_ids.get((part_type_name, serial_number)))
+
+    def unfinished(self, job_requests):
+        '''Yields the job requests that aren't done yet
+
+        Each one gets its key under "Journal Key", and if the journal knows
+        the part ID of the item it's for, that's filled in.
+        '''
+        self.skipped = 0
+        for job_request in job_requests:
+            key = self.key_for(job_request)
+            if self.is_done(key):
+                self.skipped += 1
+                continue
+
+            job_request["Journal Key"] = key
+            data = job_request.get("Data", {})
+
+            if _is_unassigned(data.get("External ID")):
+                entry = self.entries.get(key)
+                if entry is not None and not _is_unassigned(entry.get("part_id")):
+                    part_id = entry["part_id"]
+                else:
+                    part_id = self.part_id_for(
+                                data.get("Part Type ID", job_request.get("Part Type ID")),
+                                data.get("Part Type Name", job_request.get("Part Type Name")),
+                                data.get("Serial Number"))
+                if part_id is not None:
+                    data["External ID"] = part_id
+
+            yield job_request
+
+    #--------------------------------------------------------------------------
+
+    def record(self, key, stage, record_type, *, part_id=None, part_type_id=None,
+                    part_type_name=None, serial_number=None):
+        '''Appends a completed job (or stage of a job) to the journal'''
+        if key is None:
+            return
+
+        entry = {
+            "key": key,
+            "stage": stage,
+            "record_type": record_type,
+            "part_id": part_id,
+            "part_type_id": part_type_id,
+            "part_type_name": part_type_name,
+            "serial_number": serial_number,
+        }
+        with self.lock:
+            self._remember(entry)
+            self._write(entry)
+
+    def _write(self, entry):
+        self._fp.write(json.dumps(entry, default=str) + "\n")
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+    #}}}
@@ -24,6 +24,7 @@ from Sisyphus.HWDBUtility.PDFLabels import PDFLabels
 
 from Sisyphus.DataModel import HWItem
 from Sisyphus.DataModel import HWTest
+import Sisyphus.RestApiV1.Utilities as ut
 
 from Sisyphus.Utils.utils import preserve_order, restore_order, serialize_for_display
 from Sisyphus.Utils.Terminal.Style import Style
@@ -31,6 +32,7 @@ from Sisyphus.Utils.Terminal.BoxDraw import Table
 from Sisyphus.Utils.Terminal import BoxDraw
 
 from .JobManager import JobManager
+from .Journal import UploadJournal
 
 from datetime import datetime
 
@@ -65,6 +67,11 @@ class Uploader():
         else:
             self._labels = False
 
+        if args:
+            self._resume = args.resume
+        else:
+            self._resume = False
+
         #
         # Load the docket
         #
@@ -84,12 +91,27 @@ class Uploader():
         Style.notice.print("Loading Sheets")
         self.docket.load_sheets()
         self.docket.verify_encoders()
+
+        # Keep track of what's been done, in case we need to resume. (A
+        # dry run doesn't do anything, so it doesn't start a new journal.)
+        if self._submit or self._resume:
+            self.journal = UploadJournal.for_docket(self.docket, resume=self._resume)
+            logger.info(f"Upload journal: {self.journal.filename}")
+        else:
+            self.journal = None
+
+        self.prefetch_serial_numbers()
         Style.notice.print("Encoding Sheets")
-        self.raw_job_data = self.docket.apply_encoders()
 
-        self.jobmanager = JobManager(self, self.raw_job_data)
+        try:
+            # Sheets are encoded as the JobManager asks for more jobs
+            self.jobmanager = JobManager(self, self.docket.iter_jobs(),
+                                            journal=self.journal)
 
-        self.jobmanager.execute(self._submit)
+            self.jobmanager.execute(self._submit)
+        finally:
+            if self.journal is not None:
+                self.journal.close()
 
         self.create_labels()
 
@@ -102,6 +124,40 @@ class Uploader():
     
     #--------------------------------------------------------------------------
 
+    def prefetch_serial_numbers(self):
+        #{{{
+        '''List the existing items of each part type in the docket
+
+        Every row is going to be looked up by serial number, so for each
+        part type, get the serial numbers of all its items at once (if
+        that's fewer requests than looking the rows up one at a time).
+        When resuming, jobs that the journal says are done don't count.
+        '''
+        expected_lookups = {}
+        for sheet_node in self.docket.sheets:
+            part_type_id = sheet_node["Encoder"].part_type_id
+            rows = sheet_node["Sheet"].rows or 0
+            if part_type_id is not None:
+                expected_lookups[part_type_id] = expected_lookups.get(part_type_id, 0) + rows
+
+        if self.journal is not None and self.journal.resume:
+            # Jobs that are already done are skipped without being looked up
+            for part_type_id in list(expected_lookups):
+                expected_lookups[part_type_id] -= self.journal.finished_count(part_type_id)
+                if expected_lookups[part_type_id] <= 0:
+                    del expected_lookups[part_type_id]
+
+        if not expected_lookups:
+            return
+
+        Style.notice.print("Looking up serial numbers")
+        for part_type_id, lookups in expected_lookups.items():
+            if ut.prefetch_serial_numbers(part_type_id, expected_lookups=lookups):
+                Style.info.print(f"    \u2022 {part_type_id}")
+        #}}}
+
+    #--------------------------------------------------------------------------
+
     def create_labels(self):
         #{{{
 
@@ -528,6 +584,10 @@ class Uploader():
                 ('--submit',),
                 {'dest': 'submit', 'action': 'store_true'}
             ),
+            (
+                ('--resume',),
+                {'dest': 'resume', 'action': 'store_true'}
+            ),
         ]
 
         parser = argparse.ArgumentParser(
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sisyphus/RestApiV1/RequestGovernor.py
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+Process-wide limit on how hard we push the REST API server.
+
+Several parts of Sisyphus keep their own thread pools (the shared executor
+in Utilities, the JobManager, the Shipping GUI, ...), and none of them know
+about each other. Every request made through RestApiV1._request (or
+RestApiV1.aio._request) now has to get a slot from the governor for its
+profile first, so the total number of requests in flight against a server
+is controlled in one place, no matter how many threads are asking.
+
+The number of slots adapts to how the server is coping (AIMD):
+
+  * Every successful response adds 1/limit to the limit, so the limit grows
+    by about one for each "round" of requests that succeed.
+  * A 5xx or 429 response, a "currently unavailable" page (whatever its
+    status code), a timeout, or a dropped connection halves the limit. Failures that arrive within DECREASE_COOLDOWN seconds of the last
+    decrease are assumed to be from the same burst and don't halve it again.
+
+The limit never goes above "max_in_flight" from the profile settings. A
+profile can also set "max_request_rate" (requests per second) to put a
+hard cap on the rate using a token bucket.
+"""
+
+from Sisyphus.Configuration import config
+logger = config.getLogger(__name__)
+
+import Sisyphus.Configuration as cfg # for keywords
+
+import asyncio
+from collections import deque
+import threading
+import time
+
+# Matches the size of the shared executor in RestApiV1.Utilities, so that by
+# default the governor only starts to matter once the server pushes back.
+DEFAULT_MAX_IN_FLIGHT = 50
+# Where the limit starts. This is below the 50 threads that could all send
+# at once before, so a burst right at startup is slowed down until the
+# limit has grown (by about one for each round of successful requests).
+INITIAL_LIMIT = 10
+MIN_LIMIT = 1
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN = 2.0
+
+SUCCESS = "success"
+CONGESTED = "congested"
+NEUTRAL = "neutral"
+
+###############################################################################
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+class Slot:
+    '''Permission to make one request, handed out by RequestGovernor.acquire
+
+    Record what happened with record_status() or record_congestion() before
+    giving it back with RequestGovernor.release(). A slot that is released
+    without recording anything doesn't change the limit.
+    '''
+    def __init__(self):
+        self.outcome = NEUTRAL
+
+    def record_status(self, status_code):
+        if status_code >= 500 or status_code == 429:
+            self.outcome = CONGESTED
+        elif status_code < 400:
+            self.outcome = SUCCESS
+
+    def record_congestion(self):
+        self.outcome = CONGESTED
+
+#------------------------------------------------------------------------------
+
+class RequestGovernor:
+    '''AIMD concurrency limit (plus an optional rate limit) for one profile
+
+    Use RequestGovernor.for_profile(profile) to get the shared instance.
+    '''
+
+    _instances = {}
+    _class_lock = threading.Lock()
+
+    @classmethod
+    def for_profile(cls, profile):
+        with cls._class_lock:
+            inst = cls._instances.get(profile.profile_name)
+            if inst is None:
+                inst = cls(
+                    max_in_flight=profile.settings.get(
+                            cfg.KW_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT),
+                    max_rate=profile.settings.get(cfg.KW_MAX_REQUEST_RATE, None),
+                    name=profile.profile_name)
+                cls._instances[profile.profile_name] = inst
+            return inst
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, max_rate=None, name=None):
+        self.name = name
+        self.max_in_flight = max(MIN_LIMIT, int(max_in_flight or DEFAULT_MAX_IN_FLIGHT))
+        self.limit = float(min(INITIAL_LIMIT, self.max_in_flight))
+        self.in_flight = 0
+
+        # Token bucket. A burst of up to one second's worth of requests is
+        # allowed after an idle period.
+        self.max_rate = float(max_rate) if max_rate else None
+        self.tokens = self.max_rate or 0.0
+        self.last_refill = time.monotonic()
+
+        self.last_decrease = 0.0
+        self.cv = threading.Condition()
+        # Coroutines waiting for a request in flight to finish, as
+        # (loop, future). release() wakes as many as could go.
+        self._async_waiters = deque()
+
+        self.successes = 0
+        self.congestions = 0
+        self.decreases = 0
+        self.waits = 0
+
+    #--------------------------------------------------------------------------
+
+    def _wait_time(self, now):
+        # Returns 0 if a request can go now, the number of seconds until the
+        # next token if we're waiting on the rate limit, or None if we're
+        # waiting for a request in flight to finish.
+        if self.in_flight >= int(self.limit):
+            return None
+
+        if self.max_rate is not None:
+            self.tokens = min(self.max_rate,
+                    self.tokens + (now - self.last_refill) * self.max_rate)
+            self.last_refill = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.max_rate
+
+        return 0
+
+    def _take(self):
+        self.in_flight += 1
+        if self.max_rate is not None:
+            self.tokens -= 1
+        return Slot()
+
+    def acquire(self):
+        '''Blocks until a request may be sent, and returns a Slot'''
+        with self.cv:
+            waited = False
+            while True:
+                wait = self._wait_time(time.monotonic())
+                if wait == 0:
+                    if waited:
+                        self.waits += 1
+                    return self._take()
+                waited = True
+                self.cv.wait(timeout=wait)
+
+    async def acquire_async(self):
+        '''The same as acquire(), but yields to the event loop while waiting'''
+        loop = asyncio.get_running_loop()
+        waited = False
+        while True:
+            with self.cv:
+                wait = self._wait_time(time.monotonic())
+                if wait == 0:
+                    if waited:
+                        self.waits += 1
+                    return self._take()
+                if wait is None:
+                    woken = loop.create_future()
+                    self._async_waiters.append((loop, woken))
+            waited = True
+
+            if wait is not None:
+                # Waiting for a token, which will be there in 'wait' seconds
+                await asyncio.sleep(wait)
+                continue
+
+            try:
+                await woken
+            except asyncio.CancelledError:
+                with self.cv:
+                    try:
+                        self._async_waiters.remove((loop, woken))
+                    except ValueError:
+                        # We were already woken, so pass it on
+                        self._wake_async()
+                raise
+
+    def _wake_async(self):
+        # Wakes the coroutines that could take a slot now. (They check for
+        # themselves, and wait again if a thread got there first.)
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._async_waiters:
+            loop, woken = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake, woken)
+            except RuntimeError:
+                # The loop has been closed
+                continue
+            free -= 1
+
+    def release(self, slot):
+        with self.cv:
+            self.in_flight -= 1
+
+            if slot.outcome == SUCCESS:
+                self.successes += 1
+                self.limit = min(self.max_in_flight, self.limit + 1 / self.limit)
+
+            elif slot.outcome == CONGESTED:
+                self.congestions += 1
+                now = time.monotonic()
+                if now - self.last_decrease >= DECREASE_COOLDOWN:
+                    old_limit = self.limit
+                    self.limit = max(MIN_LIMIT, self.limit * DECREASE_FACTOR)
+                    self.last_decrease = now
+                    self.decreases += 1
+                    logger.warning(f"Server is struggling; reducing the number "
+                            f"of concurrent requests for profile '{self.name}' "
+                            f"from {int(old_limit)} to {int(self.limit)}")
+
+            self.cv.notify_all()
+            self._wake_async()
+
+    #--------------------------------------------------------------------------
+
+    def stats(self):
+        '''A snapshot of the governor's state, for monitoring'''
+        with self.cv:
+            return {
+                "profile": self.name,
+                "limit": int(self.limit),
+                "max_in_flight": self.max_in_flight,
+                "max_request_rate": self.max_rate,
+                "in_flight": self.in_flight,
+                "successes": self.successes,
+                "congestions": self.congestions,
+                "decreases": self.decreases,
+                "waits": self.waits,
+            }
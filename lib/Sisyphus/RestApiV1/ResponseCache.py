@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sisyphus/RestApiV1/ResponseCache.py
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+Persistent, profile-scoped cache for read-only REST API responses.
+
+Things like component type definitions, test type definitions, and the
+lists of institutions, countries, and manufacturers hardly ever change, but
+every CLI run and every dashboard restart used to fetch them all over again.
+This module keeps the (already validated) JSON responses for those endpoints
+in a small SQLite database in the profile's directory, so that they can be
+reused across runs.
+
+The cache is opt-in. Set "response_cache" to true in the profile settings
+to turn it on. The default TTLs for each endpoint can be overridden with
+"response_cache_ttls", e.g.,
+
+    "response_cache_ttls": {"component_type": 600, "institutions": 0}
+
+A TTL of 0 disables caching for that endpoint.
+
+Once an entry is older than its TTL, it is not thrown away. If the server
+had given us an ETag or Last-Modified header, the next request is sent with
+If-None-Match/If-Modified-Since, and a "304 Not Modified" lets us keep using
+the stored copy. Passing refresh=True to any RestApiV1 function skips the
+lookup (but still stores the new response).
+"""
+
+from Sisyphus.Configuration import config
+logger = config.getLogger(__name__)
+
+import Sisyphus.Configuration as cfg # for keywords
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import urllib.parse
+
+CACHE_FILENAME = "response_cache.sqlite"
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# Endpoints that may be cached, and how long (in seconds) an entry is
+# considered fresh before it has to be revalidated. Patterns are matched
+# against the part of the URL path that follows "api/v1/". Anything that
+# isn't listed here is never cached.
+ENDPOINT_TTLS = {
+    "component_type": (r"component-types/[^/]+", HOUR),
+    "component_type_specifications": (r"component-types/[^/]+/specifications", HOUR),
+    "component_type_connectors": (r"component-types/[^/]+/connectors", HOUR),
+    "test_types": (r"component-types/[^/]+/test-types", HOUR),
+    "test_type": (r"component-types/[^/]+/test-types/[^/]+", HOUR),
+    "institutions": (r"institutions", DAY),
+    "countries": (r"countries", DAY),
+    "manufacturers": (r"manufacturers", DAY),
+    "projects": (r"projects", DAY),
+    "systems": (r"systems/[^/]+(/[^/]+)?", DAY),
+    "subsystems": (r"subsystems/[^/]+/[^/]+(/[^/]+)?", DAY),
+}
+
+_ENDPOINT_PATTERNS = [
+    (name, re.compile(rf"(?:.*/)?api/v1/{pattern}"), ttl)
+        for name, (pattern, ttl) in ENDPOINT_TTLS.items()
+]
+
+###############################################################################
+
+class CacheEntry:
+    def __init__(self, data, stored, ttl, etag, last_modified):
+        self.data = data
+        self.stored = stored
+        self.ttl = ttl
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def is_fresh(self):
+        return time.time() < self.stored + self.ttl
+
+    @property
+    def validators(self):
+        '''Headers for asking the server if our copy is still good'''
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+#------------------------------------------------------------------------------
+
+class ResponseCache:
+    '''An SQLite-backed store of JSON responses for one profile
+
+    Use ResponseCache.for_profile(profile) rather than creating these
+    directly. It returns None if the profile hasn't enabled the cache.
+    '''
+
+    _instances = {}
+    _class_lock = threading.Lock()
+
+    @classmethod
+    def for_profile(cls, profile):
+        if not profile.settings.get(cfg.KW_RESPONSE_CACHE, False):
+            return None
+
+        with cls._class_lock:
+            inst = cls._instances.get(profile.profile_name)
+            if inst is None:
+                filename = os.path.join(profile.profile_dir, CACHE_FILENAME)
+                ttls = profile.settings.get(cfg.KW_RESPONSE_CACHE_TTLS, {}) or {}
+                inst = cls(filename, ttls)
+                cls._instances[profile.profile_name] = inst
+            return inst
+
+    def __init__(self, filename, ttl_overrides=None):
+        self.filename = filename
+        self.ttl_overrides = dict(ttl_overrides or {})
+        self.lock = threading.Lock()
+
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        with self.lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "  key TEXT PRIMARY KEY,"
+                "  url TEXT NOT NULL,"
+                "  body TEXT NOT NULL,"
+                "  stored REAL NOT NULL,"
+                "  ttl REAL NOT NULL,"
+                "  etag TEXT,"
+                "  last_modified TEXT)")
+
+    #--------------------------------------------------------------------------
+
+    def ttl_for(self, url):
+        '''Returns the TTL for a URL, or None if it shouldn't be cached'''
+        path = urllib.parse.urlsplit(url).path
+        for name, pattern, ttl in _ENDPOINT_PATTERNS:
+            if pattern.fullmatch(path):
+                ttl = self.ttl_overrides.get(name, ttl)
+                return ttl if ttl and ttl > 0 else None
+        return None
+
+    @staticmethod
+    def make_key(method, url, params=None):
+        if params is None:
+            params = []
+        elif isinstance(params, dict):
+            params = list(params.items())
+        query = urllib.parse.urlencode(sorted((str(k), str(v)) for k, v in params))
+        return f"{method.upper()} {url}?{query}"
+
+    #--------------------------------------------------------------------------
+
+    def get(self, key):
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT body, stored, ttl, etag, last_modified "
+                "FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        body, stored, ttl, etag, last_modified = row
+        try:
+            return CacheEntry(json.loads(body), stored, ttl, etag, last_modified)
+        except json.JSONDecodeError:
+            self.delete(key)
+            return None
+
+    def put(self, key, url, data, ttl, etag=None, last_modified=None):
+        body = json.dumps(data)
+        with self.lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, body, stored, ttl, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, body, time.time(), ttl, etag, last_modified))
+
+    def touch(self, key):
+        '''Marks an entry as fresh again (after a "304 Not Modified")'''
+        with self.lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET stored = ? WHERE key = ?",
+                (time.time(), key))
+
+    def delete(self, key):
+        with self.lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def invalidate(self, url):
+        '''Drops every entry whose URL starts with the given URL
+
+        Called after a successful POST/PATCH, so that, e.g., patching a
+        component type also forgets its cached test types.
+        '''
+        prefix = url.split("?", 1)[0].rstrip("/")
+        escaped = (prefix.replace("\\", "\\\\")
+                         .replace("%", "\\%")
+                         .replace("_", "\\_"))
+        with self.lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM responses WHERE url = ? OR url LIKE ? ESCAPE '\\'",
+                (prefix, f"{escaped}/%"))
+
+    def clear(self):
+        with self.lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
@@ -305,11 +305,20 @@ class SessionManager:
     #        return profile_manager
     @property
     def profile_manager(self):
-        with self.__class__._profile_lock:
-            mgr = self.__class__._profile_managers.get(self.profile.profile_name)
+        return self.__class__.profile_manager_for(self.profile)
+
+    @classmethod
+    def profile_manager_for(cls, profile):
+        '''Get the ProfileManager for a profile without creating a Session
+
+        The async transport (RestApiV1.aio) doesn't use requests.Session
+        objects, but it must share the same bearer token and refresh logic.
+        '''
+        with cls._profile_lock:
+            mgr = cls._profile_managers.get(profile.profile_name)
             if mgr is None:
-                mgr = ProfileManager(self.profile)
-                self.__class__._profile_managers[self.profile.profile_name] = mgr
+                mgr = ProfileManager(profile)
+                cls._profile_managers[profile.profile_name] = mgr
             return mgr
 
     @property
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sisyphus/RestApiV1/RetryPolicy.py
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+Decides whether, when, and how a failed REST API request is tried again.
+
+The old "retry" wrapper went straight to the next attempt after a
+connection failure, and slept exactly 5 seconds after "currently
+unavailable." With dozens of threads hitting the same blip, they would all
+come back at the same moment and knock the server over again. A RetryPolicy
+instead waits a random time between 0 and an exponentially growing cap
+("full jitter") before each retry, and can also put limits on the whole
+operation:
+
+  * "deadline": the most seconds to spend on a request, including all
+    retries and waits. The timeout for each attempt is shortened so that
+    it doesn't run past the deadline.
+  * "retry_budget"/"retry_budget_window": the most retries that may be made
+    for the profile within a window of time. Once it's used up, failures
+    are raised right away instead of piling more load onto the server.
+    The budget is shared by every thread using the profile, so it's off
+    (null) unless a profile sets one. Retrying after an expired token
+    doesn't count against it.
+
+POST and PATCH requests are only tried again if we know the server never
+got them, or it turned them away (an expired token, or "currently
+unavailable"), since otherwise we might create something twice. Pass idempotent=True to a
+RestApiV1 function (or set "retry_non_idempotent" in the policy) to
+override that.
+
+The policy comes from the "retry_policy" dictionary in the profile settings,
+and can be changed for a single call with retry_policy={...}. Unknown keys
+are logged and ignored. The number of
+attempts and each attempt's timeout still come from "timeouts."
+
+    "retry_policy": {
+        "backoff_base": 1.0,
+        "backoff_max": 30.0,
+        "deadline": null,
+        "retry_budget": null,
+        "retry_budget_window": 60,
+        "retry_non_idempotent": false
+    }
+
+retry_stats() returns counts of calls, retries, and failures by endpoint.
+"""
+
+from Sisyphus.Configuration import config
+logger = config.getLogger(__name__)
+
+import Sisyphus.Configuration as cfg # for keywords
+from .exceptions import *
+
+from collections import defaultdict, deque
+import random
+import re
+import threading
+import time
+import urllib.parse
+
+IDEMPOTENT_METHODS = ("get", "head", "options", "put", "delete")
+
+RETRYABLE_EXCEPTIONS = (ConnectionFailed, ExpiredSignature, CurrentlyUnavailable)
+
+POLICY_OPTIONS = ("backoff_base", "backoff_max", "deadline", "retry_budget",
+                    "retry_budget_window", "retry_non_idempotent")
+_warned_options = set()
+
+###############################################################################
+
+class RetryBudget:
+    '''A limit on how many retries a profile may make in a window of time'''
+
+    _instances = {}
+    _class_lock = threading.Lock()
+
+    @classmethod
+    def for_profile(cls, profile, max_retries, window):
+        with cls._class_lock:
+            key = (profile.profile_name, max_retries, window)
+            inst = cls._instances.get(key)
+            if inst is None:
+                inst = cls(max_retries, window)
+                cls._instances[key] = inst
+            return inst
+
+    def __init__(self, max_retries, window):
+        self.max_retries = max_retries
+        self.window = window
+        self.lock = threading.Lock()
+        self._spent = deque()
+
+    def try_spend(self):
+        '''Uses up one retry. Returns False if there are none left.'''
+        if self.max_retries is None:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            while self._spent and self._spent[0] <= now - self.window:
+                self._spent.popleft()
+            if len(self._spent) >= self.max_retries:
+                return False
+            self._spent.append(now)
+            return True
+
+#------------------------------------------------------------------------------
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {"calls": 0, "retries": 0, "failures": 0,
+                                "budget_exhausted": 0})
+
+# Path segments that hold IDs (part IDs, part type IDs, numbers) are
+# collapsed, so that the counts are per endpoint rather than per item.
+_ID_SEGMENT = re.compile(r"[^/]*\d[^/]*")
+
+def endpoint_name(method, url):
+    '''Turns a request into a label like "GET components/{id}/tests"'''
+    path = urllib.parse.urlsplit(url).path
+    path = path.split("api/v1/", 1)[-1]
+    path = "/".join(_ID_SEGMENT.sub("{id}", seg) if seg else seg
+                            for seg in path.split("/"))
+    return f"{method.upper()} {path}"
+
+def _count(endpoint, counter):
+    with _stats_lock:
+        _stats[endpoint][counter] += 1
+
+def retry_stats():
+    '''Counts of calls, retries, and failures by endpoint, for monitoring'''
+    with _stats_lock:
+        return {endpoint: dict(counts) for endpoint, counts in _stats.items()}
+
+def reset_retry_stats():
+    with _stats_lock:
+        _stats.clear()
+
+###############################################################################
+
+class RetryPolicy:
+    '''How a request should be retried
+
+    Use RetryPolicy.for_call() to get the policy that applies to a call.
+    '''
+
+    def __init__(self, timeouts, *, backoff_base=1.0, backoff_max=30.0,
+                    deadline=None, retry_budget=None, retry_budget_window=60,
+                    retry_non_idempotent=False):
+
+        if type(timeouts) not in (list, tuple):
+            timeouts = (timeouts,)
+        self.timeouts = tuple(timeouts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.retry_budget = retry_budget
+        self.retry_budget_window = retry_budget_window
+        self.retry_non_idempotent = retry_non_idempotent
+
+    @classmethod
+    def for_call(cls, profile, default_timeouts, timeouts=None, retry_policy=None):
+        '''Combines the call's options, the profile's settings, and defaults
+
+        retry_policy may be a RetryPolicy (used as-is) or a dictionary of
+        options that override the profile's "retry_policy" settings.
+        '''
+        if isinstance(retry_policy, RetryPolicy):
+            return retry_policy
+
+        timeouts = ( timeouts
+                    or profile.settings.get(cfg.KW_TIMEOUTS, None)
+                    or default_timeouts )
+
+        options = {
+            **(profile.settings.get(cfg.KW_RETRY_POLICY, None) or {}),
+            **(retry_policy or {}),
+        }
+        for key in [key for key in options if key not in POLICY_OPTIONS]:
+            # A typo in the profile shouldn't make every request fail
+            if key not in _warned_options:
+                _warned_options.add(key)
+                logger.warning(f"Ignoring unknown retry_policy option '{key}'. "
+                                f"Valid options are: {', '.join(POLICY_OPTIONS)}")
+            del options[key]
+        return cls(timeouts, **options)
+
+    def backoff(self, retry_num):
+        '''Seconds to wait before retry number retry_num (starting at 0)'''
+        cap = min(self.backoff_max, self.backoff_base * (2 ** retry_num))
+        return random.uniform(0, cap)
+
+    def begin(self, method, url, profile, idempotent=None):
+        return RetryState(self, method, url, profile, idempotent)
+
+#------------------------------------------------------------------------------
+
+class RetryState:
+    '''Keeps track of the attempts for one call
+
+    Usage:
+
+        state = policy.begin(method, url, profile)
+        for timeout in state.attempts():
+            try:
+                result = do_request(timeout)
+                break
+            except RETRYABLE_EXCEPTIONS as err:
+                time.sleep(state.failed(err))   # raises err if giving up
+    '''
+
+    def __init__(self, policy, method, url, profile, idempotent=None):
+        self.policy = policy
+        self.method = method.lower()
+        self.url = url
+        self.endpoint = endpoint_name(method, url)
+        self.budget = RetryBudget.for_profile(profile,
+                    policy.retry_budget, policy.retry_budget_window)
+
+        if idempotent is None:
+            idempotent = (self.method in IDEMPOTENT_METHODS
+                            or policy.retry_non_idempotent)
+        self.idempotent = idempotent
+
+        self.started = time.monotonic()
+        self.deadline_at = (self.started + policy.deadline
+                                if policy.deadline else None)
+        self.try_num = 0
+        self.last_err = None
+
+        _count(self.endpoint, "calls")
+
+    def remaining(self):
+        if self.deadline_at is None:
+            return None
+        return self.deadline_at - time.monotonic()
+
+    def attempts(self):
+        '''Yields the timeout to use for each attempt'''
+        for try_num, timeout in enumerate(self.policy.timeouts):
+            self.try_num = try_num
+            remaining = self.remaining()
+            if remaining is not None:
+                # Don't let the attempt run past the deadline
+                if timeout is None:
+                    timeout = remaining
+                elif type(timeout) in (list, tuple):
+                    timeout = tuple(min(t, remaining) for t in timeout)
+                else:
+                    timeout = min(timeout, remaining)
+            yield timeout
+
+    def _safe_to_retry(self, err):
+        if self.idempotent:
+            return True
+        if isinstance(err, (ExpiredSignature, CurrentlyUnavailable)):
+            # The server turned it away at the door
+            return True
+        if isinstance(err, ConnectionFailed) and not err.request_sent:
+            return True
+        return False
+
+    def _give_up(self, err, reason):
+        _count(self.endpoint, "failures")
+        logger.error(f"{self.endpoint} failed after {self.try_num+1} "
+                        f"attempt(s): {reason}")
+        raise err
+
+    def failed(self, err):
+        '''Decides what to do after a failed attempt
+
+        Returns the number of seconds to wait before the next attempt, or
+        re-raises err if the call shouldn't be tried again.
+        '''
+        self.last_err = err
+
+        if self.try_num + 1 >= len(self.policy.timeouts):
+            self._give_up(err, "max attempts reached")
+
+        if not self._safe_to_retry(err):
+            self._give_up(err, f"not retrying a {self.method.upper()} "
+                                "that may have reached the server")
+
+        if isinstance(err, ExpiredSignature):
+            # Nothing to wait for. The token will be refreshed.
+            delay = 0
+        else:
+            delay = self.policy.backoff(self.try_num)
+
+        remaining = self.remaining()
+        if remaining is not None and remaining <= delay:
+            self._give_up(err, "deadline reached")
+
+        if (not isinstance(err, ExpiredSignature)
+                    and not self.budget.try_spend()):
+            _count(self.endpoint, "budget_exhausted")
+            self._give_up(err, "retry budget exhausted")
+
+        _count(self.endpoint, "retries")
+        logger.info(f"{self.endpoint}: {type(err).__name__} "
+                        f"(attempt #{self.try_num+1}); retrying in {delay:.1f}s")
+        return delay
@@ -16,10 +16,11 @@ from Sisyphus.Utils import utils
 
 import sys
 from copy import deepcopy
-from collections import namedtuple
+from collections import namedtuple, deque
 import json
 
 import concurrent.futures
+import threading
 
 # This is probably not recommended, but I wanted the ThreadPoolExecutor to
 # reuse its threads each time it is run, because each thread has to get its
@@ -31,6 +32,12 @@ _executor = concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS)
 from contextlib import nullcontext
 _nullcontext = nullcontext()
 
+# Defaults for iter_hwitems(). The page size is small enough that a single
+# page is quick to transfer and decode, and the prefetch depth bounds how
+# many pages can be sitting in memory (or in flight) at any one time.
+ITER_PAGE_SIZE = 1000
+ITER_PREFETCH = 4
+
 #######################################################################
 
 PartType = namedtuple('PartType', ['id', 'name'])
@@ -84,7 +91,8 @@ def fetch_component_type(part_type_id=None, part_type_name=None, use_cache=True,
     subsequent queries for the same component type. Setting use_cache to
     False will cause the function to fetch the data regardless of what's
     in the cache, but it will still cache its results to be available for
-    future calls.
+    future calls. (It also bypasses the on-disk response cache, if the
+    profile has one turned on.)
 
     Raises
     ------
@@ -175,7 +183,8 @@ def fetch_component_type(part_type_id=None, part_type_name=None, use_cache=True,
 
     # Get the main component type record
     try:
-        retval["ComponentType"] = ra.get_component_type(part_type_id, params=params)[ra.KW_DATA]
+        retval["ComponentType"] = ra.get_component_type(part_type_id, params=params,
+                                                refresh=not use_cache)[ra.KW_DATA]
     except ra.DatabaseError as db_err:
         # Decide if this error was raised because there is no component
         # type with that part_type_id, or for some other reason we can't
@@ -187,13 +196,15 @@ def fetch_component_type(part_type_id=None, part_type_name=None, use_cache=True,
         else:
             raise db_err from None
 
-    retval["TestTypes"] = ra.get_test_types(part_type_id, params=params)[ra.KW_DATA]
+    retval["TestTypes"] = ra.get_test_types(part_type_id, params=params,
+                                                refresh=not use_cache)[ra.KW_DATA]
     
     retval["TestTypeDefs"] = {}
 
     for test_type in retval["TestTypes"]:
         retval["TestTypeDefs"][test_type["name"]] = \
-                    ra.get_test_type(part_type_id, test_type["id"], params=params)
+                    ra.get_test_type(part_type_id, test_type["id"], params=params,
+                                                refresh=not use_cache)
 
     _cache[part_type_id] = retval
     return retval
@@ -294,183 +305,497 @@ def lookup_part_type_by_name(part_type_name, max_records=100):
 
 #######################################################################
 
-def fetch_hwitems(part_type_id = None,
+def find_hwitems(part_type_id = None,
                 part_type_name = None,
                 part_id = None,
                 serial_number = None,
                 count = 50):
     #{{{
-    '''retrieve multiple items from the HWDB based on criteria
+    '''find the part IDs of the items in the HWDB that match the criteria
 
-    Uses "get_hwitems", which unfortunately (1) can't be queried in reverse
-    order, and (2) doesn't pull back the ENTIRE record like "get_hwitem"
-    (singular) does. So, it has to do a fuckton of extra work and can take
-    a horribly long time.
+    Returns up to 'count' part IDs (or all of them, if count is -1), newest
+    first, without fetching the items themselves. (fetch_hwitems() and
+    fetch_hwitems_bulk() do that.)
+
+    If there's no part type, the part_id is taken as given.
     '''
 
-    logger.info(f"<fetch_hwitems> part_type_id={part_type_id}, part_type_name={part_type_name}, "
+    logger.info(f"<find_hwitems> part_type_id={part_type_id}, part_type_name={part_type_name}, "
             f"part_id={part_id}, serial_number={serial_number}, count={count}")
 
-    NUM_THREADS = 50
     MIN_PAGE_SIZE = 50
     MAX_PAGE_SIZE = 250
 
-    # We're going to use a thread pool to get things, but we need to wrap
-    # the functions we need in order to pass the arguments correctly.
-    get_hwitems = lambda args, kwargs: ra.get_hwitems(*args, **kwargs)
-    get_hwitem = lambda args, kwargs: ra.get_hwitem(*args, **kwargs)
-    get_subcomponents = lambda args, kwargs: ra.get_subcomponents(*args, **kwargs)
-    get_locations = lambda args, kwargs: ra.get_hwitem_locations(*args, **kwargs)
+    if not (part_type_name or part_type_id):
+        # TODO: maybe could check if the serial number matches, if they
+        # suppied it. But for now just accept the part_id and ignore
+        # the serial_number entirely
+        return [part_id]
 
+    count = max(1, 100000 if (count == -1) else count)
 
-    def fetch_multiple(part_type_id, part_type_name, part_id, serial_number, count):
-        
-        count = max(1, 100000 if (count == -1) else count)
-
-        # "get_hwitems" doesn't permit part_type_name, so if it's present,
-        # we have to look up the part_type_id for it, and ensure that
-        # it is consistent with the given part_type_id, if there is one.
-        if part_type_name is not None:
-            # We don't need everything that this returns, but the function
-            # does check for consistency, so we'll use it.
-            component_type = fetch_component_type(
-                                        part_type_id=part_type_id,
-                                        part_type_name=part_type_name)
-            # If the above didn't raise anything, we're good.
-            # Let's grab the part_type_id from it, in case we don't
-            # already have it.
-            part_type_id = component_type["ComponentType"]["part_type_id"]
-
-        retval = {}
-
-        # Let's first find out how many records we're dealing with
-
-        # There's no sense in using a page size that's too small, because
-        # we're more likely to capture the desired number of records if
-        # the page is larger. Likewise, we don't want the page to be too
-        # large, either.
-        page_size = min(max(count, MIN_PAGE_SIZE), MAX_PAGE_SIZE)
-
+    # "get_hwitems" doesn't permit part_type_name, so if it's present,
+    # we have to look up the part_type_id for it, and ensure that
+    # it is consistent with the given part_type_id, if there is one.
+    if part_type_name is not None:
+        # We don't need everything that this returns, but the function
+        # does check for consistency, so we'll use it.
+        component_type = fetch_component_type(
+                                    part_type_id=part_type_id,
+                                    part_type_name=part_type_name)
+        # If the above didn't raise anything, we're good.
+        # Let's grab the part_type_id from it, in case we don't
+        # already have it.
+        part_type_id = component_type["ComponentType"]["part_type_id"]
+
+    # If every item of this part type has already been listed, we know
+    # which ones have this serial number without asking.
+    if part_id is None and serial_number is not None:
+        indexed = lookup_serial_number(part_type_id, serial_number)
+        if indexed is not None:
+            logger.debug("using serial number index")
+            return indexed[::-1][:count]
+
+    # Let's first find out how many records we're dealing with
+
+    # There's no sense in using a page size that's too small, because
+    # we're more likely to capture the desired number of records if
+    # the page is larger. Likewise, we don't want the page to be too
+    # large, either.
+    page_size = min(max(count, MIN_PAGE_SIZE), MAX_PAGE_SIZE)
+
+    resp = ra.get_hwitems(
+                part_type_id=part_type_id,
+                part_id=part_id,
+                serial_number=serial_number,
+                size=page_size)
+    total_records = resp["pagination"]["total"]
+    num_pages = resp["pagination"]["pages"]
+
+    pages = {1: resp["data"]}
+
+    # If there's only one page, then we already have everything we need.
+    if num_pages == 1:
+        pass
+
+    # If there's two pages, then grab the second page, and we have
+    # everything we need
+    elif num_pages == 2:
         resp = ra.get_hwitems(
                     part_type_id=part_type_id,
                     part_id=part_id,
                     serial_number=serial_number,
-                    size=page_size)
-        total_records = resp["pagination"]["total"]
-        num_pages = resp["pagination"]["pages"]
-
-        pages = {1: resp["data"]}
-
-        # If there's only one page, then we already have everything we need.
-        if num_pages == 1:
-            pass
-
-        # If there's two pages, then grab the second page, and we have
-        # everything we need
-        elif num_pages == 2:
-            resp = ra.get_hwitems(
-                        part_type_id=part_type_id,
-                        part_id=part_id,
-                        serial_number=serial_number,
-                        size=page_size,
-                        page=2)
-            pages[2] = resp["data"]
-
-        # If there's more than two pages, then calculate how many pages we
-        # need, and get them.
-        else:
-            items_on_last_page = total_records - page_size * (num_pages - 1)
-            pages_needed = (count - 1) // page_size + 1
-            if (pages_needed-1) * page_size + items_on_last_page < count:
-                pages_needed += 1
-
-            # # Generate a bunch of async requests to get our data in parallel
-            #with concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
-            with _nullcontext:
-                page_res = {}
-                for page_num in range(num_pages, max(1, num_pages - pages_needed), -1):
-                    kwargs = \
-                    {
-                        "part_type_id": part_type_id,
-                        "part_id": part_id,
-                        "serial_number": serial_number,
-                        "size": page_size,
-                        "page": page_num,
-                    }
-                    page_res[page_num] = _executor.submit(ra.get_hwitems, **kwargs)
-                # # Read all the data that was gathered
-                for page_num, res in page_res.items():
-                    pages[page_num] = res.result()["data"]
-
-
-        # Iterate backwards through "pages" until we get the right number
-        # of records
-        part_ids = []
-        for page_num in reversed(sorted(pages.keys())):
-            page = pages[page_num]
-            if len(part_ids) >= count: break
-            for rec in reversed(page):
-                part_ids.append(rec["part_id"])
-                if len(part_ids) >= count: break
+                    size=page_size,
+                    page=2)
+        pages[2] = resp["data"]
 
-        
-        hwitems = {part_id: {} for part_id in part_ids}
+    # If there's more than two pages, then calculate how many pages we
+    # need, and get them.
+    else:
+        items_on_last_page = total_records - page_size * (num_pages - 1)
+        pages_needed = (count - 1) // page_size + 1
+        if (pages_needed-1) * page_size + items_on_last_page < count:
+            pages_needed += 1
 
+        # # Generate a bunch of async requests to get our data in parallel
         #with concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
         with _nullcontext:
-            # Generate more async requests
-            hwitems_res = {}
-            for part_id in part_ids:
-
-                item_res = _executor.submit(ra.get_hwitem, part_id=part_id)
-                subcomp_res = _executor.submit(ra.get_subcomponents, part_id=part_id)
-                location_res = _executor.submit(ra.get_hwitem_locations, part_id=part_id)
-                hwitems_res[part_id] = {
-                    "Item": item_res, 
-                    "Subcomponents": subcomp_res,
-                    "Locations": location_res
-                }
-
-            # Gather the collected data
-            for part_id, res_dict in hwitems_res.items():
-                hwitems[part_id] = \
+            page_res = {}
+            for page_num in range(num_pages, max(1, num_pages - pages_needed), -1):
+                kwargs = \
                 {
-                    "Item": res_dict["Item"].result()["data"],
-                    "Subcomponents": res_dict["Subcomponents"].result()["data"],
-                    "Locations": res_dict["Locations"].result()["data"],
+                    "part_type_id": part_type_id,
+                    "part_id": part_id,
+                    "serial_number": serial_number,
+                    "size": page_size,
+                    "page": page_num,
                 }
+                page_res[page_num] = _executor.submit(ra.get_hwitems, **kwargs)
+            # # Read all the data that was gathered
+            for page_num, res in page_res.items():
+                pages[page_num] = res.result()["data"]
+
+
+    # Iterate backwards through "pages" until we get the right number
+    # of records
+    part_ids = []
+    for page_num in reversed(sorted(pages.keys())):
+        page = pages[page_num]
+        if len(part_ids) >= count: break
+        for rec in reversed(page):
+            part_ids.append(rec["part_id"])
+            if len(part_ids) >= count: break
 
-        return hwitems
+    return part_ids
+    #}}}
 
-    def fetch_single(part_id):
+#######################################################################
 
-        #with concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
-        with _nullcontext:
-            item_res = _executor.submit(ra.get_hwitem, part_id=part_id)
-            subcomp_res = _executor.submit(ra.get_subcomponents, part_id=part_id)
-            location_res = _executor.submit(ra.get_hwitem_locations, part_id=part_id)
+def fetch_hwitems(part_type_id = None,
+                part_type_name = None,
+                part_id = None,
+                serial_number = None,
+                count = 50):
+    #{{{
+    '''retrieve multiple items from the HWDB based on criteria
 
-            hwitems = {
-                part_id:
-                {
-                    "Item": item_res.result()['data'],
-                    "Subcomponents": subcomp_res.result()['data'],
-                    "Locations": location_res.result()['data'],
-                }
-            }
+    Uses "get_hwitems", which unfortunately (1) can't be queried in reverse
+    order, and (2) doesn't pull back the ENTIRE record like "get_hwitem"
+    (singular) does. So, it has to do a fuckton of extra work and can take
+    a horribly long time.
 
-        return hwitems
+    Raises the first error for any of the items. To carry on past items
+    that fail, use find_hwitems() and fetch_hwitems_bulk().
+    '''
 
-    if part_type_name or part_type_id:
-        logger.debug("using slower multiple get")
-        return fetch_multiple(part_type_id, part_type_name, part_id, serial_number, count)
-    else:
-        # TODO: maybe could check if the serial number matches, if they
-        # suppied it. But for now just accept the part_id and ignore
-        # the serial_number entirely
-        logger.debug("using faster single get")
-        return fetch_single(part_id)
+    part_ids = find_hwitems(part_type_id, part_type_name, part_id, serial_number, count)
+
+    hwitems = {part_id: {} for part_id in part_ids}
+    for result in fetch_hwitems_bulk(part_ids):
+        if result.errors:
+            raise next(iter(result.errors.values()))
+        hwitems[result.part_id] = result.data
+
+    return hwitems
+    #}}}
+
+#######################################################################
+
+def iter_hwitems(part_type_id, *, page_size=None, prefetch=None, **kwargs):
+    #{{{
+    '''Yields every item record of a component type, one page at a time
+
+    Walks the pages of "get_hwitems" instead of asking for everything in one
+    enormous page (e.g., size=99999). The first page is fetched on the
+    calling thread to learn how many pages there are. After that, up to
+    'prefetch' pages are kept in flight on the shared executor, and records
+    are yielded in page order as soon as each page arrives. So, the caller
+    can start working on the first records long before the last page has
+    been downloaded, and no more than 'prefetch' pages are ever held in
+    memory at once.
+
+    Any other keyword arguments (serial_number, part_id, status, profile,
+    timeouts, etc.) are passed through to "get_hwitems" for every page.
+    Don't pass 'page' or 'size'. Use 'page_size' instead.
+
+    If the generator is closed before it is exhausted (e.g., the caller
+    breaks out of the loop), any pages that haven't started downloading
+    yet are cancelled.
+    '''
+
+    page_size = page_size or ITER_PAGE_SIZE
+    prefetch = max(1, prefetch or ITER_PREFETCH)
+
+    for key in ("page", "size"):
+        if key in kwargs:
+            msg = f"'{key}' is managed by iter_hwitems; use 'page_size' instead"
+            logger.error(msg)
+            raise ra.IncompatibleArguments(msg)
+
+    logger.debug(f"<iter_hwitems> part_type_id={part_type_id}, "
+                f"page_size={page_size}, prefetch={prefetch}")
+
+    resp = ra.get_hwitems(part_type_id, page=1, size=page_size, **kwargs)
+    num_pages = resp.get("pagination", {}).get("pages", 1) or 1
+    first_page = resp[ra.KW_DATA]
+    del resp
+
+    pending = deque()
+    next_page = 2
+
+    def fill():
+        nonlocal next_page
+        while next_page <= num_pages and len(pending) < prefetch:
+            pending.append(_executor.submit(ra.get_hwitems, part_type_id,
+                                page=next_page, size=page_size, **kwargs))
+            next_page += 1
 
+    try:
+        # Get the next pages going before handing back the first one, so
+        # that the network is busy while the caller is busy.
+        fill()
+        yield from first_page
+        del first_page
+
+        while pending:
+            page_data = pending.popleft().result()[ra.KW_DATA]
+            fill()
+            yield from page_data
+    finally:
+        for fut in pending:
+            fut.cancel()
+    #}}}
+
+#######################################################################
+
+# Serial number -> [part IDs] for each part type that has been listed by
+# prefetch_serial_numbers()
+_sn_indexes = {}
+_sn_indexes_lock = threading.Lock()
+
+def prefetch_serial_numbers(part_type_id, expected_lookups=None, **kwargs):
+    #{{{
+    '''Lists the serial number and part ID of every item of a part type
+
+    Looking up an item by serial number with fetch_hwitems() takes a
+    "get_hwitems" query before the item itself can be fetched, and if the
+    item doesn't exist yet, that query is all there is to it. When many
+    items of the same part type are about to be looked up (e.g., every row
+    of a sheet), it's much cheaper to list them all once, a page at a time.
+    After this, fetch_hwitems() finds serial numbers for this part type in
+    the index, and only fetches the items that actually exist.
+
+    If 'expected_lookups' is given, the index isn't made if listing every
+    item would take more pages than there are lookups to save.
+
+    Returns True if the index was made.
+    '''
+    if expected_lookups is not None:
+        resp = ra.get_hwitems(part_type_id, page=1, size=1, **kwargs)
+        total = resp.get("pagination", {}).get("total", 0) or 0
+        pages_needed = -(-total // ITER_PAGE_SIZE)
+        if pages_needed > expected_lookups:
+            logger.info(f"<prefetch_serial_numbers> not indexing {part_type_id}: "
+                        f"{total} items for {expected_lookups} lookups")
+            return False
+
+    index = {}
+    for rec in iter_hwitems(part_type_id, **kwargs):
+        if rec.get("serial_number") is not None:
+            index.setdefault(str(rec["serial_number"]), []).append(rec["part_id"])
+
+    with _sn_indexes_lock:
+        _sn_indexes[part_type_id] = index
+
+    logger.info(f"<prefetch_serial_numbers> indexed {len(index)} serial numbers "
+                f"for {part_type_id}")
+    return True
+    #}}}
+
+def lookup_serial_number(part_type_id, serial_number):
+    '''Returns the part IDs that have a serial number, oldest first
+
+    Returns None if the part type hasn't been prefetched.
+    '''
+    with _sn_indexes_lock:
+        index = _sn_indexes.get(part_type_id, None)
+        if index is None:
+            return None
+        return list(index.get(str(serial_number), ()))
+
+def note_serial_number(part_type_id, part_id, serial_number, old_serial_number=None):
+    '''Keeps the index up to date when an item is added or its SN changes'''
+    with _sn_indexes_lock:
+        index = _sn_indexes.get(part_type_id, None)
+        if index is None:
+            return
+        if old_serial_number is not None:
+            part_ids = index.get(str(old_serial_number), [])
+            if part_id in part_ids:
+                part_ids.remove(part_id)
+        if serial_number is not None:
+            part_ids = index.setdefault(str(serial_number), [])
+            if part_id not in part_ids:
+                part_ids.append(part_id)
+
+def clear_serial_numbers():
+    with _sn_indexes_lock:
+        _sn_indexes.clear()
+
+#######################################################################
+
+# The parts of an item that fetch_hwitems_bulk() knows how to get, the
+# function that gets each one, and the key it goes under in the result
+# (the same keys that fetch_hwitems() uses).
+BULK_PARTS = {
+    "item": (ra.get_hwitem, "Item"),
+    "subcomponents": (ra.get_subcomponents, "Subcomponents"),
+    "locations": (ra.get_hwitem_locations, "Locations"),
+    "tests": (ra.get_hwitem_tests, "Tests"),
+}
+BULK_DEFAULT_PARTS = ("item", "subcomponents", "locations")
+
+# How many requests fetch_hwitems_bulk() keeps queued on the executor at
+# once. Enough to keep every thread busy without queuing up tens of
+# thousands of futures for a big sync.
+BULK_MAX_PENDING = 4 * NUM_THREADS
+
+BulkFetchResult = namedtuple('BulkFetchResult', ['part_id', 'data', 'errors'])
+_END = object()
+
+# Requests that are currently in flight for fetch_hwitems_bulk(), so that
+# if two callers want the same thing at the same time, they share a
+# single request. As with single_flight in _RestApiV1, whoever started the
+# request gets the result, and anyone who joined it gets their own copy.
+_bulk_inflight = {}
+_bulk_inflight_lock = threading.Lock()
+
+class _BulkCall:
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self.joined = 0
+        self.snapshot = None
+
+    def result(self, created):
+        result = self.future.result()
+        return result if created else deepcopy(self.snapshot)
+
+def _hashable(value):
+    # kwargs may hold lists or dicts (e.g., timeouts=[...]), so turn them
+    # into something that can be part of a dictionary key
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _hashable(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(repr(_hashable(v)) for v in value))
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+def _bulk_submit(part, part_id, kwargs, submit):
+    # Returns the call, and whether it's a new one (as opposed to one that
+    # somebody else is also waiting for)
+    key = (part, part_id, _hashable(kwargs))
+    with _bulk_inflight_lock:
+        call = _bulk_inflight.get(key)
+        if call is not None:
+            call.joined += 1
+            return call, False
+
+        call = _BulkCall(key)
+        func, _ = BULK_PARTS[part]
+
+        def forget():
+            with _bulk_inflight_lock:
+                if _bulk_inflight.get(key) is call:
+                    del _bulk_inflight[key]
+                return call.joined
+
+        def run():
+            try:
+                result = func(part_id, **kwargs)
+            finally:
+                joined = forget()
+            # The one who started it may modify the result as soon as it's
+            # done, so the others copy from a snapshot instead
+            if joined:
+                call.snapshot = deepcopy(result)
+            return result
+
+        call.future = submit(run)
+        call.future.add_done_callback(lambda fut: forget())
+        _bulk_inflight[key] = call
+    return call, True
+
+def fetch_hwitems_bulk(part_ids, parts=BULK_DEFAULT_PARTS, *,
+                        max_pending=None, submit=None, **kwargs):
+    #{{{
+    '''Fetches several parts of many items, yielding each item when it's done
+
+    'parts' is any collection of "item", "subcomponents", "locations", and
+    "tests". For each distinct part ID, this yields a BulkFetchResult:
+
+        part_id: the part ID
+        data:    {"Item": ..., "Subcomponents": ..., ...} for each part that
+                 was retrieved (the "data" of each response)
+        errors:  {"Item": <exception>, ...} for each part that failed
+
+    Results are yielded in the order they finish, not the order they were
+    asked for. A failure for one part ID is reported in its result and
+    does not stop the others.
+
+    Duplicate part IDs are only fetched once. If the same part of the same
+    item is already being fetched by another call to this function (say,
+    in another thread), the request in flight is shared, and each caller
+    gets its own copy of the result.
+
+    'part_ids' is read as requests are needed, so it can be a generator
+    that's still walking a listing. Requests are run on this module's
+    thread pool, unless 'submit' (a function like Executor.submit that
+    returns a Future) says otherwise.
+
+    Any other keyword arguments (profile, timeouts, etc.) are passed along
+    to every request.
+    '''
+
+    parts = tuple(dict.fromkeys(parts))
+    for part in parts:
+        if part not in BULK_PARTS:
+            msg = (f"Unknown part '{part}'. Valid parts are: "
+                    f"{', '.join(BULK_PARTS.keys())}")
+            logger.error(msg)
+            raise ValueError(msg)
+
+    result_keys = [BULK_PARTS[part][1] for part in parts]
+    max_pending = max(len(parts), max_pending or BULK_MAX_PENDING)
+
+    submit = submit or _executor.submit
+
+    def distinct(part_ids):
+        seen = set()
+        for part_id in part_ids:
+            if part_id not in seen:
+                seen.add(part_id)
+                yield part_id
+    remaining_ids = distinct(part_ids)
+
+    # future -> (part_id, part, call, created)
+    pending = {}
+    results = {}
+    outstanding = {}
+
+    def fill():
+        while len(pending) + len(parts) <= max_pending:
+            part_id = next(remaining_ids, _END)
+            if part_id is _END:
+                return
+            results[part_id] = BulkFetchResult(part_id, {}, {})
+            outstanding[part_id] = len(parts)
+            for part in parts:
+                call, created = _bulk_submit(part, part_id, kwargs, submit)
+                pending[call.future] = (part_id, part, call, created)
+
+    try:
+        fill()
+        while pending:
+            done, _ = concurrent.futures.wait(pending,
+                        return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in done:
+                part_id, part, call, created = pending.pop(fut)
+                result_key = BULK_PARTS[part][1]
+                result = results[part_id]
+                try:
+                    result.data[result_key] = call.result(created)[KW_DATA]
+                except Exception as exc:
+                    logger.warning(f"<fetch_hwitems_bulk> {part} for "
+                                    f"'{part_id}' failed: {exc!r}")
+                    result.errors[result_key] = exc
+
+                outstanding[part_id] -= 1
+                if outstanding[part_id] == 0:
+                    del outstanding[part_id]
+                    result = results.pop(part_id)
+                    # Put the parts back in the order they were asked for
+                    data = {key: result.data[key] for key in result_keys
+                                if key in result.data}
+                    yield result._replace(data=data)
+            fill()
+    finally:
+        # If the caller stopped early, don't leave our requests sitting in
+        # the queue. (Leave alone any that other callers are waiting on.)
+        unwanted = []
+        with _bulk_inflight_lock:
+            for fut, (_, _, call, created) in pending.items():
+                if created and not call.joined and _bulk_inflight.get(call.key) is call:
+                    # (so nobody else joins it before it's cancelled)
+                    del _bulk_inflight[call.key]
+                    unwanted.append(fut)
+        for fut in unwanted:
+            fut.cancel()
     #}}}
 
 #######################################################################
@@ -553,16 +878,15 @@ def set_subcomponents(part_id, subcomponents):
 def get_hwitem_complete(part_id):
     #{{{
     logger.debug(f"getting part_id {part_id}")
-    resp = ra.get_hwitem(part_id)
-    if resp[RA_STATUS] != RA_STATUS_OK:
-        raise RuntimeError("Error getting hwitem")
-    data = resp[RA_DATA]
-
-    resp = ra.get_subcomponents(part_id)
-    if resp[RA_STATUS] != RA_STATUS_OK:
-        raise RuntimeError("Error getting subcomponents")
+    result = next(fetch_hwitems_bulk([part_id], ("item", "subcomponents")))
+    if "Item" in result.errors:
+        raise RuntimeError("Error getting hwitem") from result.errors["Item"]
+    if "Subcomponents" in result.errors:
+        raise RuntimeError("Error getting subcomponents") from result.errors["Subcomponents"]
+    data = result.data["Item"]
 
-    data[RA_SUBCOMPONENTS] = { item[RA_FUNCTIONAL_POSITION]: item[RA_PART_ID] for item in resp[RA_DATA] }
+    data["subcomponents"] = { item["functional_position"]: item["part_id"]
+                                    for item in result.data["Subcomponents"] }
 
     return data
     #}}}
@@ -576,28 +900,23 @@ class _SN_Lookup:
     def __call__(cls, part_type_id, serial_number):
         logger.debug(f"looking up {part_type_id}:{serial_number}")
         if (part_type_id, serial_number) not in cls._cache.keys():
-            resp = ra.get_hwitems(part_type_id, serial_number=serial_number)
-            if resp[RA_STATUS] != RA_STATUS_OK:
-                msg = f"Error looking up serial number '{serial_number}' for " \
-                            "part type '{part_type_id}'"
-                logger.error(msg)
-                raise ValueError(msg)
-            if len(resp[RA_DATA]) == 1:
-                part_id = resp[RA_DATA][0][RA_PART_ID]
+            part_ids = find_hwitems(part_type_id, serial_number=serial_number, count=2)
+            if len(part_ids) == 1:
+                part_id = part_ids[0]
                 data = get_hwitem_complete(part_id)
                 cls._cache[part_type_id, serial_number] = part_id, data
 
-            elif len(resp[RA_DATA]) == 0:
+            elif len(part_ids) == 0:
                 cls._cache[part_type_id, serial_number] = None
-            elif len(resp[RA_DATA]) > 1:
+            elif len(part_ids) > 1:
                 msg = f"Serial number '{serial_number}' for part type '{part_type_id}' " \
-                            "is assigned to {len(resp[RA_DATA])} parts."
+                            "is assigned to more than one part."
                 logger.error(msg)
                 raise ValueError(msg)
         return cls._cache[part_type_id, serial_number]
     @classmethod
     def update(cls, part_type_id, serial_number, data):
-        cls._cache[(part_type_id, serial_number)] = (data[RA_PART_TYPE_ID], data)
+        cls._cache[(part_type_id, serial_number)] = (data["part_id"], data)
     @classmethod
     def delete(cls, part_type_id, serial_number):
         if (part_type_id, serial_number) in cls._cache.keys():
@@ -634,7 +953,7 @@ def get_institutions(use_cache=True):
     _cache = make_cache(get_institutions, "_cache", {})
 
     if not use_cache or len(_cache) == 0:
-        _cache['institutions'] = ra.get_institutions()['data']
+        _cache['institutions'] = ra.get_institutions(refresh=not use_cache)['data']
         for node in _cache['institutions']:
             node['combined'] = f"({node['id']}) {node['name']}"
             node['country']['combined'] = f"({node['country']['code']}) {node['country']['name']}"
@@ -654,7 +973,7 @@ def get_countries(use_cache=True):
     _cache = make_cache(get_countries, "_cache", {})
 
     if not use_cache or len(_cache) == 0:
-        _cache['countries'] = ra.get_countries()['data']
+        _cache['countries'] = ra.get_countries(refresh=not use_cache)['data']
         for node in _cache['countries']:
             node['combined'] = f"({node['code']}) {node['name']}"
     return _cache['countries']
@@ -673,7 +992,7 @@ def get_manufacturers(use_cache=True):
     _cache = make_cache(get_manufacturers, "_cache", {})
 
     if not use_cache or len(_cache) == 0:
-        _cache["manufacturers"] = ra.get_manufacturers()['data']
+        _cache["manufacturers"] = ra.get_manufacturers(refresh=not use_cache)['data']
         for node in _cache['manufacturers']:
             node['combined'] = f"({node['id']}) {node['name']}"
     return _cache['manufacturers']
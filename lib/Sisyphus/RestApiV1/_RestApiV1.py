@@ -12,6 +12,10 @@ from Sisyphus.Configuration import config
 logger = config.getLogger(__name__)
 
 from .RestApiSession import SessionManager
+from .ResponseCache import ResponseCache
+from .RequestGovernor import RequestGovernor
+from .RetryPolicy import (RetryPolicy, RETRYABLE_EXCEPTIONS,
+        retry_stats, reset_retry_stats)
 
 from Sisyphus.Utils.Terminal.Style import Style
 from Sisyphus.Utils.Terminal.BoxDraw import MessageBox
@@ -80,6 +84,23 @@ else:
 #
 ###############################################################################
 
+# orjson decodes JSON several times faster than the standard library, which
+# matters for large pages of items. It's optional, so fall back on "json"
+# if it isn't installed (or if it refuses something json would accept, like
+# an integer too big for 64 bits).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _json_loads(data):
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
 # Use this function when constructing a URL that uses some variable as 
 # part of the URL itself, e.g.,
 #    path = f"api/v1/components/{sanitize(part_id)}"
@@ -139,7 +160,13 @@ def func_name():
 
 class retry:
     #{{{
-    '''Wrapper for RestApi functions to permit them to retry on a connection failure'''
+    '''Wrapper for _request to permit it to retry on a connection failure
+
+    The wrapped function must take (method, url, ...) as its first
+    arguments. How many attempts are made, how long to wait between them,
+    and whether to try again at all is up to the RetryPolicy for the call.
+    See Sisyphus.RestApiV1.RetryPolicy.
+    '''
 
     def __init__(self, timeouts=None ):
         # timeouts should be a list containing the timeout to use on each try
@@ -174,7 +201,7 @@ class retry:
     def __call__(self, function):
 
         @functools.wraps(function)
-        def wrapped_function(*args, **kwargs):
+        def wrapped_function(method, url, *args, **kwargs):
 
             status_callback = kwargs.pop("status_callback", None)
 
@@ -183,26 +210,30 @@ class retry:
             else:
                 update_status = lambda msg: None
 
-            profile = kwargs.get("profile", config.active_profile)
+            profile = kwargs.get("profile", None) or config.active_profile
 
             # Use the 'timeouts' passed to the function, or from the 
             # config settings, or the defaults, in that order. (I.e., use
-            # the first one that isn't None)
-
-            timeouts = ( kwargs.pop("timeouts", None)
-                        or profile.settings.get(cfg.KW_TIMEOUTS, None)
-                        or self.default_timeouts )
-
-            last_err = None
-            logger.debug(f"RestApi operation will be tried {len(timeouts)} times.")
-            for try_num, timeout in enumerate(timeouts):
+            # the first one that isn't None). The same goes for the other
+            # options in the retry policy.
+            policy = RetryPolicy.for_call(profile, self.default_timeouts,
+                        timeouts=kwargs.pop("timeouts", None),
+                        retry_policy=kwargs.pop("retry_policy", None))
+            state = policy.begin(method, url, profile,
+                        idempotent=kwargs.pop("idempotent", None))
+
+            logger.debug(f"RestApi operation will be tried up to "
+                            f"{len(policy.timeouts)} times.")
+            for timeout in state.attempts():
+                try_num = state.try_num
                 try:
-                    if type(last_err) in (ExpiredSignature, CurrentlyUnavailable):
+                    if type(state.last_err) in (ExpiredSignature, CurrentlyUnavailable):
                         SessionManager(profile).profile_manager.refresh()                        
 
                 except Exception as exc:
                     logger.error(f"Failed to refresh token: {exc}")
 
+                delay = 0
                 try:
                     if timeout is not None:
                         kwargs['timeout'] = timeout
@@ -234,31 +265,21 @@ class retry:
                             else f"[sending data (attempt #{try_num+1})]")
                     update_status(s)
 
-                    resp = function(*args, **kwargs)
+                    resp = function(method, url, *args, **kwargs)
 
                     update_status("[finished]")
 
 
                     break
-                except ConnectionFailed as err:
-                    msg = (f"Connection failure in '{function.__name__}' "
-                            f"in thread '{threading.current_thread().name}' "
-                            f"(attempt #{try_num+1})")
-                    logger.warning(msg)
-                    last_err = err
-                except ExpiredSignature as err:
-                    msg = (f"Signature expired while calling {function.__name__} "
+                except RETRYABLE_EXCEPTIONS as err:
+                    msg = (f"{type(err).__name__} in '{function.__name__}' "
                             f"in thread '{threading.current_thread().name}' "
                             f"(attempt #{try_num+1})")
                     logger.warning(msg)
-                    last_err = err
-                except CurrentlyUnavailable as err:
-                    msg = (f"Server claims this is currently unavailable in {function.__name__} "
-                            f"in thread '{threading.current_thread().name}' "
-                            f"(attempt #{try_num+1})")
-                    logger.warning(msg)
-                    time.sleep(5)
-                    last_err = err
+
+                    # This will re-raise the exception if we shouldn't
+                    # try again
+                    delay = state.failed(err)
                 except Exception as exc:
                     # If we don't recognize the exception, assume that there
                     # was actually somthing wrong with the request itself and
@@ -268,7 +289,6 @@ class retry:
                             f"in thread '{threading.current_thread().name}' "
                             f"(attempt #{try_num+1})")
                     logger.error(msg)
-                    last_err = exc
                     raise
 
 
@@ -282,9 +302,9 @@ class retry:
 
                         sys.stdout.write(msg)
                         sys.stdout.flush()
-            else:
-                logger.error(f"{msg}, max attempts reached")
-                raise last_err
+
+                if delay > 0:
+                    time.sleep(delay)
 
             return resp
 
@@ -293,6 +313,90 @@ class retry:
 
 #-----------------------------------------------------------------------------
 
+class single_flight:
+    #{{{
+    '''Wrapper for _request so that identical GETs share one request
+
+    The dashboard, in particular, often has several threads asking for the
+    same item or test at the same moment. If a GET (returning JSON) comes in
+    while an identical one is already in flight, it waits for that one to
+    finish and gets a copy of its result (or its exception) instead of
+    making a request of its own.
+
+    Requests are identical if they have the same profile, URL, params, and
+    "refresh" setting. Other options (like timeouts) are whatever the
+    first caller asked for. Pass coalesce=False to always make a new
+    request.
+    '''
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.waiters = 0
+            self.result = None
+            self.exc = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    def __call__(self, function):
+
+        @functools.wraps(function)
+        def wrapped_function(method, url, *args, return_type="json", **kwargs):
+
+            coalesce = kwargs.pop("coalesce", True)
+            if (not coalesce
+                    or method.lower() != "get"
+                    or return_type.lower() != "json"
+                    or args
+                    or any(k in kwargs for k in ("json", "data", "files"))):
+                return function(method, url, *args, return_type=return_type, **kwargs)
+
+            profile = kwargs.get("profile", None) or config.active_profile
+            key = (profile.profile_name,
+                    ResponseCache.make_key(method, url, kwargs.get("params")),
+                    bool(kwargs.get("refresh", False)))
+
+            with self.lock:
+                call = self.in_flight.get(key)
+                leader = call is None
+                if leader:
+                    call = self._Call()
+                    self.in_flight[key] = call
+                else:
+                    call.waiters += 1
+
+            if not leader:
+                logger.debug(f"<_request> joining request in flight for url='{url}'")
+                call.done.wait()
+                if call.exc is not None:
+                    raise call.exc
+                # Everybody gets their own copy, in case they modify it
+                return deepcopy(call.result)
+
+            result = None
+            try:
+                result = function(method, url, return_type=return_type, **kwargs)
+                return result
+            except BaseException as exc:
+                call.exc = exc
+                raise
+            finally:
+                with self.lock:
+                    del self.in_flight[key]
+                    waiters = call.waiters
+                # The caller might modify the result as soon as we return
+                # it, so the others copy from a snapshot instead
+                if waiters and call.exc is None:
+                    call.result = deepcopy(result)
+                call.done.set()
+
+        return wrapped_function
+    #}}}
+
+#-----------------------------------------------------------------------------
+
 # Requests timeout format:
 #   timeout=<seconds> or timeout=(connect_timeout, read_timeout)
 #DEFAULT_TIMEOUTS = (5, 10, 15, 30, 60)
@@ -315,6 +419,30 @@ DEFAULT_TIMEOUTS = (5, 5, 5, 5, 5)
 #    timeouts=[(3, 10), (3, 20)]
 #)
 
+def _cache_lookup(method, url, return_type, profile, params=None):
+    '''Finds the response cache entry for a request, if it may be cached
+
+    Returns (response_cache, cache_key, cache_ttl, cache_entry). Everything
+    is None if the profile doesn't use the cache or the endpoint isn't one
+    that may be cached. cache_entry is None if there is nothing stored yet.
+    '''
+    if method.lower() != "get" or return_type.lower() != "json":
+        return None, None, None, None
+
+    response_cache = ResponseCache.for_profile(profile)
+    if response_cache is None:
+        return None, None, None, None
+
+    cache_ttl = response_cache.ttl_for(url)
+    if cache_ttl is None:
+        return None, None, None, None
+
+    cache_key = response_cache.make_key(method, url, params)
+    return response_cache, cache_key, cache_ttl, response_cache.get(cache_key)
+
+#-----------------------------------------------------------------------------
+
+@single_flight()
 @retry(timeouts=DEFAULT_TIMEOUTS)
 def _request(method, url, *args, return_type="json", **kwargs):
     #{{{
@@ -371,11 +499,32 @@ def _request(method, url, *args, return_type="json", **kwargs):
     # Pop this, but don't do anything with it. "retry" handles it.
     status_callback = augmented_kwargs.pop("status_callback", None)    
 
-    # Pop this, but don't do anything with it. It's for signaling further
-    # up the chain whether or not to look in the cache for this. But, at
-    # this point, it has already been decided to actually do the request.
+    # If True, don't use a cached response, even if it is still fresh.
+    # (Functions further up the chain that keep caches of their own use it
+    # the same way.) A fresh response will still be stored in the cache.
     refresh = augmented_kwargs.pop("refresh", None)    
-    
+
+    # Check the on-disk response cache, if the profile has it turned on and
+    # this is a read-only endpoint that is allowed to be cached.
+    response_cache, cache_key, cache_ttl, cache_entry = _cache_lookup(
+            method, url, return_type, profile, augmented_kwargs.get("params"))
+    if cache_entry is not None:
+        if cache_entry.is_fresh and not refresh:
+            logger.debug(f"<_request> returning cached response for url='{url}'")
+            return cache_entry.data
+        if not refresh:
+            # Ask the server whether our stale copy is still good
+            augmented_kwargs["headers"] = {
+                **(augmented_kwargs.get("headers") or {}),
+                **cache_entry.validators,
+            }
+
+    # Wait for the governor to let us send the request, so that all threads
+    # together don't overwhelm the server
+    governor = RequestGovernor.for_profile(profile)
+    slot = governor.acquire()
+
+    resp = None
     try:
         if profile.settings.get(cfg.KW_LOG_HEADERS, False):
             session = session_manager.session
@@ -408,6 +557,7 @@ def _request(method, url, *args, return_type="json", **kwargs):
             with throttle_lock:
                 resp = session_manager.session.request(method, url, *args, **augmented_kwargs)
 
+        slot.record_status(resp.status_code)
 
     except requests.exceptions.ConnectionError as conn_err:
         extra_info.append(f"| exception: {repr(conn_err)}")
@@ -422,15 +572,22 @@ def _request(method, url, *args, return_type="json", **kwargs):
             with log_lock:
                 logger.error(msg)
                 logger.info('\n'.join(extra_info))
-            raise ConnectionFailed(msg) from None
+            raise ConnectionFailed(msg, request_sent=False) from None
         else:
+            slot.record_congestion()
             msg = ("A connection error occurred while attempting to retrieve data from "
                      f"the REST API.")
             with log_lock:
                 logger.error(msg)
                 logger.info('\n'.join(extra_info))
-            raise ConnectionFailed(msg) from None
+            # If we never managed to connect, the server can't have seen
+            # the request, so it's safe to send it again even if it's a POST
+            request_sent = not (
+                    isinstance(conn_err, requests.exceptions.ConnectTimeout)
+                    or "NewConnectionError" in str(conn_err))
+            raise ConnectionFailed(msg, request_sent=request_sent) from None
     except requests.exceptions.ReadTimeout as timeout_err:
+        slot.record_congestion()
         extra_info.append(f"| exception: {repr(timeout_err)}")
         msg = ("A read timeout error occurred while attempting to retrieve data from "
                  f"the REST API.")
@@ -446,12 +603,87 @@ def _request(method, url, *args, return_type="json", **kwargs):
             logger.error(msg)
             logger.info('\n'.join(extra_info))
         raise
+    finally:
+        # If there's a response, the slot is given back once it's been
+        # checked, since some signs of trouble are only in the page text
+        if resp is None:
+            governor.release(slot)
+
+    try:
+        if resp.status_code == 304 and cache_entry is not None:
+            logger.debug(f"<_request> cached response for url='{url}' is still valid")
+            response_cache.touch(cache_key)
+            return cache_entry.data
+
+        retval = _check_response(resp, return_type, extra_info, log_headers=log_headers)
+    except CurrentlyUnavailable:
+        # (whatever the status code was)
+        slot.record_congestion()
+        raise
+    finally:
+        governor.release(slot)
+
+    if return_type.lower() == "json":
+        if response_cache is not None:
+            response_cache.put(cache_key, url, retval, cache_ttl,
+                    etag=resp.headers.get("ETag"),
+                    last_modified=resp.headers.get("Last-Modified"))
+        elif method.lower() != "get":
+            # Something was changed, so forget anything cached under it
+            changed_cache = ResponseCache.for_profile(profile)
+            if changed_cache is not None:
+                changed_cache.invalidate(url)
+
+    return retval
+    #}}}
+
+#-----------------------------------------------------------------------------
+
+def _check_response(resp, return_type="json", extra_info=None, log_headers=False):
+    #{{{
+    '''Validates a response and maps REST API errors to exceptions
+
+    Returns the decoded JSON if return_type is "json", otherwise the response
+    object itself. Works on anything that looks like a requests.Response
+    (status_code, headers, encoding, content, text, elapsed), so the async
+    transport in RestApiV1.aio shares it as well.
+
+    The JSON is decoded exactly once, and the caller gets the only
+    reference to it, so it may be modified freely.
+    '''
+
+    if extra_info is None:
+        extra_info = ["Additional Information:"]
 
     #extra_info.append(f"| request headers: {resp.request.headers}")
     extra_info.append(f"| status code: {resp.status_code}")
     extra_info.append(f"| elapsed: {resp.elapsed}")
     if log_headers:
         extra_info.append(f"| response headers: {resp.headers}")
+
+    is_success = 200 <= resp.status_code < 300
+
+    # Fast path: a successful JSON response with status "OK" (which is
+    # almost all of them) is decoded once, straight from the bytes, and
+    # returned. There's no need to look at it as text.
+    resp_json = None
+    if return_type.lower() == "json":
+        if is_success and "json" in resp.headers.get("Content-Type", ""):
+            try:
+                resp_json = _json_loads(resp.content)
+            except ValueError:
+                resp_json = None
+            if type(resp_json) == dict and resp_json.get(KW_STATUS, None) == KW_STATUS_OK:
+                return resp_json
+    elif is_success:
+        # The data isn't supposed to be JSON, so there's not much we can
+        # do to validate it further.
+        with log_lock:
+            logger.debug("returning raw response object")
+        return resp
+
+    # Something is wrong, so from here on, speed doesn't matter much. Look
+    # at the text to figure out what.
     if resp.encoding == "utf-8":
         extra_info.append(f"| response: {resp.text}")
     else:
@@ -512,8 +744,9 @@ def _request(method, url, *args, return_type="json", **kwargs):
         #  Convert the response to JSON and return.
         #  If the response cannot be converted to JSON, raise an exception
         try:
-            resp_json = deepcopy(resp.json())
-        except json.JSONDecodeError as json_err:
+            if resp_json is None:
+                resp_json = _json_loads(resp.content)
+        except ValueError as json_err:
             # This is probably a 4xx or 5xx error that returned an HTML page 
             # instead of JSON. These are hard to figure out until we actually
             # encounter them and look for some distinguishing characteristics,
@@ -7,3 +7,4 @@ Author: Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
 """
 
 from ._RestApiV1 import *
+from . import aio
@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sisyphus/RestApiV1/aio.py
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+Asyncio transport for the REST API.
+
+The regular RestApiV1 functions block, so fanning out thousands of requests
+(e.g., the three calls per item in Utilities.fetch_hwitems) means tying up
+a thread for every request that is in flight. The coroutines in this module
+do the same thing on a single event loop, sharing one keep-alive connection
+pool per profile, so that a small number of sockets can serve any number of
+concurrent requests.
+
+Usage:
+
+    from Sisyphus.RestApiV1 import aio
+
+    async def main(part_ids):
+        return await asyncio.gather(*(aio.get_hwitem(p) for p in part_ids))
+
+    items = asyncio.run(main(part_ids))
+
+The requests go through the same checks as RestApiV1._request, raise the
+same exceptions, retry the same way (including refreshing the bearer token
+through the profile's ProfileManager), share the same RequestGovernor, and
+use the on-disk response cache if the profile has it turned on.
+
+This module requires httpx, which is an optional dependency. Without it,
+the module can still be imported, but making a request will raise an
+ImportError.
+"""
+
+from Sisyphus.Configuration import config
+logger = config.getLogger(__name__)
+
+import Sisyphus.Configuration as cfg # for keywords
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .RestApiSession import SessionManager, DEFAULT_HTTP_TIMEOUT
+from ._RestApiV1 import (
+        DEFAULT_TIMEOUTS, _cache_lookup, _check_response, sanitize)
+from .ResponseCache import ResponseCache
+from .RequestGovernor import RequestGovernor
+from .RetryPolicy import RetryPolicy, RETRYABLE_EXCEPTIONS
+from .exceptions import *
+from .keywords import *
+
+import asyncio
+import threading
+import weakref
+
+# Connection pool limits for each (event loop, profile). Requests beyond
+# AIO_MAX_CONNECTIONS wait their turn for a connection instead of failing.
+AIO_MAX_CONNECTIONS = 20
+AIO_MAX_KEEPALIVE = 20
+AIO_KEEPALIVE_EXPIRY = 30
+
+###############################################################################
+
+# httpx.AsyncClient objects can only be used on the event loop that created
+# them, so there's one per (loop, profile). Keying on the loop weakly lets
+# the clients go away along with the loop.
+_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+def _require_httpx():
+    if httpx is None:
+        msg = ("The async transport requires the 'httpx' package. "
+                "(try 'pip install httpx')")
+        logger.error(msg)
+        raise ImportError(msg)
+
+def _make_client(profile):
+    extra_kwargs = profile.settings.get(cfg.KW_EXTRA_KWARGS, {}) or {}
+
+    client_kwargs = {
+        "limits": httpx.Limits(
+                max_connections=AIO_MAX_CONNECTIONS,
+                max_keepalive_connections=AIO_MAX_KEEPALIVE,
+                keepalive_expiry=AIO_KEEPALIVE_EXPIRY),
+        "verify": extra_kwargs.get("verify", True),
+    }
+
+    if profile.authentication[cfg.KW_AUTH_TYPE] == cfg.KW_AUTH_CERT:
+        client_kwargs["cert"] = profile.authentication[cfg.KW_CERTIFICATE]
+
+    return httpx.AsyncClient(**client_kwargs)
+
+def get_client(profile=None):
+    '''Gets the shared httpx.AsyncClient for the running loop and a profile'''
+    _require_httpx()
+    profile = profile or config.active_profile
+    loop = asyncio.get_running_loop()
+
+    with _clients_lock:
+        loop_clients = _clients.setdefault(loop, {})
+        client = loop_clients.get(profile.profile_name)
+        if client is None or client.is_closed:
+            client = _make_client(profile)
+            loop_clients[profile.profile_name] = client
+        return client
+
+async def aclose():
+    '''Closes the connection pools belonging to the running loop
+
+    Call this before the loop finishes (e.g., at the end of the coroutine
+    passed to asyncio.run) to avoid "unclosed connection" warnings.
+    '''
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        loop_clients = _clients.pop(loop, {})
+    for client in loop_clients.values():
+        await client.aclose()
+
+#------------------------------------------------------------------------------
+
+def _httpx_timeout(timeout):
+    # requests-style timeouts are either a number or (connect, read).
+    # Never time out waiting for the pool, since waiting for a free
+    # connection is exactly how we're bounding concurrency.
+    if timeout is None:
+        timeout = DEFAULT_HTTP_TIMEOUT
+    if isinstance(timeout, (list, tuple)):
+        connect, read = timeout
+        return httpx.Timeout(connect=connect, read=read, write=read, pool=None)
+    return httpx.Timeout(timeout, pool=None)
+
+# The ProfileManager for each profile, so that the coroutines don't have to
+# go to a thread to look it up for every attempt
+_profile_managers = {}
+
+async def _profile_manager(profile):
+    mgr = _profile_managers.get(profile.profile_name)
+    if mgr is None:
+        # Creating the ProfileManager might have to run htgettoken, so don't
+        # do it on the event loop.
+        mgr = await asyncio.to_thread(SessionManager.profile_manager_for, profile)
+        _profile_managers[profile.profile_name] = mgr
+    return mgr
+
+async def _auth_headers(profile):
+    if profile.authentication[cfg.KW_AUTH_TYPE] != cfg.KW_AUTH_HTGETTOKEN:
+        return {}
+    mgr = await _profile_manager(profile)
+    return {"Authorization": f"Bearer {mgr.bearer_token}"}
+
+async def _refresh_token(profile):
+    mgr = await _profile_manager(profile)
+    await asyncio.to_thread(mgr.refresh)
+
+def _uses_cache(profile):
+    return profile.settings.get(cfg.KW_RESPONSE_CACHE, False)
+
+def _update_cache(method, url, profile, response_cache, cache_key, cache_ttl, retval, resp):
+    if response_cache is not None:
+        response_cache.put(cache_key, url, retval, cache_ttl,
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"))
+    elif method.lower() != "get":
+        changed_cache = ResponseCache.for_profile(profile)
+        if changed_cache is not None:
+            changed_cache.invalidate(url)
+
+#------------------------------------------------------------------------------
+
+async def _request(method, url, *, return_type="json", **kwargs):
+    #{{{
+    '''The asyncio equivalent of RestApiV1._request
+
+    Accepts the same keyword arguments that are meaningful to httpx
+    (params, json, data, files, headers) plus the RestApiV1 ones (profile,
+    timeouts, timeout, refresh, retry_policy, idempotent).
+    '''
+    _require_httpx()
+
+    profile = kwargs.pop('profile', None) or config.active_profile
+
+    policy = RetryPolicy.for_call(profile, DEFAULT_TIMEOUTS,
+                timeouts=kwargs.pop("timeouts", None),
+                retry_policy=kwargs.pop("retry_policy", None))
+    idempotent = kwargs.pop("idempotent", None)
+
+    # A 'timeout' passed explicitly wins over 'timeouts', just like with
+    # the synchronous version
+    explicit_timeout = kwargs.pop("timeout", None)
+    refresh = kwargs.pop("refresh", None)
+    kwargs.pop("log_headers", None)
+    kwargs.pop("status_callback", None)
+
+    logger.debug(f"<aio._request> [{method.upper()}] url='{url}'")
+
+    # The response cache is SQLite, so it's read and written in a thread
+    # rather than on the event loop
+    if _uses_cache(profile):
+        response_cache, cache_key, cache_ttl, cache_entry = await asyncio.to_thread(
+                _cache_lookup, method, url, return_type, profile, kwargs.get("params"))
+    else:
+        response_cache = cache_key = cache_ttl = cache_entry = None
+    if cache_entry is not None:
+        if cache_entry.is_fresh and not refresh:
+            logger.debug(f"<aio._request> returning cached response for url='{url}'")
+            return cache_entry.data
+        if not refresh:
+            kwargs["headers"] = {
+                **(kwargs.get("headers") or {}),
+                **cache_entry.validators,
+            }
+
+    client = get_client(profile)
+    governor = RequestGovernor.for_profile(profile)
+
+    state = policy.begin(method, url, profile, idempotent=idempotent)
+    for timeout in state.attempts():
+        if type(state.last_err) in (ExpiredSignature, CurrentlyUnavailable):
+            try:
+                await _refresh_token(profile)
+            except Exception as exc:
+                logger.error(f"Failed to refresh token: {exc}")
+
+        extra_info = \
+        [
+            "Additional Information:",
+            f"| task: {asyncio.current_task().get_name()}",
+            f"| url: {url}",
+            f"| method: {method}",
+            f"| kwargs: {kwargs}",
+        ]
+
+        try:
+            headers = {**(await _auth_headers(profile)),
+                        **(kwargs.get("headers") or {})}
+
+            slot = await governor.acquire_async()
+            resp = None
+            try:
+                resp = await client.request(method, url,
+                        **{**kwargs, "headers": headers},
+                        timeout=_httpx_timeout(explicit_timeout or timeout))
+                slot.record_status(resp.status_code)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as conn_err:
+                extra_info.append(f"| exception: {repr(conn_err)}")
+                if "[Errno -2]" in str(conn_err):
+                    msg = "The server URL appears to be invalid."
+                    logger.error(msg)
+                    logger.info('\n'.join(extra_info))
+                    raise NameResolutionFailure(msg) from None
+                slot.record_congestion()
+                msg = ("A connection error occurred while attempting to "
+                        "retrieve data from the REST API.")
+                logger.info('\n'.join(extra_info))
+                raise ConnectionFailed(msg, request_sent=False) from None
+            except (httpx.TimeoutException, httpx.RemoteProtocolError) as exc:
+                extra_info.append(f"| exception: {repr(exc)}")
+                slot.record_congestion()
+                msg = ("A timeout or connection error occurred while "
+                        "attempting to retrieve data from the REST API.")
+                logger.info('\n'.join(extra_info))
+                raise ConnectionFailed(msg) from None
+            finally:
+                # (as in RestApiV1._request, a response is checked first)
+                if resp is None:
+                    governor.release(slot)
+
+            try:
+                if resp.status_code == 304 and cache_entry is not None:
+                    logger.debug(f"<aio._request> cached response for url='{url}' "
+                                    "is still valid")
+                    await asyncio.to_thread(response_cache.touch, cache_key)
+                    return cache_entry.data
+
+                retval = _check_response(resp, return_type, extra_info)
+            except CurrentlyUnavailable:
+                slot.record_congestion()
+                raise
+            finally:
+                governor.release(slot)
+            break
+
+        except RETRYABLE_EXCEPTIONS as err:
+            logger.warning(f"{type(err).__name__} in 'aio._request' "
+                            f"(attempt #{state.try_num+1})")
+            # This will re-raise the exception if we shouldn't try again
+            await asyncio.sleep(state.failed(err))
+
+    if return_type.lower() == "json" and _uses_cache(profile):
+        await asyncio.to_thread(_update_cache, method, url, profile,
+                response_cache, cache_key, cache_ttl, retval, resp)
+
+    return retval
+    #}}}
+
+#------------------------------------------------------------------------------
+
+async def _get(url, **kwargs):
+    return await _request("get", url, **kwargs)
+
+async def _post(url, data, **kwargs):
+    return await _request("post", url, json=data, **kwargs)
+
+async def _patch(url, data, **kwargs):
+    return await _request("patch", url, json=data, **kwargs)
+
+##############################################################################
+#
+#  ENDPOINTS
+#
+#  These mirror the functions of the same name in RestApiV1. See those for
+#  the structure of the responses.
+#
+##############################################################################
+
+def _url(profile, path):
+    profile = profile or config.active_profile
+    return f"https://{profile.rest_api}/{path}"
+
+async def get_hwitem(part_id, history=False, **kwargs):
+    url = _url(kwargs.get('profile'), f"api/v1/components/{sanitize(part_id)}")
+    params = [("history", "y")] if history else []
+    return await _get(url, params=params, **kwargs)
+
+async def get_hwitems(part_type_id, *, fields=None, **kwargs):
+    '''Get a page of items for a component type
+
+    Any of the filters accepted by RestApiV1.get_hwitems (page, size,
+    serial_number, status, location, ...) may be passed as keywords.
+    '''
+    url = _url(kwargs.get('profile'),
+            f"api/v1/component-types/{sanitize(part_type_id)}/components")
+
+    request_kwargs = {k: kwargs.pop(k) for k in list(kwargs)
+                        if k in ("profile", "timeouts", "timeout", "refresh", "headers")}
+    params = [(k, v) for k, v in kwargs.items() if v is not None]
+    if fields is not None:
+        params.append(("fields", ",".join(fields)))
+
+    return await _get(url, params=params, **request_kwargs)
+
+async def get_subcomponents(part_id, **kwargs):
+    url = _url(kwargs.get('profile'),
+            f"api/v1/components/{sanitize(part_id)}/subcomponents")
+    return await _get(url, **kwargs)
+
+async def get_hwitem_locations(part_id, **kwargs):
+    url = _url(kwargs.get('profile'),
+            f"api/v1/components/{sanitize(part_id)}/locations")
+    return await _get(url, **kwargs)
+
+async def get_hwitem_tests(part_id, history=False, **kwargs):
+    url = _url(kwargs.get('profile'),
+            f"api/v1/components/{sanitize(part_id)}/tests")
+    params = [("history", str(history).lower())]
+    return await _get(url, params=params, **kwargs)
+
+async def get_hwitem_test(part_id, test_type_id, history=False, **kwargs):
+    url = _url(kwargs.get('profile'),
+            f"api/v1/components/{sanitize(part_id)}/tests/{sanitize(test_type_id)}")
+    params = [("history", str(history).lower())]
+    return await _get(url, params=params, **kwargs)
+
+async def get_component_type(part_type_id, **kwargs):
+    url = _url(kwargs.get('profile'),
+            f"api/v1/component-types/{sanitize(part_type_id)}")
+    return await _get(url, **kwargs)
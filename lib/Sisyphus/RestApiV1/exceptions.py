@@ -117,7 +117,15 @@ class NameResolutionFailure(RestApiException):
     """The URL of the server could not be resolved"""
 
 class ConnectionFailed(RestApiException):
-    """The REST API server could not be reached"""
+    """The REST API server could not be reached
+
+    request_sent is False only if we know the request never got to the
+    server (e.g., the connection couldn't be made), which means that it is
+    safe to try even a POST or PATCH again.
+    """
+    def __init__(self, *args, request_sent=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.request_sent = request_sent
     
 class NotFound(RestApiException):
     """The function or method did not get a result"""
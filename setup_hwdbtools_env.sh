@@ -128,6 +128,7 @@ numpy
 pyopenssl
 PyQt5
 pandas
+pyarrow
 qdarkstyle
 reportlab
 EOF
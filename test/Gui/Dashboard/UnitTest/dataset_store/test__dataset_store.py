@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+These tests don't need the dashboard's server. They're skipped if pyarrow
+isn't installed (and the ones for the Plots callback, if dash isn't).
+"""
+
+from Sisyphus.Configuration import config
+from Sisyphus.Utils import UnitTest as unittest
+
+from Sisyphus.Gui.Dashboard.utils import dataset_store, data_resolver
+from Sisyphus.Gui.Dashboard.utils.dataset_store import (HAVE_ARROW, ROW_COLUMN,
+        save_dataset, read_dataset, dataset_columns)
+
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+if HAVE_ARROW:
+    import pyarrow as pa
+
+try:
+    from Sisyphus.Gui.Dashboard.callbacks import callbacks_plot
+except ImportError:
+    callbacks_plot = None
+
+VALUE = "TEST: test_data_value"
+STATUS = "TEST: status"
+
+def make_df():
+    return pd.DataFrame({
+        "Part ID": [f"Z00100300001-{n:05d}" for n in range(6)],
+        VALUE: [1.0, 2.0, 2.0, 3.0, np.nan, 5.0],
+        STATUS: ["green", "red", "green", "yellow", "red", "green"],
+        "TEST: test_data_channels": [[1.0, 2.0], [], [3.0], None, [4.0, 5.0, 6.0], [7.0]],
+    })
+
+class FakeApp:
+    '''Collects the callbacks that register_callbacks defines'''
+    def __init__(self):
+        self.callbacks = {}
+
+    def callback(self, *args, **kwargs):
+        def decorator(func):
+            self.callbacks[func.__name__] = func
+            return func
+        return decorator
+
+@unittest.skipIf(not HAVE_ARROW, "pyarrow is not installed")
+class Test__dataset_store(unittest.TestCase):
+    #{{{
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = save_dataset(make_df(), os.path.join(self.tmpdir.name, "dataset"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    #-----------------------------------------------------------------------------
+
+    def test__round_trip(self):
+        """A dataset reads back the way it was saved, with lists as lists"""
+
+        self.assertEqual(self.path.suffix, ".parquet")
+        self.assertEqual(dataset_columns(self.path), list(make_df().columns))
+
+        df = read_dataset(self.path)
+        pd.testing.assert_frame_equal(df, make_df())
+        self.assertTrue(all(isinstance(v, list)
+                    for v in df["TEST: test_data_channels"].dropna()))
+
+        df = read_dataset(self.path, columns=["TEST: test_data_channels", "nonsense"])
+        self.assertEqual(list(df.columns), ["TEST: test_data_channels"])
+        self.assertEqual(df["TEST: test_data_channels"][4], [4.0, 5.0, 6.0])
+
+    #-----------------------------------------------------------------------------
+
+    def test__filtered_rows_keep_position(self):
+        """Rows read with a filter are indexed by their position in the whole dataset"""
+
+        df = read_dataset(self.path, columns=[VALUE],
+                    filters=[(STATUS, "in", ["green"]), ("nonsense", "==", 1)])
+        self.assertEqual(list(df.columns), [VALUE])
+        self.assertEqual(list(df.index), [0, 2, 5])
+        self.assertNotIn(ROW_COLUMN, df.columns)
+
+        # ...so they can be matched with the rows of an unfiltered read
+        full = read_dataset(self.path)
+        selected = data_resolver.apply_row_indices(full, df.index.tolist())
+        self.assertEqual(list(selected[STATUS]), ["green"] * 3)
+        self.assertEqual(list(selected[VALUE]), list(df[VALUE]))
+
+    #-----------------------------------------------------------------------------
+
+    def test__arrow_array_fallback(self):
+        """Values that don't fit a type fall back to an inferred type, then strings"""
+
+        arr = dataset_store._to_arrow_array(pd.Series([1, 2, None]), pa.float64())
+        self.assertEqual(arr.type, pa.float64())
+
+        # The datasheet said a number, but the values are text
+        # (newer versions of pyarrow infer large_string)
+        arr = dataset_store._to_arrow_array(pd.Series(["n/a", "1.5"]), pa.float64())
+        self.assertIn(arr.type, (pa.string(), pa.large_string()))
+
+        arr = dataset_store._to_arrow_array(pd.Series([1, "a", None, np.nan, [2]], dtype=object))
+        self.assertEqual(arr.type, pa.string())
+        self.assertEqual(arr.to_pylist(), ["1", "a", None, None, "[2]"])
+
+        # ...and a column like that still saves
+        df = pd.DataFrame({"mixed": pd.Series([1, "a", None], dtype=object)})
+        path = save_dataset(df, os.path.join(self.tmpdir.name, "mixed"),
+                    column_types={"mixed": pa.float64()})
+        mixed = read_dataset(path)["mixed"]
+        self.assertEqual(list(mixed[:2]), ["1", "a"])
+        self.assertTrue(pd.isna(mixed[2]))
+    #}}}
+
+#=================================================================================
+
+@unittest.skipIf(not HAVE_ARROW, "pyarrow is not installed")
+@unittest.skipIf(callbacks_plot is None, "dash is not installed")
+class Test__update_plot(unittest.TestCase):
+    #{{{
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = save_dataset(make_df(), os.path.join(self.tmpdir.name, "dataset"))
+        self.data = {"path": str(path)}
+
+        app = FakeApp()
+        callbacks_plot.register_callbacks(app)
+        self.update_plot = app.callbacks["update_plot"]
+        data_resolver.clear_cache()
+
+    def tearDown(self):
+        data_resolver.clear_cache()
+        self.tmpdir.cleanup()
+
+    def plot(self, value_filter):
+        '''Plots VALUE, returning the rows plotted and the filters each read used'''
+        with mock.patch.object(callbacks_plot, "load_df_from_store",
+                    wraps=data_resolver.load_df_from_store) as load:
+            fig, chips, filtered, config_data = self.update_plot(
+                        VALUE, "box", None, None, value_filter, [], [], 10,
+                        self.data, [], [], [], [], "and")
+        return filtered["row_indices"], [c.kwargs["filters"] for c in load.call_args_list]
+
+    #-----------------------------------------------------------------------------
+
+    def test__filter_pushed_down(self):
+        """The value filter is given to the reader, and rows keep their positions"""
+
+        rows, filters = self.plot([2.0, 5.0])
+        self.assertEqual(rows, [1, 2, 5])
+        self.assertEqual(filters, [[(VALUE, "in", [2.0, 5.0])]])
+
+    #-----------------------------------------------------------------------------
+
+    def test__retry_without_filter(self):
+        """If the reader can't use the filter, the dataset is read without it"""
+
+        # (the values can't be compared with the column's)
+        with self.assertLogs(callbacks_plot.logger, "DEBUG") as logs:
+            rows, filters = self.plot(["n/a"])
+        self.assertTrue(any("without the value filter" in line for line in logs.output))
+        self.assertEqual(filters, [[(VALUE, "in", ["n/a"])], None])
+        self.assertEqual(rows, [])
+
+        # If nothing matches, the plot is made as if filtering afterwards
+        rows, filters = self.plot([99.0])
+        self.assertEqual(filters, [[(VALUE, "in", [99.0])], None])
+        self.assertEqual(rows, [])
+    #}}}
+
+#=================================================================================
+
+if __name__ == "__main__":
+    unittest.main(argv=config.remaining_args)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+These tests don't need the dashboard's server. Outside of a request, every
+job belongs to the user "local".
+"""
+
+from Sisyphus.Configuration import config
+from Sisyphus.Utils import UnitTest as unittest
+
+from Sisyphus.Gui.Dashboard.utils import jobs
+
+import threading
+import time
+from unittest import mock
+from uuid import uuid4 as uuid
+
+def make_job(priority, owner="local", status="queued"):
+    '''Makes a job and adds it to the table, without anything to run it'''
+    job = jobs._Job(f"test-{uuid()}", "test", {}, None, (), {}, priority, owner)
+    job.status = status
+    jobs._jobs[job.job_id] = job
+    if status == "queued":
+        jobs._queue.append(job)
+    return job
+
+class Test__jobs(unittest.TestCase):
+    #{{{
+    def setUp(self):
+        # The scheduling tests use a table and queue of their own, and hold
+        # the lock so that the job threads (if they've been started) leave
+        # them alone
+        jobs._jobs_cond.acquire()
+        self.patches = [
+            mock.patch.object(jobs, "_jobs", {}),
+            mock.patch.object(jobs, "_queue", []),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        jobs._jobs_cond.release()
+
+    #-----------------------------------------------------------------------------
+
+    def test__priority_order(self):
+        """Jobs run by priority, and in the order they came within a priority"""
+
+        bulk = make_job(jobs.PRIORITY_BULK)
+        normal_1 = make_job(jobs.PRIORITY_NORMAL)
+        interactive = make_job(jobs.PRIORITY_INTERACTIVE)
+        normal_2 = make_job(jobs.PRIORITY_NORMAL)
+
+        order = [jobs._next_job() for _ in range(4)]
+        self.assertEqual(order, [interactive, normal_1, normal_2, bulk])
+        self.assertIsNone(jobs._next_job())
+
+    #-----------------------------------------------------------------------------
+
+    def test__bulk_jobs_per_user(self):
+        """A user's bulk jobs wait while they have the most they're allowed"""
+
+        for _ in range(jobs.MAX_BULK_JOBS_PER_USER):
+            make_job(jobs.PRIORITY_BULK, owner="alice", status="running")
+        waiting = make_job(jobs.PRIORITY_BULK, owner="alice")
+        other_user = make_job(jobs.PRIORITY_BULK, owner="bob")
+        not_bulk = make_job(jobs.PRIORITY_NORMAL, owner="alice")
+
+        self.assertIs(jobs._next_job(), not_bulk)
+        self.assertIs(jobs._next_job(), other_user)
+        self.assertIsNone(jobs._next_job())
+        self.assertEqual(jobs._queue, [waiting])
+
+    #-----------------------------------------------------------------------------
+
+    def test__bulk_jobs_total(self):
+        """Bulk jobs wait while the most that can run are running"""
+
+        for n in range(jobs.MAX_RUNNING_BULK_JOBS):
+            make_job(jobs.PRIORITY_BULK, owner=f"user-{n}", status="running")
+        waiting = make_job(jobs.PRIORITY_BULK, owner="someone-else")
+        interactive = make_job(jobs.PRIORITY_INTERACTIVE)
+
+        self.assertIs(jobs._next_job(), interactive)
+        self.assertIsNone(jobs._next_job())
+
+        # When one finishes, the waiting job can go
+        next(j for j in jobs._jobs.values() if j.status == "running").status = "done"
+        self.assertIs(jobs._next_job(), waiting)
+
+    #-----------------------------------------------------------------------------
+
+    def test__cancel_queued(self):
+        """A job cancelled before it runs is taken out of the queue"""
+
+        job = make_job(jobs.PRIORITY_NORMAL)
+        job.state.update({"status": "running", "done": False})
+
+        self.assertTrue(jobs.cancel(job.job_id))
+        self.assertEqual(job.status, "cancelled")
+        self.assertEqual(jobs._queue, [])
+        self.assertEqual(job.state,
+                    {"status": "error", "message": "Cancelled", "error": "Cancelled", "done": True})
+
+        # A job that's finished can't be cancelled
+        self.assertFalse(jobs.cancel(job.job_id))
+        self.assertFalse(jobs.cancel("no-such-job"))
+
+    #-----------------------------------------------------------------------------
+
+    def test__prune(self):
+        """Finished jobs are forgotten, and jobs nobody asks about are cancelled"""
+
+        now = time.time()
+        finished = make_job(jobs.PRIORITY_NORMAL, status="done")
+        finished.finished_at = now - jobs.RESULT_TTL - 1
+        recent = make_job(jobs.PRIORITY_NORMAL, status="done")
+        recent.finished_at = now
+        abandoned = make_job(jobs.PRIORITY_NORMAL, status="running")
+        abandoned.last_seen = now - jobs.ABANDON_AFTER - 1
+        watched = make_job(jobs.PRIORITY_NORMAL, status="running")
+
+        table = jobs.JobTable("test")
+        self.assertIn(watched.job_id, table)
+
+        jobs._prune()
+
+        self.assertEqual(set(jobs._jobs), {recent.job_id, abandoned.job_id, watched.job_id})
+        self.assertTrue(abandoned.cancelled.is_set())
+        self.assertFalse(watched.cancelled.is_set())
+    #}}}
+
+#=================================================================================
+
+class Test__running_jobs(unittest.TestCase):
+    #{{{
+    def tearDown(self):
+        pass
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() > deadline:
+                self.fail("timed out")
+            time.sleep(0.01)
+
+    #-----------------------------------------------------------------------------
+
+    def test__job_runs(self):
+        """A job runs in the background, and its state is looked up by ID"""
+
+        table = jobs.JobTable(f"test-{uuid()}")
+        other_table = jobs.JobTable(f"test-{uuid()}")
+
+        def work(job_id, items):
+            state = table[job_id]
+            state["results"] = list(jobs.map_tasks(lambda n: n * n, items))
+            state["done"] = True
+
+        job_id = f"test-{uuid()}"
+        table.submit(job_id, {"done": False}, work, job_id, range(100))
+        self.wait_for(lambda: table[job_id]["done"])
+
+        self.assertEqual(table[job_id]["results"], [n * n for n in range(100)])
+        self.assertNotIn(job_id, other_table)
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table.pop(job_id)["results"][-1], 99 * 99)
+        self.assertIsNone(table.get(job_id))
+
+    #-----------------------------------------------------------------------------
+
+    def test__job_fails(self):
+        """A job that raises an exception is recorded as failed"""
+
+        table = jobs.JobTable(f"test-{uuid()}")
+        def work():
+            raise ValueError("no such part type")
+
+        job_id = table.submit(f"test-{uuid()}", {"done": False}, work)
+        self.wait_for(lambda: table[job_id]["done"])
+        self.assertEqual(table[job_id]["error"], "no such part type")
+
+    #-----------------------------------------------------------------------------
+
+    def test__pop_cancels(self):
+        """Popping a running job cancels it and drops its queued tasks"""
+
+        table = jobs.JobTable(f"test-{uuid()}", jobs.PRIORITY_BULK)
+        started = threading.Event()
+        stopped = threading.Event()
+        futures = []
+
+        def work():
+            # More tasks than there are threads, none of which can finish yet
+            futures.extend(jobs.submit_task(stopped.wait) for _ in range(jobs.NUM_TASK_THREADS * 2))
+            started.set()
+            try:
+                while True:
+                    jobs.check_cancelled()
+                    time.sleep(0.01)
+            finally:
+                stopped.set()
+
+        job_id = table.submit(f"test-{uuid()}", {"done": False}, work)
+        self.assertTrue(started.wait(5))
+        self.assertFalse(jobs.cancelled())
+
+        state = table.pop(job_id)
+        self.assertTrue(stopped.wait(5))
+        self.wait_for(lambda: state["done"])
+        self.assertEqual(state["error"], "Cancelled")
+        self.assertTrue(any(f.cancelled() for f in futures))
+
+    #-----------------------------------------------------------------------------
+
+    def test__tasks_within_tasks(self):
+        """A task that submits tasks runs them itself, rather than waiting for a thread"""
+
+        def outer(n):
+            return sum(jobs.submit_task(lambda m: m, m).result() for m in range(n))
+
+        futures = [jobs.submit_task(outer, 10) for _ in range(jobs.NUM_TASK_THREADS * 2)]
+        self.assertEqual([f.result(timeout=5) for f in futures],
+                    [45] * (jobs.NUM_TASK_THREADS * 2))
+
+        with self.assertRaises(ZeroDivisionError):
+            jobs.submit_task(lambda: 1 / 0).result(timeout=5)
+    #}}}
+
+#=================================================================================
+
+if __name__ == "__main__":
+    unittest.main(argv=config.remaining_args)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+These tests don't contact the server. The REST API calls that
+HWItem.update_core_bulk makes are replaced with mocks.
+"""
+
+from Sisyphus.Configuration import config
+from Sisyphus.Utils import UnitTest as unittest
+
+from Sisyphus.DataModel import HWItem
+import Sisyphus.RestApiV1 as ra
+import Sisyphus.RestApiV1.Utilities as ut
+
+from unittest import mock
+
+PART_TYPE_ID = "Z00100300001"
+PART_TYPE = {
+    "ComponentType": {
+        "part_type_id": PART_TYPE_ID,
+        "full_name": "Z.Sandbox.HWDBUnitTest.doohickey",
+        "manufacturers": [{"id": 7}],
+        "properties": {"specifications": [{"datasheet": {"Color": None}}]},
+        "connectors": {},
+    }
+}
+
+def make_hwitem(serial_number, part_id=None):
+    hwitem = HWItem.__new__(HWItem)
+    hwitem._part_type = PART_TYPE
+    hwitem._last_commit = {k: None for k in HWItem._property_to_column}
+    hwitem._current = {
+        **hwitem._last_commit,
+        "part_type_id": PART_TYPE_ID,
+        "part_id": part_id,
+        "serial_number": serial_number,
+        "country_code": "US",
+        "institution_id": 186,
+        "manufacturer_id": 7,
+        "specifications": {"Color": "red"},
+        "status": 1,
+    }
+    hwitem._is_new = part_id is None
+    return hwitem
+
+def bulk_added(count):
+    return {"data": [{"part_id": f"{PART_TYPE_ID}-{n:05d}"} for n in range(1, count+1)]}
+
+class Test__HWItem_bulk(unittest.TestCase):
+    #{{{
+    def setUp(self):
+        self.patches = [
+            mock.patch.object(ra, "post_hwitems_bulk"),
+            mock.patch.object(ra, "patch_hwitems_bulk", return_value={"data": []}),
+            mock.patch.object(ra, "post_hwitem"),
+            mock.patch.object(ra, "patch_hwitem"),
+            mock.patch.object(ut, "fetch_component_type", return_value=PART_TYPE),
+            mock.patch.object(ut, "user_role_check", return_value=True),
+            mock.patch.object(ut, "lookup_serial_number", return_value=None),
+            mock.patch.object(ut, "note_serial_number"),
+            mock.patch.object(ut, "enable_hwitem"),
+        ]
+        self.mocks = {p.attribute: p.start() for p in self.patches}
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    #-----------------------------------------------------------------------------
+
+    def test__rejected_row(self):
+        """A row that can't be patched doesn't stop the others, and is disabled"""
+
+        hwitems = [make_hwitem(sn) for sn in ("A", "B", "C")]
+        self.mocks["post_hwitems_bulk"].return_value = bulk_added(3)
+        self.mocks["patch_hwitems_bulk"].return_value = {"data": [
+            {"part_id": f"{PART_TYPE_ID}-00002", "status": "Error"}]}
+        self.mocks["patch_hwitem"].side_effect = ra.DatabaseError("bad specifications")
+
+        with self.assertRaises(ra.DatabaseError):
+            HWItem.update_core_bulk(hwitems)
+
+        self.assertEqual([hwitem.is_new() for hwitem in hwitems], [False, True, False])
+        self.mocks["patch_hwitem"].assert_called_once()
+        self.mocks["enable_hwitem"].assert_called_once()
+        self.assertEqual(self.mocks["enable_hwitem"].call_args.args,
+                            (f"{PART_TYPE_ID}-00002",))
+        self.assertFalse(self.mocks["enable_hwitem"].call_args.kwargs["enable"])
+
+    #-----------------------------------------------------------------------------
+
+    def test__bulk_add_fallback(self):
+        """If bulk-add creates nothing, every item is posted on its own"""
+
+        hwitems = [make_hwitem(sn) for sn in ("A", "B", "C")]
+        self.mocks["post_hwitems_bulk"].side_effect = ra.DatabaseError("no bulk-add")
+
+        def post_hwitem(part_type_id, data):
+            if data["serial_number"] == "B":
+                raise ra.DatabaseError("duplicate serial number")
+            return {"part_id": f"{PART_TYPE_ID}-{data['serial_number']}"}
+        self.mocks["post_hwitem"].side_effect = post_hwitem
+
+        with self.assertRaises(ra.DatabaseError):
+            HWItem.update_core_bulk(hwitems)
+
+        self.assertEqual(self.mocks["post_hwitem"].call_count, 3)
+        self.assertEqual([hwitem.is_new() for hwitem in hwitems], [False, True, False])
+        self.assertEqual(hwitems[2].part_id, f"{PART_TYPE_ID}-C")
+        self.mocks["patch_hwitems_bulk"].assert_not_called()
+        self.mocks["enable_hwitem"].assert_not_called()
+
+    #-----------------------------------------------------------------------------
+
+    def test__bulk_add_maybe_sent(self):
+        """If bulk-add might have created items, nothing is posted again"""
+
+        hwitems = [make_hwitem(sn) for sn in ("A", "B")]
+        self.mocks["post_hwitems_bulk"].side_effect = ra.ConnectionFailed(request_sent=True)
+
+        with self.assertRaises(ra.ConnectionFailed):
+            HWItem.update_core_bulk(hwitems)
+
+        self.mocks["post_hwitem"].assert_not_called()
+
+    #-----------------------------------------------------------------------------
+
+    def test__risky_rows_posted_alone(self):
+        """Rows likely to be rejected aren't bulk-added"""
+
+        hwitems = [make_hwitem(sn) for sn in ("A", "B", "B", "C", "D")]
+        self.mocks["lookup_serial_number"].side_effect = (
+                    lambda part_type_id, sn: [f"{PART_TYPE_ID}-99999"] if sn == "C" else [])
+        self.mocks["post_hwitems_bulk"].return_value = bulk_added(2)
+        self.mocks["post_hwitem"].side_effect = ra.DatabaseError("rejected")
+
+        with self.assertRaises(ra.DatabaseError):
+            HWItem.update_core_bulk(hwitems)
+
+        self.assertEqual(self.mocks["post_hwitems_bulk"].call_args.args[1]["count"], 2)
+        self.assertEqual(self.mocks["post_hwitem"].call_count, 3)
+        self.assertEqual([hwitem.is_new() for hwitem in hwitems],
+                            [False, True, True, True, False])
+        self.mocks["enable_hwitem"].assert_not_called()
+
+    #-----------------------------------------------------------------------------
+
+    def test__edits(self):
+        """Existing items are patched together and all committed"""
+
+        hwitems = [make_hwitem(sn, f"{PART_TYPE_ID}-0000{n}")
+                        for n, sn in enumerate(("A", "B", "C"), 1)]
+
+        HWItem.update_core_bulk(hwitems)
+
+        self.mocks["post_hwitems_bulk"].assert_not_called()
+        self.mocks["patch_hwitem"].assert_not_called()
+        self.assertEqual(len(self.mocks["patch_hwitems_bulk"].call_args.args[1]["data"]), 3)
+        self.assertEqual([hwitem._last_commit["serial_number"] for hwitem in hwitems],
+                            ["A", "B", "C"])
+    #}}}
+
+#=================================================================================
+
+if __name__ == "__main__":
+    unittest.main(argv=config.remaining_args)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+"""
+
+from Sisyphus.Configuration import config
+from Sisyphus.Utils import UnitTest as unittest
+
+from Sisyphus.HWDBUtility.Upload.JobGraph import JobGraph
+
+import threading
+import time
+
+class Test__JobGraph(unittest.TestCase):
+    #{{{
+    def test__dependencies_respected(self):
+        """Jobs never start before the jobs they depend on are done"""
+
+        lock = threading.Lock()
+        order = []
+
+        def job(name):
+            def func():
+                time.sleep(0.01)
+                with lock:
+                    order.append(name)
+            return func
+
+        graph = JobGraph()
+        graph.add("core1", job("core1"), "core")
+        graph.add("core2", job("core2"), "core")
+        graph.add("release1", job("release1"), "release", deps={"core1"})
+        graph.add("release2", job("release2"), "release", deps={"core2"})
+        graph.add("attach1", job("attach1"), "attach",
+                    deps={"core1", "core2", "release1", "release2"})
+        graph.add("test1", job("test1"), "test", deps={"core1"})
+
+        progress = []
+        graph.run(4, progress=lambda finished: progress.append(dict(finished)))
+
+        self.assertEqual(set(order), set(graph.nodes))
+        for key, node in graph.nodes.items():
+            for dep in node.deps:
+                self.assertLess(order.index(dep), order.index(key))
+        self.assertEqual(progress[-1], {"core": 2, "release": 2, "attach": 1, "test": 1})
+
+    #-----------------------------------------------------------------------------
+
+    def test__independent_jobs_overlap(self):
+        """Jobs without dependencies run at the same time"""
+
+        barrier = threading.Barrier(5, timeout=5)
+
+        graph = JobGraph()
+        for n in range(5):
+            graph.add(n, barrier.wait)
+
+        # If these ran one at a time, the barrier would time out
+        graph.run(5)
+
+    #-----------------------------------------------------------------------------
+
+    def test__failure_stops_dependents(self):
+        """A failed job raises, and nothing that depends on it runs"""
+
+        ran = []
+
+        def fail():
+            raise RuntimeError("boom")
+
+        graph = JobGraph()
+        graph.add("a", fail)
+        graph.add("b", lambda: ran.append("b"), deps={"a"})
+
+        with self.assertRaises(RuntimeError):
+            graph.run(2)
+        self.assertEqual(ran, [])
+
+    #-----------------------------------------------------------------------------
+
+    def test__unknown_dependency(self):
+        """A job can only depend on jobs that were already added"""
+
+        graph = JobGraph()
+        with self.assertRaises(ValueError):
+            graph.add("a", lambda: None, deps={"b"})
+    #}}}
+
+#=================================================================================
+
+if __name__ == "__main__":
+    unittest.main(argv=config.remaining_args)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+"""
+
+from Sisyphus.Configuration import config
+from Sisyphus.Utils import UnitTest as unittest
+
+from Sisyphus.HWDBUtility.Upload.JobManager import JobManager
+
+class StubItem:
+    def __init__(self, part_id, serial_number, part_type_id="Z00100300001", sn_conflicts=None):
+        self.part_id = part_id
+        self.serial_number = serial_number
+        self.part_type_id = part_type_id
+        self._sn_conflicts = sn_conflicts
+
+    def is_new(self):
+        return self.part_id is None
+
+def job_manager(*item_jobs):
+    # Skips __init__, which starts a thread pool
+    jm = JobManager.__new__(JobManager)
+    jm.item_jobs = dict(enumerate(item_jobs, 1))
+    return jm
+
+class Test__JobManager(unittest.TestCase):
+    #{{{
+    def test__same_item_twice(self):
+        """Two jobs editing the same item aren't a conflict"""
+
+        jm = job_manager(StubItem("Z00100300001-00001", "SN1"),
+                         StubItem("Z00100300001-00001", "SN1"))
+        self.assertEqual(jm.check_serial_numbers(), [])
+
+    #-----------------------------------------------------------------------------
+
+    def test__different_items(self):
+        """Different items (new or existing) can't share a serial number"""
+
+        jm = job_manager(StubItem("Z00100300001-00001", "SN1"),
+                         StubItem("Z00100300001-00002", "SN1"))
+        self.assertEqual(len(jm.check_serial_numbers()), 1)
+
+        jm = job_manager(StubItem(None, "SN1"), StubItem(None, "SN1"))
+        self.assertEqual(len(jm.check_serial_numbers()), 1)
+
+        jm = job_manager(StubItem("Z00100300001-00001", "SN1"),
+                         StubItem("Z00100300001-00001", "SN1"),
+                         StubItem(None, "SN1"))
+        self.assertEqual(len(jm.check_serial_numbers()), 1)
+
+    #-----------------------------------------------------------------------------
+
+    def test__serial_number_taken(self):
+        """An item can't take a serial number another item keeps"""
+
+        taken = StubItem("Z00100300001-00001", "SN2",
+                            sn_conflicts=["Z00100300001-00002"])
+        self.assertEqual(len(job_manager(taken).check_serial_numbers()), 1)
+
+        # ...unless the other item is changing its serial number too
+        swap = StubItem("Z00100300001-00002", "SN1",
+                            sn_conflicts=["Z00100300001-00001"])
+        self.assertEqual(job_manager(taken, swap).check_serial_numbers(), [])
+    #}}}
+
+#=================================================================================
+
+if __name__ == "__main__":
+    unittest.main(argv=config.remaining_args)
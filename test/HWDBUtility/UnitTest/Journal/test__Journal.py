@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+"""
+
+from Sisyphus.Configuration import config
+from Sisyphus.Utils import UnitTest as unittest
+
+from Sisyphus.HWDBUtility.Upload.Journal import (UploadJournal,
+        STAGE_CORE, STAGE_LOCATION, STAGE_DONE)
+
+import os
+import tempfile
+
+def make_item_request(serial_number, external_id=None):
+    return {
+        "Record Type": "Item",
+        "Part Type ID": "Z00100300001",
+        "Part Type Name": "Z.Sandbox.HWDBUnitTest.doohickey",
+        "Data": {
+            "Part Type ID": "Z00100300001",
+            "Serial Number": serial_number,
+            "External ID": external_id,
+        },
+    }
+
+def make_test_request(serial_number):
+    return {
+        "Record Type": "Test",
+        "Part Type ID": "Z00100300001",
+        "Part Type Name": "Z.Sandbox.HWDBUnitTest.doohickey",
+        "Test Name": "Bounce",
+        "Data": {
+            "Part Type ID": "Z00100300001",
+            "Serial Number": serial_number,
+            "External ID": None,
+        },
+    }
+
+class Test__Journal(unittest.TestCase):
+    #{{{
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "journal.jsonl")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    #-----------------------------------------------------------------------------
+
+    def test__resume_skips_finished_jobs(self):
+        """Only the jobs that weren't finished come back on resume"""
+
+        requests = [make_item_request("A"), make_item_request("B"), make_item_request("C")]
+
+        journal = UploadJournal(self.filename)
+        keyed = list(journal.unfinished(requests))
+        self.assertEqual(len(keyed), 3)
+        journal.record(keyed[0]["Journal Key"], STAGE_DONE, "Item",
+                        part_id="Z00100300001-00001", part_type_id="Z00100300001",
+                        serial_number="A")
+        journal.record(keyed[1]["Journal Key"], STAGE_CORE, "Item",
+                        part_id="Z00100300001-00002", part_type_id="Z00100300001",
+                        serial_number="B")
+        journal.close()
+
+        requests = [make_item_request("A"), make_item_request("B"), make_item_request("C"),
+                        make_test_request("A")]
+
+        journal = UploadJournal(self.filename, resume=True)
+        remaining = list(journal.unfinished(requests))
+        journal.close()
+
+        self.assertEqual(journal.skipped, 1)
+        self.assertEqual([r["Data"]["Serial Number"] for r in remaining], ["B", "C", "A"])
+
+        # "B" was created, but not finished, so it should be edited rather
+        # than created again
+        self.assertEqual(remaining[0]["Data"]["External ID"], "Z00100300001-00002")
+        self.assertIsNone(remaining[1]["Data"]["External ID"])
+
+        # The test for "A" gets the part ID of the item that was created
+        self.assertEqual(remaining[2]["Data"]["External ID"], "Z00100300001-00001")
+
+    #-----------------------------------------------------------------------------
+
+    def test__identical_rows(self):
+        """Identical job requests get different keys"""
+
+        journal = UploadJournal(self.filename)
+        keys = [journal.key_for(make_item_request("A")) for _ in range(2)]
+        journal.close()
+
+        self.assertNotEqual(keys[0], keys[1])
+
+    #-----------------------------------------------------------------------------
+
+    def test__fresh_run_starts_over(self):
+        """Without resume, the journal from an earlier run is discarded"""
+
+        journal = UploadJournal(self.filename)
+        key = journal.key_for(make_item_request("A"))
+        journal.record(key, STAGE_DONE, "Item", part_id="Z00100300001-00001")
+        journal.close()
+
+        journal = UploadJournal(self.filename)
+        remaining = list(journal.unfinished([make_item_request("A")]))
+        journal.close()
+
+        self.assertEqual(len(remaining), 1)
+
+    #-----------------------------------------------------------------------------
+
+    def test__fresh_run_keeps_history(self):
+        """A fresh run appends to the journal, and resume picks up the last run"""
+
+        journal = UploadJournal(self.filename)
+        key = list(journal.unfinished([make_item_request("A")]))[0]["Journal Key"]
+        journal.record(key, STAGE_DONE, "Item", part_id="Z00100300001-00001",
+                        part_type_id="Z00100300001", serial_number="A")
+        journal.close()
+
+        journal = UploadJournal(self.filename)
+        key = list(journal.unfinished([make_item_request("B")]))[0]["Journal Key"]
+        journal.record(key, STAGE_DONE, "Item", part_id="Z00100300001-00002",
+                        part_type_id="Z00100300001", serial_number="B")
+        journal.close()
+
+        # The part ID from the first run is still in the file
+        with open(self.filename, encoding="utf-8") as fp:
+            self.assertIn("Z00100300001-00001", fp.read())
+
+        journal = UploadJournal(self.filename, resume=True)
+        remaining = list(journal.unfinished([make_item_request("A"), make_item_request("B")]))
+        journal.close()
+
+        self.assertEqual([r["Data"]["Serial Number"] for r in remaining], ["A"])
+        self.assertIsNone(remaining[0]["Data"]["External ID"])
+        self.assertEqual(journal.finished_count("Z00100300001"), 1)
+
+    #-----------------------------------------------------------------------------
+
+    def test__furthest_stage_counts(self):
+        """Journalling an earlier stage again doesn't undo a later one"""
+
+        journal = UploadJournal(self.filename)
+        key = list(journal.unfinished([make_item_request("A")]))[0]["Journal Key"]
+        journal.record(key, STAGE_CORE, "Item", part_id="Z00100300001-00001")
+        journal.record(key, STAGE_LOCATION, "Item", part_id="Z00100300001-00001")
+        journal.close()
+
+        journal = UploadJournal(self.filename, resume=True)
+        remaining = list(journal.unfinished([make_item_request("A")]))
+        key = remaining[0]["Journal Key"]
+        self.assertTrue(journal.has_reached(key, STAGE_LOCATION))
+
+        journal.record(key, STAGE_CORE, "Item", part_id="Z00100300001-00001")
+        self.assertTrue(journal.has_reached(key, STAGE_LOCATION))
+        self.assertFalse(journal.has_reached(key, STAGE_DONE))
+        journal.close()
+    #}}}
+
+#=================================================================================
+
+if __name__ == "__main__":
+    unittest.main(argv=config.remaining_args)
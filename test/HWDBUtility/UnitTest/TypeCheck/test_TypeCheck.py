@@ -174,6 +174,52 @@ class Test__TypeCheck(TestCaseLogger): #unittest.TestCase):
             raise
         #}}}
    
+    #-----------------------------------------------------------------------------
+
+    def test__cast_column(self):
+        #{{{
+        """Casting a whole column gives the same results as casting each cell"""
+
+        import pandas as pd
+
+        columns = [
+            pd.Series([1, 2, 3]),
+            pd.Series([1.0, 2.5, float("nan")]),
+            pd.Series([True, False]),
+            pd.Series(["1", "abc", "<null>", "", "2.0", "[1, 2]"]),
+            pd.Series([1, "x", 2.5, None], dtype=object),
+            [3, "3", 3.5, None],
+        ]
+        datatypes = ["any", "int", "float", "number", "str", "bool",
+                        "float,null", "int,null", "null,int", "json", "unixtime"]
+
+        for values in columns:
+            for datatype in datatypes:
+                cast_values, warnings = tc.cast_column(values, datatype)
+
+                for index, value in enumerate(list(values)):
+                    cell = tc.cast(Cell(source="unit test", datatype=datatype, value=value))
+                    msg = f"{datatype} {value!r}"
+
+                    if type(cell.value) is float and math.isnan(cell.value):
+                        self.assertTrue(math.isnan(cast_values[index]), msg)
+                    else:
+                        self.assertEqual(cast_values[index], cell.value, msg)
+                    self.assertEqual(type(cast_values[index]), type(cell.value), msg)
+                    self.assertEqual(warnings.get(index, []), cell.warnings, msg)
+        #}}}
+
+    #-----------------------------------------------------------------------------
+
+    def test__cast_does_not_change_cell(self):
+        #{{{
+        cell_in = Cell(source="unit test", datatype="int,null", value="abc")
+        cell_out = tc.cast(cell_in)
+        self.assertEqual(cell_in.value, "abc")
+        self.assertEqual(cell_in.warnings, [])
+        self.assertTrue(len(cell_out.warnings) > 0)
+        #}}}
+
     #-----------------------------------------------------------------------------
     #============================================================================= 
 
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+These tests don't contact the server. The same sequence of responses (or
+network errors) is given to RestApiV1._request and aio._request, to check
+that they retry the same way and raise the same exceptions.
+"""
+
+from Sisyphus.Configuration import config
+from Sisyphus.Utils import UnitTest as unittest
+
+import Sisyphus.Configuration as cfg
+from Sisyphus.RestApiV1 import aio
+from Sisyphus.RestApiV1.exceptions import (ConnectionFailed, CurrentlyUnavailable,
+        InvalidResponse)
+
+import asyncio
+from datetime import timedelta
+import importlib
+import json
+import requests
+from unittest import mock
+from uuid import uuid4 as uuid
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+_RestApiV1 = importlib.import_module("Sisyphus.RestApiV1._RestApiV1")
+
+URL = "https://example.com/cdbdev/api/v1/components/Z00100300001-00001"
+
+# No waiting between attempts
+NO_BACKOFF = {"backoff_max": 0}
+
+OK = (200, "application/json", json.dumps({"status": "OK", "data": {"part_id": "Z"}}))
+UNAVAILABLE = (503, "text/html", "<html>The resource is currently unavailable</html>")
+SERVER_ERROR = (500, "text/html", "<html>Internal Server Error</html>")
+
+class StubProfile:
+    def __init__(self, auth_type=cfg.KW_AUTH_CERT):
+        self.profile_name = f"aio-test-{uuid()}"
+        self.settings = {}
+        self.authentication = {cfg.KW_AUTH_TYPE: auth_type, cfg.KW_CERTIFICATE: None}
+
+class StubResponse:
+    def __init__(self, status_code, content_type, text):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.encoding = "utf-8"
+        self.headers = {"Content-Type": content_type}
+        self.elapsed = timedelta(0)
+
+# The network errors each transport raises for the same failure
+NETWORK_ERRORS = {
+    "connect_timeout": (requests.exceptions.ConnectTimeout,
+                        httpx and httpx.ConnectTimeout),
+    "read_timeout": (requests.exceptions.ReadTimeout,
+                        httpx and httpx.ReadTimeout),
+}
+
+def run_sync(method, outcomes, **kwargs):
+    '''Runs RestApiV1._request, returning (result or exception, attempts)'''
+    outcomes = list(outcomes)
+    attempts = 0
+
+    def request(*args, **kwargs):
+        nonlocal attempts
+        attempts += 1
+        outcome = outcomes.pop(0)
+        if outcome in NETWORK_ERRORS:
+            raise NETWORK_ERRORS[outcome][0]("simulated")
+        return StubResponse(*outcome)
+
+    session_manager = mock.MagicMock()
+    session_manager.session.request.side_effect = request
+    with mock.patch.object(_RestApiV1, "SessionManager", return_value=session_manager):
+        try:
+            result = _RestApiV1._request(method, URL, profile=StubProfile(),
+                        retry_policy=NO_BACKOFF, coalesce=False, **kwargs)
+        except Exception as exc:
+            result = exc
+    return result, attempts
+
+def run_async(method, outcomes, profile=None, **kwargs):
+    '''Runs aio._request over a MockTransport, returning (result or exception, attempts)'''
+    outcomes = list(outcomes)
+    attempts = 0
+
+    def handler(request):
+        nonlocal attempts
+        attempts += 1
+        outcome = outcomes.pop(0)
+        if outcome in NETWORK_ERRORS:
+            raise NETWORK_ERRORS[outcome][1]("simulated", request=request)
+        status_code, content_type, text = outcome
+        # (as a stream, so that it's read and closed like a real response)
+        return httpx.Response(status_code, headers={"Content-Type": content_type},
+                    stream=httpx.ByteStream(text.encode("utf-8")))
+
+    async def main():
+        try:
+            return await aio._request(method, URL, profile=profile or StubProfile(),
+                        retry_policy=NO_BACKOFF, **kwargs)
+        except Exception as exc:
+            return exc
+        finally:
+            await aio.aclose()
+
+    make_client = lambda profile: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with mock.patch.object(aio, "_make_client", make_client):
+        result = asyncio.run(main())
+    return result, attempts
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class Test__aio(unittest.TestCase):
+    #{{{
+    def setUp(self):
+        # Refreshing the token would otherwise try to make a real ProfileManager
+        self.profile_manager_for = mock.MagicMock()
+        self.patches = [
+            mock.patch.object(aio.SessionManager, "profile_manager_for",
+                        self.profile_manager_for),
+            mock.patch.dict(aio._profile_managers, clear=True),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def assertSameOutcome(self, method, outcomes, **kwargs):
+        sync_result, sync_attempts = run_sync(method, outcomes, **kwargs)
+        async_result, async_attempts = run_async(method, outcomes, **kwargs)
+
+        self.assertEqual(async_attempts, sync_attempts)
+        if isinstance(sync_result, Exception):
+            self.assertIs(type(async_result), type(sync_result))
+            self.assertEqual(getattr(async_result, "request_sent", None),
+                        getattr(sync_result, "request_sent", None))
+        else:
+            self.assertEqual(async_result, sync_result)
+        return async_result, async_attempts
+
+    #-----------------------------------------------------------------------------
+
+    def test__success(self):
+        """A good response is decoded the same way"""
+
+        result, attempts = self.assertSameOutcome("get", [OK])
+        self.assertEqual(result["data"], {"part_id": "Z"})
+        self.assertEqual(attempts, 1)
+
+    #-----------------------------------------------------------------------------
+
+    def test__retry_unavailable(self):
+        """A "currently unavailable" page is retried, until the attempts run out"""
+
+        result, attempts = self.assertSameOutcome("get", [UNAVAILABLE, UNAVAILABLE, OK],
+                    timeouts=[5, 5, 5])
+        self.assertEqual(attempts, 3)
+        self.assertEqual(result["status"], "OK")
+
+        result, attempts = self.assertSameOutcome("post", [UNAVAILABLE] * 3,
+                    timeouts=[5, 5, 5], json={})
+        self.assertIsInstance(result, CurrentlyUnavailable)
+        self.assertEqual(attempts, 3)
+
+    #-----------------------------------------------------------------------------
+
+    def test__not_retried(self):
+        """An error page that isn't a sign of trouble on the server is raised at once"""
+
+        result, attempts = self.assertSameOutcome("get", [SERVER_ERROR, OK],
+                    timeouts=[5, 5])
+        self.assertIsInstance(result, InvalidResponse)
+        self.assertEqual(attempts, 1)
+
+    #-----------------------------------------------------------------------------
+
+    def test__connection_errors(self):
+        """Network errors map to ConnectionFailed, and a POST is only retried if unsent"""
+
+        result, attempts = self.assertSameOutcome("post", ["connect_timeout", OK],
+                    timeouts=[5, 5], json={})
+        self.assertEqual(result["status"], "OK")
+        self.assertEqual(attempts, 2)
+
+        result, attempts = self.assertSameOutcome("post", ["read_timeout", OK],
+                    timeouts=[5, 5], json={})
+        self.assertIsInstance(result, ConnectionFailed)
+        self.assertTrue(result.request_sent)
+        self.assertEqual(attempts, 1)
+
+        result, attempts = self.assertSameOutcome("get", ["read_timeout"] * 2,
+                    timeouts=[5, 5])
+        self.assertIsInstance(result, ConnectionFailed)
+        self.assertEqual(attempts, 2)
+
+    #-----------------------------------------------------------------------------
+
+    def test__profile_manager_once(self):
+        """The ProfileManager is looked up once per profile, not once per attempt"""
+
+        self.profile_manager_for.return_value.bearer_token = "token"
+        profile = StubProfile(cfg.KW_AUTH_HTGETTOKEN)
+
+        for _ in range(2):
+            result, attempts = run_async("get", [UNAVAILABLE, UNAVAILABLE, OK],
+                        profile=profile, timeouts=[5, 5, 5])
+            self.assertEqual(attempts, 3)
+            self.assertEqual(result["status"], "OK")
+
+        self.profile_manager_for.assert_called_once_with(profile)
+        self.assertEqual(self.profile_manager_for.return_value.refresh.call_count, 4)
+    #}}}
+
+#=================================================================================
+
+if __name__ == "__main__":
+    unittest.main(argv=config.remaining_args)
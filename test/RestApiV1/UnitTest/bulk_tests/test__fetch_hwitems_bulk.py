@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+These tests don't contact the server. The REST API calls that
+fetch_hwitems_bulk makes are replaced with mocks.
+"""
+
+from Sisyphus.Configuration import config
+from Sisyphus.Utils import UnitTest as unittest
+
+import Sisyphus.RestApiV1 as ra
+import Sisyphus.RestApiV1.Utilities as ut
+
+import threading
+from collections import Counter
+from unittest import mock
+
+class FakeHWDB:
+    '''Stands in for the REST API functions, counting the calls to each'''
+    def __init__(self, missing=(), broken_locations=()):
+        self.missing = set(missing)
+        self.broken_locations = set(broken_locations)
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def count(self, name, part_id):
+        with self.lock:
+            self.calls[name, part_id] += 1
+
+    def get_hwitem(self, part_id, **kwargs):
+        self.count("item", part_id)
+        if part_id in self.missing:
+            raise ra.NotFound(f"no such item {part_id}")
+        return {"data": {"part_id": part_id, "kwargs": kwargs}}
+
+    def get_subcomponents(self, part_id, **kwargs):
+        self.count("subcomponents", part_id)
+        if part_id in self.missing:
+            raise ra.NotFound(f"no such item {part_id}")
+        return {"data": [{"functional_position": "Leg", "part_id": f"{part_id}-leg"}]}
+
+    def get_hwitem_locations(self, part_id, **kwargs):
+        self.count("locations", part_id)
+        if part_id in self.missing or part_id in self.broken_locations:
+            raise ra.DatabaseError(f"locations failed for {part_id}")
+        return {"data": []}
+
+    def patch(self):
+        return mock.patch.dict(ut.BULK_PARTS, {
+            "item": (self.get_hwitem, "Item"),
+            "subcomponents": (self.get_subcomponents, "Subcomponents"),
+            "locations": (self.get_hwitem_locations, "Locations"),
+        })
+
+class Test__fetch_hwitems_bulk(unittest.TestCase):
+    #{{{
+    def tearDown(self):
+        pass
+
+    #-----------------------------------------------------------------------------
+
+    def test__dedupe(self):
+        """Each distinct part ID is fetched once, and yielded once"""
+
+        hwdb = FakeHWDB()
+        with hwdb.patch():
+            results = list(ut.fetch_hwitems_bulk(["A", "B", "A", "C", "B"]))
+
+        self.assertEqual(sorted(r.part_id for r in results), ["A", "B", "C"])
+        self.assertEqual(set(hwdb.calls.values()), {1})
+        self.assertEqual(len(hwdb.calls), 9)
+        for result in results:
+            self.assertEqual(list(result.data), ["Item", "Subcomponents", "Locations"])
+            self.assertEqual(result.errors, {})
+
+    #-----------------------------------------------------------------------------
+
+    def test__per_id_failures(self):
+        """A failure is reported for the part ID it belongs to, and the rest carry on"""
+
+        hwdb = FakeHWDB(missing={"B"}, broken_locations={"C"})
+        with hwdb.patch():
+            results = {r.part_id: r for r in ut.fetch_hwitems_bulk(["A", "B", "C", "D"])}
+
+        self.assertEqual(set(results), {"A", "B", "C", "D"})
+        self.assertEqual(results["A"].errors, {})
+        self.assertEqual(set(results["B"].errors), {"Item", "Subcomponents", "Locations"})
+        self.assertIsInstance(results["B"].errors["Item"], ra.NotFound)
+        self.assertEqual(results["B"].data, {})
+        self.assertEqual(set(results["C"].errors), {"Locations"})
+        self.assertEqual(list(results["C"].data), ["Item", "Subcomponents"])
+
+        # fetch_hwitems() still raises, for callers that want all or nothing
+        with hwdb.patch():
+            with self.assertRaises(ra.NotFound):
+                ut.fetch_hwitems(part_id="B")
+
+    #-----------------------------------------------------------------------------
+
+    def test__single_flight(self):
+        """Callers asking for the same thing at once share one request"""
+
+        hwdb = FakeHWDB()
+        release = threading.Event()
+        started = threading.Event()
+        def get_hwitem(part_id, **kwargs):
+            started.set()
+            release.wait(5)
+            return hwdb.get_hwitem(part_id, **kwargs)
+
+        results = []
+        def fetch():
+            results.extend(ut.fetch_hwitems_bulk(["A"], ("item",)))
+
+        with hwdb.patch(), mock.patch.dict(ut.BULK_PARTS, {"item": (get_hwitem, "Item")}):
+            first = threading.Thread(target=fetch)
+            first.start()
+            self.assertTrue(started.wait(5))
+            second = threading.Thread(target=fetch)
+            second.start()
+
+            # (wait until the second caller has joined the first's request)
+            for _ in range(500):
+                if all(call.joined for call in ut._bulk_inflight.values()):
+                    break
+                threading.Event().wait(0.01)
+            release.set()
+            first.join(5)
+            second.join(5)
+
+        self.assertEqual(hwdb.calls[("item", "A")], 1)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0].data, results[1].data)
+        self.assertIsNot(results[0].data["Item"], results[1].data["Item"])
+        self.assertEqual(ut._bulk_inflight, {})
+
+    #-----------------------------------------------------------------------------
+
+    def test__options(self):
+        """Keyword arguments go to every request, and 'submit' runs them"""
+
+        hwdb = FakeHWDB()
+        submitted = []
+        def submit(func):
+            submitted.append(func)
+            return ut._executor.submit(func)
+
+        def part_ids():
+            yield from ("A", "B")
+
+        with hwdb.patch():
+            results = list(ut.fetch_hwitems_bulk(part_ids(), ("item",),
+                                submit=submit, history=True))
+
+        self.assertEqual(len(submitted), 2)
+        self.assertTrue(all(r.data["Item"]["kwargs"] == {"history": True} for r in results))
+
+        with self.assertRaises(ValueError):
+            list(ut.fetch_hwitems_bulk(["A"], ("item", "nonsense")))
+
+    #-----------------------------------------------------------------------------
+
+    def test__get_hwitem_complete(self):
+        """get_hwitem_complete fetches the item and its subcomponents together"""
+
+        hwdb = FakeHWDB(missing={"B"})
+        with hwdb.patch():
+            data = ut.get_hwitem_complete("A")
+            self.assertEqual(data["subcomponents"], {"Leg": "A-leg"})
+
+            with self.assertRaises(RuntimeError) as cm:
+                ut.get_hwitem_complete("B")
+            self.assertIsInstance(cm.exception.__cause__, ra.NotFound)
+
+        self.assertEqual(hwdb.calls[("locations", "A")], 0)
+    #}}}
+
+#=================================================================================
+
+if __name__ == "__main__":
+    unittest.main(argv=config.remaining_args)
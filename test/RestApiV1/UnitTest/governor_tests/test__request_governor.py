@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+These tests don't contact the server.
+"""
+
+from Sisyphus.Configuration import config
+from Sisyphus.Utils import UnitTest as unittest
+
+from Sisyphus.RestApiV1.RequestGovernor import RequestGovernor, Slot
+from Sisyphus.RestApiV1.exceptions import CurrentlyUnavailable
+
+import asyncio
+from datetime import timedelta
+import importlib
+import threading
+from unittest import mock
+from uuid import uuid4 as uuid
+
+# (Sisyphus.RestApiV1.RequestGovernor is also the name of the class)
+rg = importlib.import_module("Sisyphus.RestApiV1.RequestGovernor")
+_RestApiV1 = importlib.import_module("Sisyphus.RestApiV1._RestApiV1")
+
+class StubProfile:
+    def __init__(self):
+        self.profile_name = f"governor-test-{uuid()}"
+        self.settings = {}
+
+class StubResponse:
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.encoding = "utf-8"
+        self.headers = {"Content-Type": "text/html"}
+        self.elapsed = timedelta(0)
+
+def finish(governor, outcome):
+    slot = governor.acquire()
+    getattr(slot, outcome[0])(*outcome[1:])
+    governor.release(slot)
+
+class Test__RequestGovernor(unittest.TestCase):
+    #{{{
+    def tearDown(self):
+        pass
+
+    #-----------------------------------------------------------------------------
+
+    def test__outcomes(self):
+        """Status codes are sorted into success, congestion, and neither"""
+
+        for status_code, outcome in [(200, rg.SUCCESS), (304, rg.SUCCESS),
+                    (404, rg.NEUTRAL), (429, rg.CONGESTED), (503, rg.CONGESTED)]:
+            slot = Slot()
+            slot.record_status(status_code)
+            self.assertEqual(slot.outcome, outcome)
+
+        # e.g., a "currently unavailable" page that came with a 200
+        slot = Slot()
+        slot.record_status(200)
+        slot.record_congestion()
+        self.assertEqual(slot.outcome, rg.CONGESTED)
+
+    #-----------------------------------------------------------------------------
+
+    def test__additive_increase(self):
+        """Each round of successes raises the limit by about one"""
+
+        governor = RequestGovernor(max_in_flight=12)
+        self.assertEqual(governor.limit, rg.INITIAL_LIMIT)
+
+        for _ in range(rg.INITIAL_LIMIT):
+            finish(governor, ("record_status", 200))
+        self.assertAlmostEqual(governor.limit, rg.INITIAL_LIMIT + 1, delta=0.1)
+
+        for _ in range(100):
+            finish(governor, ("record_status", 200))
+        self.assertEqual(governor.limit, 12)
+
+        # Neutral outcomes don't change it
+        finish(governor, ("record_status", 404))
+        self.assertEqual(governor.limit, 12)
+
+    #-----------------------------------------------------------------------------
+
+    def test__multiplicative_decrease(self):
+        """Congestion halves the limit, once per burst, down to the minimum"""
+
+        governor = RequestGovernor(max_in_flight=50)
+        finish(governor, ("record_congestion",))
+        self.assertEqual(governor.limit, rg.INITIAL_LIMIT * rg.DECREASE_FACTOR)
+
+        # Within the cooldown, it's the same burst
+        finish(governor, ("record_status", 503))
+        self.assertEqual(governor.limit, rg.INITIAL_LIMIT * rg.DECREASE_FACTOR)
+        self.assertEqual(governor.stats()["congestions"], 2)
+        self.assertEqual(governor.stats()["decreases"], 1)
+
+        for _ in range(10):
+            governor.last_decrease -= rg.DECREASE_COOLDOWN
+            finish(governor, ("record_status", 429))
+        self.assertEqual(governor.limit, rg.MIN_LIMIT)
+
+    #-----------------------------------------------------------------------------
+
+    def test__concurrency_limit(self):
+        """A thread waits while the limit is reached, until a slot is released"""
+
+        governor = RequestGovernor(max_in_flight=2)
+        governor.limit = 2
+        slots = [governor.acquire(), governor.acquire()]
+
+        got_slot = threading.Event()
+        def third():
+            governor.release(governor.acquire())
+            got_slot.set()
+        thread = threading.Thread(target=third, daemon=True)
+        thread.start()
+
+        self.assertFalse(got_slot.wait(0.2))
+        governor.release(slots.pop())
+        self.assertTrue(got_slot.wait(2))
+        governor.release(slots.pop())
+        self.assertEqual(governor.in_flight, 0)
+
+    #-----------------------------------------------------------------------------
+
+    def test__token_bucket(self):
+        """The rate limit allows a one-second burst, then one per token"""
+
+        governor = RequestGovernor(max_in_flight=50, max_rate=10)
+        governor.last_refill = 100.0
+        governor.limit = 50
+
+        for _ in range(10):
+            self.assertEqual(governor._wait_time(100.0), 0)
+            governor._take()
+        self.assertAlmostEqual(governor._wait_time(100.0), 0.1)
+        self.assertAlmostEqual(governor._wait_time(100.05), 0.05)
+        self.assertEqual(governor._wait_time(100.2), 0)
+
+        # Tokens don't pile up past one second's worth
+        self.assertEqual(governor._wait_time(1000.0), 0)
+        self.assertEqual(governor.tokens, 10)
+
+    #-----------------------------------------------------------------------------
+
+    def test__async_waiters(self):
+        """Coroutines are woken when slots are released, not by polling"""
+
+        governor = RequestGovernor(max_in_flight=2)
+        governor.limit = 2
+        done = []
+
+        async def request(n):
+            slot = await governor.acquire_async()
+            await asyncio.sleep(0.01)
+            done.append(n)
+            governor.release(slot)
+
+        async def main():
+            tasks = [asyncio.create_task(request(n)) for n in range(200)]
+            await asyncio.sleep(0)
+            self.assertLessEqual(len(governor._async_waiters), 198)
+            await asyncio.wait_for(asyncio.gather(*tasks), timeout=10)
+
+        asyncio.run(main())
+        self.assertEqual(sorted(done), list(range(200)))
+        self.assertEqual(governor.in_flight, 0)
+        self.assertEqual(len(governor._async_waiters), 0)
+
+    #-----------------------------------------------------------------------------
+
+    def test__async_cancelled_waiter(self):
+        """A waiter that's cancelled after being woken passes the wakeup on"""
+
+        governor = RequestGovernor(max_in_flight=1)
+        governor.limit = 1
+
+        async def main():
+            held = await governor.acquire_async()
+            first = asyncio.create_task(governor.acquire_async())
+            second = asyncio.create_task(governor.acquire_async())
+            await asyncio.sleep(0)
+
+            governor.release(held)      # wakes 'first'...
+            first.cancel()              # ...which goes away instead
+            slot = await asyncio.wait_for(second, timeout=2)
+            governor.release(slot)
+
+        asyncio.run(main())
+        self.assertEqual(governor.in_flight, 0)
+
+    #-----------------------------------------------------------------------------
+
+    def test__currently_unavailable(self):
+        """A "currently unavailable" page counts as congestion, even with a 200"""
+
+        profile = StubProfile()
+        session_manager = mock.MagicMock()
+        session_manager.session.request.return_value = StubResponse(200,
+                    "<html>The resource is currently unavailable</html>")
+
+        with mock.patch.object(_RestApiV1, "SessionManager", return_value=session_manager):
+            with self.assertRaises(CurrentlyUnavailable):
+                _RestApiV1._request("post", "https://example.com/api/v1/components",
+                            profile=profile, timeouts=[5], json={})
+
+        stats = RequestGovernor.for_profile(profile).stats()
+        self.assertEqual(stats["congestions"], 1)
+        self.assertEqual(stats["successes"], 0)
+        self.assertEqual(stats["in_flight"], 0)
+    #}}}
+
+#=================================================================================
+
+if __name__ == "__main__":
+    unittest.main(argv=config.remaining_args)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2025 Regents of the University of Minnesota
+Author:
+    Alex Wagner <wagn0033@umn.edu>, Dept. of Physics and Astronomy
+
+These tests don't contact the server.
+"""
+
+from Sisyphus.Configuration import config
+from Sisyphus.Utils import UnitTest as unittest
+
+from Sisyphus.RestApiV1.RetryPolicy import RetryPolicy
+from Sisyphus.RestApiV1.exceptions import (ConnectionFailed, ExpiredSignature,
+        CurrentlyUnavailable)
+
+from uuid import uuid4 as uuid
+
+URL = "https://example.com/cdbdev/api/v1/components/Z00100300001-00001"
+
+class StubProfile:
+    def __init__(self, settings=None):
+        # Budgets are shared by profile name, so give each test its own
+        self.profile_name = f"retry-test-{uuid()}"
+        self.settings = settings or {}
+
+class FixedBackoff(RetryPolicy):
+    def __init__(self, *args, delay=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = delay
+
+    def backoff(self, retry_num):
+        return self.delay
+
+def first_failure(policy, method, err, profile=None, idempotent=None):
+    '''Starts a call, fails its first attempt, and returns the delay'''
+    state = policy.begin(method, URL, profile or StubProfile(), idempotent)
+    next(state.attempts())
+    return state.failed(err)
+
+class Test__RetryPolicy(unittest.TestCase):
+    #{{{
+    def setUp(self):
+        self.policy = FixedBackoff((10, 10, 10))
+
+    def tearDown(self):
+        pass
+
+    #-----------------------------------------------------------------------------
+
+    def test__idempotent_methods(self):
+        """GET and PUT are retried after any retryable error"""
+
+        errors = [ConnectionFailed(), ConnectionFailed(request_sent=False),
+                    ExpiredSignature(), CurrentlyUnavailable()]
+        for method in ("GET", "PUT"):
+            for err in errors:
+                with self.subTest(method=method, err=repr(err)):
+                    self.assertEqual(first_failure(self.policy, method, err), 0)
+
+    #-----------------------------------------------------------------------------
+
+    def test__non_idempotent_methods(self):
+        """POST and PATCH are only retried if the server turned them away"""
+
+        for method in ("POST", "PATCH"):
+            for err in [ConnectionFailed(request_sent=False),
+                        ExpiredSignature(), CurrentlyUnavailable()]:
+                with self.subTest(method=method, err=repr(err)):
+                    self.assertEqual(first_failure(self.policy, method, err), 0)
+
+            with self.subTest(method=method, err="ConnectionFailed()"):
+                with self.assertRaises(ConnectionFailed):
+                    first_failure(self.policy, method, ConnectionFailed())
+
+    #-----------------------------------------------------------------------------
+
+    def test__idempotent_override(self):
+        """idempotent=True or retry_non_idempotent allows retrying a POST"""
+
+        self.assertEqual(first_failure(self.policy, "POST", ConnectionFailed(),
+                                idempotent=True), 0)
+
+        policy = FixedBackoff((10, 10), retry_non_idempotent=True)
+        self.assertEqual(first_failure(policy, "POST", ConnectionFailed()), 0)
+
+    #-----------------------------------------------------------------------------
+
+    def test__max_attempts(self):
+        """The last attempt's failure is raised"""
+
+        state = self.policy.begin("GET", URL, StubProfile())
+        attempts = 0
+        with self.assertRaises(CurrentlyUnavailable):
+            for timeout in state.attempts():
+                attempts += 1
+                state.failed(CurrentlyUnavailable())
+        self.assertEqual(attempts, 3)
+
+    #-----------------------------------------------------------------------------
+
+    def test__deadline(self):
+        """Attempts are shortened to fit, and no wait runs past the deadline"""
+
+        policy = FixedBackoff((10, (10, 20)), deadline=5, delay=30.0)
+        state = policy.begin("GET", URL, StubProfile())
+        timeout = next(state.attempts())
+        self.assertLessEqual(timeout, 5)
+
+        with self.assertRaises(ConnectionFailed):
+            state.failed(ConnectionFailed())
+
+        policy = FixedBackoff((10, (10, 20)), deadline=5, delay=0.0)
+        state = policy.begin("GET", URL, StubProfile())
+        attempts = state.attempts()
+        next(attempts)
+        state.failed(ConnectionFailed())
+        timeout = next(attempts)
+        self.assertEqual(len(timeout), 2)
+        self.assertTrue(all(t <= 5 for t in timeout))
+
+    #-----------------------------------------------------------------------------
+
+    def test__retry_budget(self):
+        """Once a profile's retry budget is spent, failures are raised"""
+
+        policy = FixedBackoff((10, 10), retry_budget=2, retry_budget_window=60)
+        profile = StubProfile()
+
+        for _ in range(2):
+            self.assertEqual(first_failure(policy, "GET",
+                                CurrentlyUnavailable(), profile), 0)
+        with self.assertRaises(CurrentlyUnavailable):
+            first_failure(policy, "GET", CurrentlyUnavailable(), profile)
+
+        # A different profile has a budget of its own
+        self.assertEqual(first_failure(policy, "GET",
+                                CurrentlyUnavailable(), StubProfile()), 0)
+
+    #-----------------------------------------------------------------------------
+
+    def test__no_budget_by_default(self):
+        """Without a budget, retries aren't limited"""
+
+        policy = FixedBackoff((10, 10))
+        profile = StubProfile()
+        for _ in range(500):
+            self.assertEqual(first_failure(policy, "GET",
+                                ConnectionFailed(), profile), 0)
+
+    #-----------------------------------------------------------------------------
+
+    def test__token_refresh_is_free(self):
+        """Retrying after an expired token doesn't spend the budget"""
+
+        policy = FixedBackoff((10, 10), retry_budget=1, retry_budget_window=60)
+        profile = StubProfile()
+
+        for _ in range(5):
+            self.assertEqual(first_failure(policy, "POST",
+                                ExpiredSignature(), profile), 0)
+        self.assertEqual(first_failure(policy, "GET",
+                                ConnectionFailed(), profile), 0)
+        with self.assertRaises(ConnectionFailed):
+            first_failure(policy, "GET", ConnectionFailed(), profile)
+
+    #-----------------------------------------------------------------------------
+
+    def test__for_call(self):
+        """The call's options override the profile's, and unknown keys are ignored"""
+
+        profile = StubProfile({"timeouts": [1, 2],
+                    "retry_policy": {"deadline": 30, "backof_base": 2}})
+
+        policy = RetryPolicy.for_call(profile, (5,),
+                    retry_policy={"backoff_max": 3, "nonsense": True})
+        self.assertEqual(policy.timeouts, (1, 2))
+        self.assertEqual(policy.deadline, 30)
+        self.assertEqual(policy.backoff_max, 3)
+        self.assertEqual(policy.backoff_base, 1.0)
+        self.assertIsNone(policy.retry_budget)
+
+        policy = RetryPolicy.for_call(StubProfile(), (5,), timeouts=(7, 8))
+        self.assertEqual(policy.timeouts, (7, 8))
+
+    #-----------------------------------------------------------------------------
+
+    def test__backoff(self):
+        """Full jitter: each wait is between 0 and the growing cap"""
+
+        policy = RetryPolicy((10,), backoff_base=1.0, backoff_max=4.0)
+        for retry_num, cap in [(0, 1.0), (1, 2.0), (2, 4.0), (5, 4.0)]:
+            for _ in range(20):
+                delay = policy.backoff(retry_num)
+                self.assertTrue(0 <= delay <= cap)
+    #}}}
+
+#=================================================================================
+
+if __name__ == "__main__":
+    unittest.main(argv=config.remaining_args)
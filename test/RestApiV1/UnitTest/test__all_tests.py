@@ -39,6 +39,11 @@ from patch_tests.test__patch_hwitem import *
 
 from spec_tests.test__specifications import *
 
+from retry_tests.test__retry_policy import *
+from governor_tests.test__request_governor import *
+from bulk_tests.test__fetch_hwitems_bulk import *
+from aio_tests.test__aio import *
+
 class RealTimeTestResult(unittest.TextTestResult):
 
     def __init__(self, stream, descriptions, verbosity):